@@ -5,33 +5,79 @@
 
 from __future__ import annotations
 
+from os import environ
 from pathlib import Path
+import threading
+from typing import TYPE_CHECKING, Any
 
-import pooch
+if TYPE_CHECKING:
+    import pooch
 
 try:
     from ._version import version as __version__
 except ImportError:
     __version__ = "unknown"
 
-__all__ = ["CACHE"]
+__all__ = ["CACHE", "CACHE_DIR"]
 
 BASE_DIR: Path = Path(__file__).parent / "cache"
 BASE_URL: str = "https://github.com/bjlittle/geovista-data-jav-2026/raw/{version}/assets"
-CACHE_DIR: Path = BASE_DIR / "assets"
+CACHE_ENV: str = "GEOJAV_CACHEDIR"
 DATA_VERSION: str = "2026.03.0"
 REGISTRY: Path = BASE_DIR / "registry.txt"
 RETRY_ATTEMPTS: int = 3
 
-CACHE: pooch.Pooch = pooch.create(
-        path=CACHE_DIR,
-        base_url=BASE_URL,
-        version=DATA_VERSION,
-        version_dev="main",
-        registry=None,
-        retry_if_failed=RETRY_ATTEMPTS,
-)
-
-# load the registry
-with (REGISTRY).open("r", encoding="utf-8", errors="strict") as text_io:
-    CACHE.load_registry(text_io)
+if TYPE_CHECKING:
+    CACHE: pooch.Pooch
+    CACHE_DIR: Path
+
+_lock = threading.RLock()
+
+
+def _cache_dir() -> Path:
+    # a shared cache root may be configured with the environment variable,
+    # otherwise default to the user cache directory for the platform
+    if (cache_dir := environ.get(CACHE_ENV)) is None:
+        from platformdirs import user_cache_dir
+
+        cache_dir = user_cache_dir(appname=__package__)
+
+    return Path(cache_dir).expanduser() / "assets"
+
+
+def _create_cache() -> pooch.Pooch:
+    import pooch
+
+    cache = pooch.create(
+            path=__getattr__("CACHE_DIR"),
+            base_url=BASE_URL,
+            version=DATA_VERSION,
+            version_dev="main",
+            registry=None,
+            retry_if_failed=RETRY_ATTEMPTS,
+    )
+
+    # load the registry
+    with (REGISTRY).open("r", encoding="utf-8", errors="strict") as text_io:
+        cache.load_registry(text_io)
+
+    return cache
+
+
+def __getattr__(name: str) -> Any:
+    # defer importing pooch and parsing the registry until the CACHE is
+    # first accessed, so that importing the package performs no I/O
+    factories = {"CACHE": _create_cache, "CACHE_DIR": _cache_dir}
+
+    if name in factories:
+        with _lock:
+            if name not in globals():
+                globals()[name] = factories[name]()
+        return globals()[name]
+
+    emsg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(emsg)
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,140 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare the blanked frames with the thresholded frames of a time-series.
+
+The frame of each time step is prepared both as a thresholded frame, see
+:func:`geojav.prepare.build`, and as a blanked frame of the shared structured
+mesh, see :mod:`geojav.blanking`. Report the memory of each, and the latency
+of switching between the frames of time steps in a random order, as the
+renderers do when the time step slider is moved i.e., thresholding the frame,
+then extracting the surface of its visible cells, as the mapper does.
+
+Execute with ``python -m geojav.benchmarks.blanking [DATASET]``, where the
+optional ``DATASET`` is ``raikoke`` or ``reykjanes``, whose unpacked
+time-series is used. Otherwise, a synthetic sparse plume is used.
+
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import click
+import numpy as np
+
+from geojav import blanking, prepare, scalars, thresholds
+from geojav.benchmarks.netcdf import READS, synthesize
+from geojav.benchmarks.sparse import percentiles
+
+if TYPE_CHECKING:
+    import pyvista as pv
+
+STEPS: int = 24
+
+
+def surface(frame: pv.DataSet) -> pv.PolyData:
+    """Return the surface of the visible cells of the frame, as the mapper renders."""
+    import pyvista as pv
+    from vtkmodules.vtkFiltersGeometry import vtkDataSetSurfaceFilter
+
+    alg = vtkDataSetSurfaceFilter()
+    alg.SetInputData(frame)
+    alg.Update()
+
+    return pv.wrap(alg.GetOutput())
+
+
+def synthetic() -> tuple[prepare.Source, prepare.Geometry, bool]:
+    """Return a synthetic sparse plume, on a regular mesh."""
+    import pyvista as pv
+
+    cube = synthesize()
+    nz, ny, nx = cube.shape[1:]
+    x, y, z = np.arange(nx + 1.0), np.arange(ny + 1.0), np.arange(nz + 1.0)
+    mesh = pv.StructuredGrid(*np.meshgrid(x, y, z, indexing="ij"))
+    source = prepare.Source(cube=cube, data=cube.data, path=None)
+    geometry = prepare.Geometry(mesh=mesh, x_cb=x, y_cb=y, z_cb=z, z=z, zscale=1.0)
+
+    return source, geometry, True
+
+
+@click.command()
+@click.argument("dataset", required=False, type=click.Choice(list(prepare.DATASETS)))
+@click.option("-s", "--steps", default=STEPS, show_default=True, help="Number of time steps.")
+@click.option("-r", "--reads", default=READS, show_default=True, help="Number of frame switches.")
+@click.option("-t", "--threshold", default=0.0, show_default=True, help="Threshold of the frames.")
+def main(dataset: str | None, steps: int, reads: int, threshold: float) -> None:
+    from geovista.crs import WGS84, to_wkt
+
+    if dataset is None:
+        source, geometry, idx = synthetic()
+    else:
+        dataset = prepare.DATASETS[dataset]
+        source = dataset.load()
+        geometry, idx = dataset.geometry(source.cube), dataset.idx
+
+    mesh = geometry.mesh
+    nsteps = min(steps, source.data.shape[0])
+    print(f"\n{nsteps} time steps, on a mesh of {mesh.n_cells} cells\n")
+
+    # the thresholded frames, sorted as when prepared
+    built = [
+        prepare.build(mesh, source.data, tstep, plume_stats=source.stats, idx=idx)
+        for tstep in range(nsteps)
+    ]
+
+    # the blanked frames, of the shared geometry and the scalars of each time step
+    shared = mesh.copy(deep=False)
+    if idx:
+        shared.cell_data["idx"] = np.arange(mesh.n_cells)
+    to_wkt(shared, WGS84)
+    rows = [scalars.flatten(source.data, tstep) for tstep in range(nsteps)]
+
+    rng = np.random.default_rng(0)
+    order = rng.integers(nsteps, size=reads)
+    results = []
+
+    for label, switch in (
+        ("threshold", lambda tstep: thresholds.ThresholdIndex(built[tstep])),
+        ("blanked", lambda tstep: blanking.BlankIndex(scalars.frame(shared, rows[tstep]))),
+    ):
+        timings, surfaces = [], []
+        for tstep in order:
+            start = time.perf_counter()
+            rendered = surface(switch(tstep).extract(threshold))
+            timings.append(time.perf_counter() - start)
+            surfaces.append(rendered.n_cells)
+        results.append((label, timings, surfaces))
+
+    # the memory of each frame, and of the geometry shared by every frame
+    tmemory = np.mean([frame.actual_memory_size for frame in built]) * 1024
+    ghosts = mesh.n_cells * np.dtype(np.uint8).itemsize
+    bmemory = rows[0].nbytes + ghosts
+    geometry_memory = shared.actual_memory_size * 1024
+
+    (_, _, expected), (_, _, actual) = results
+    assert expected == actual, "The rendered surfaces differ"
+
+    print(
+        f"\t{'frames':<10} {'frame':>10} {'shared':>10} {'total':>10} "
+        f"{'switch p50':>11} {'switch p95':>11}"
+    )
+    for (label, timings, _), (memory, common) in zip(
+        results, ((tmemory, 0), (bmemory, geometry_memory)), strict=True
+    ):
+        s50, s95 = percentiles(timings)
+        total = memory * nsteps + common
+        print(
+            f"\t{label:<10} {memory / 1024**2:>7.2f}MiB {common / 1024**2:>7.2f}MiB "
+            f"{total / 1024**2:>7.2f}MiB {s50:>9.2f}ms {s95:>9.2f}ms"
+        )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Check the resumable downloads of :class:`geojav.fetch.Downloader`.
+
+A local range-capable HTTP server, see :mod:`http.server`, serves a synthetic
+asset, and the downloader is checked against each of the responses that a
+resumed download may receive i.e.,
+
+- a ``206`` partial content response, which is appended to the partial file
+- a ``200`` response from a server that ignores the ``Range`` request, which
+  restarts the download, rather than appending to the partial file
+- a ``416`` range not satisfiable response to a complete partial file, which
+  is moved into place without downloading
+- a corrupt response, whose hash does not match, which discards the partial
+  file and retries the download afresh
+
+Execute with ``python -m geojav.benchmarks.fetch``.
+
+"""
+
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+from pathlib import Path
+import re
+import tempfile
+import threading
+
+import click
+import numpy as np
+
+from geojav.fetch import PARTIAL_SUFFIX, Download, Downloader
+
+NBYTES: int = 1024**2
+
+
+class Server(ThreadingHTTPServer):
+    """Serve the content, recording the ``Range`` and status of each request."""
+
+    def __init__(self, content: bytes) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.content = content
+        # honour range requests, otherwise respond with the whole content
+        self.ranges = True
+        # the number of responses to corrupt
+        self.corrupt = 0
+        self.requests: list[tuple[str | None, int]] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/asset.bin"
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: Server
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        content, header = self.server.content, self.headers.get("Range")
+        start = 0
+        if header is not None and self.server.ranges:
+            start = int(re.fullmatch(r"bytes=(\d+)-", header).group(1))
+
+        if start >= len(content) > 0:
+            status, body = 416, b""
+        else:
+            status, body = (206 if start else 200), content[start:]
+            if self.server.corrupt:
+                self.server.corrupt -= 1
+                body = bytes([body[0] ^ 0xFF]) + body[1:]
+
+        self.server.requests.append((header, status))
+        self.send_response(status)
+        if status == 416:
+            self.send_header("Content-Range", f"bytes */{len(content)}")
+        elif status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@click.command()
+@click.option("-n", "--nbytes", default=NBYTES, show_default=True, help="Size of the asset.")
+def main(nbytes: int) -> None:
+    import requests
+
+    content = np.random.default_rng(0).bytes(nbytes)
+    known_hash = f"sha256:{hashlib.sha256(content).hexdigest()}"
+    offset = nbytes // 3
+
+    server = Server(content)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def check(
+        label: str, partial: bytes | None, retry_if_failed: int = 0
+    ) -> tuple[Download, list[tuple[str | None, int]]]:
+        # download afresh, from any partial file
+        server.requests.clear()
+        fname = Path(tmpdir) / label / "asset.bin"
+        fname.parent.mkdir()
+        if partial is not None:
+            fname.with_name(f"{fname.name}{PARTIAL_SUFFIX}").write_bytes(partial)
+
+        download = downloader.download(
+            server.url, fname, known_hash=known_hash, retry_if_failed=retry_if_failed
+        )
+
+        assert fname.read_bytes() == content, f"{label}: the downloaded content differs"
+        assert not fname.with_name(f"{fname.name}{PARTIAL_SUFFIX}").exists()
+        print(
+            f"\t{label:<10} {download.offset:>9} {download.nbytes:>9} "
+            f"{', '.join(f'{status}' for _, status in server.requests)}"
+        )
+
+        return download, list(server.requests)
+
+    print(f"\nDownloading {nbytes} bytes from {server.url}\n")
+    print(f"\t{'check':<10} {'offset':>9} {'nbytes':>9} responses")
+
+    with tempfile.TemporaryDirectory() as tmpdir, requests.Session() as session:
+        downloader = Downloader(session)
+
+        # the partial file is resumed with a range request
+        download, responses = check("resume", content[:offset])
+        assert responses == [(f"bytes={offset}-", 206)]
+        assert (download.offset, download.nbytes) == (offset, nbytes - offset)
+
+        # the server ignores the range request, so the download restarts
+        server.ranges = False
+        download, responses = check("restart", content[:offset])
+        assert responses == [(f"bytes={offset}-", 200)]
+        assert (download.offset, download.nbytes) == (0, nbytes)
+        server.ranges = True
+
+        # the partial file is already complete
+        download, responses = check("complete", content)
+        assert responses == [(f"bytes={nbytes}-", 416)]
+        assert download.nbytes == 0
+
+        # the corrupt partial file is discarded, and downloaded afresh
+        server.corrupt = 1
+        download, responses = check("corrupt", content[:offset], retry_if_failed=1)
+        assert responses == [(f"bytes={offset}-", 206), (None, 200)]
+        assert (download.offset, download.nbytes) == (0, nbytes)
+
+    server.shutdown()
+    server.server_close()
+    print()
+
+
+if __name__ == "__main__":
+    main()
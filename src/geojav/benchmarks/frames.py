@@ -0,0 +1,130 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare the legacy per time step VTK frame cache with the consolidated store.
+
+The thresholded frame of each time step of a synthetic plume is written to a
+legacy VTK file per time step, as the renderers previously did, and to the
+consolidated frame store, see :mod:`geojav.frames`. Report the latency of
+writing each frame, and of reading individual frames in a random order, along
+with the number of files and the size on disk of each.
+
+Execute with ``python -m geojav.benchmarks.frames``. Note that the files are
+likely to be in the page cache when read.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from geojav import crop, frames
+from geojav.benchmarks.netcdf import READS, synthesize
+from geojav.benchmarks.sparse import percentiles
+
+
+def thresholded(data: np.ndarray) -> list:
+    """Return the thresholded frame of each time step, as the renderers do."""
+    from geovista.crs import WGS84, to_wkt
+    import pyvista as pv
+
+    nz, ny, nx = data.shape[1:]
+    xx, yy, zz = np.meshgrid(
+        np.arange(nx + 1.0), np.arange(ny + 1.0), np.arange(nz + 1.0), indexing="ij"
+    )
+    mesh = pv.StructuredGrid(xx, yy, zz)
+    result = []
+
+    for tdata in data:
+        slices = crop.active(tdata)
+        if crop.is_empty(slices):
+            result.append(pv.UnstructuredGrid())
+            continue
+        tmp = mesh.extract_subset(crop.voi(slices))
+        tmp["data"] = np.ma.masked_less_equal(tdata[slices], 0).filled(np.nan).flatten()
+        tmp["idx"] = crop.cell_ids(slices, data.shape[1:])
+        to_wkt(tmp, WGS84)
+        tmp.active_scalars_name = "data"
+        result.append(tmp.threshold())
+
+    return result
+
+
+@click.command()
+@click.option("-r", "--reads", default=READS, show_default=True, help="Number of frames read.")
+@click.option("-c", "--codec", default=None, help="Codec of the frame store.")
+def main(reads: int, codec: str | None) -> None:
+    import pyvista as pv
+
+    cube = synthesize()
+    data = thresholded(cube.data)
+    ncells = np.mean([frame.n_cells for frame in data])
+    print(f"\n{len(data)} frames, with {ncells:.0f} cells on average\n")
+
+    rng = np.random.default_rng(0)
+    steps = rng.integers(len(data), size=reads)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        legacy = tmpdir / "vtk"
+        legacy.mkdir()
+
+        writes = []
+        for tstep, frame in enumerate(data):
+            start = time.perf_counter()
+            frame.save(legacy / f"frame_{tstep}.vtk")
+            writes.append(time.perf_counter() - start)
+
+        loads = []
+        for tstep in steps:
+            start = time.perf_counter()
+            pv.read(legacy / f"frame_{tstep}.vtk")
+            loads.append(time.perf_counter() - start)
+
+        files = list(legacy.iterdir())
+        nbytes = sum(fname.stat().st_size for fname in files)
+        results.append(("legacy", len(files), nbytes, writes, loads))
+
+        fname = tmpdir / f"frames{frames.SUFFIX}"
+        with frames.FrameStore(fname, codec=codec) as store:
+            writes = []
+            for tstep, frame in enumerate(data):
+                start = time.perf_counter()
+                store.put(tstep, frame)
+                writes.append(time.perf_counter() - start)
+            label = store.codec
+
+        with frames.FrameStore(fname) as store:
+            loads = []
+            for tstep in steps:
+                start = time.perf_counter()
+                store.get(int(tstep))
+                loads.append(time.perf_counter() - start)
+
+        results.append((label, 1, fname.stat().st_size, writes, loads))
+
+    print(
+        f"\t{'format':<10} {'files':>6} {'size':>10} {'write p50':>10} {'write p95':>10} "
+        f"{'read p50':>10} {'read p95':>10}"
+    )
+    for label, nfiles, nbytes, writes, loads in results:
+        w50, w95 = percentiles(writes)
+        r50, r95 = percentiles(loads)
+        print(
+            f"\t{label:<10} {nfiles:>6} {nbytes / 1024**2:>8.2f}MiB {w50:>8.2f}ms "
+            f"{w95:>8.2f}ms {r50:>8.2f}ms {r95:>8.2f}ms"
+        )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Measure the cost of ``import geojav`` against an import-time budget.
+
+Execute with ``python -m geojav.benchmarks.import_time``.
+
+"""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+
+import click
+
+BUDGET: float = 5.0
+REPEAT: int = 10
+
+
+def import_time(module: str = "geojav") -> float:
+    """Return the cumulative import time (ms) of the `module` in a fresh interpreter."""
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    result = subprocess.run(cmd, capture_output=True, check=True, text=True)
+
+    # the last matching entry of the import-time tree is the top-level module
+    for line in reversed(result.stderr.splitlines()):
+        _, _, fields = line.partition(":")
+        _, cumulative, name = (field.strip() for field in fields.split("|"))
+        if name == module:
+            return int(cumulative) / 1000
+
+    emsg = f"Failed to measure the import time of {module!r}."
+    raise RuntimeError(emsg)
+
+
+@click.command()
+@click.option("-b", "--budget", default=BUDGET, show_default=True, help="Import-time budget (ms).")
+@click.option("-r", "--repeat", default=REPEAT, show_default=True, help="Number of measurements.")
+def main(budget: float, repeat: int) -> None:
+    import geojav
+
+    assert "pooch" not in sys.modules, "importing geojav must not import pooch"
+    assert "CACHE" not in vars(geojav), "importing geojav must not create the CACHE"
+
+    timings = [import_time() for _ in range(repeat)]
+    median = statistics.median(timings)
+
+    print(f"\nimport geojav: median={median:.2f}ms, min={min(timings):.2f}ms, {budget=}ms\n")
+
+    if median > budget:
+        emsg = f"import geojav exceeds the import-time budget ({median:.2f}ms > {budget}ms)"
+        raise SystemExit(emsg)
+
+
+if __name__ == "__main__":
+    main()
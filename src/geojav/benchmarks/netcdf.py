@@ -0,0 +1,158 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare the NetCDF codecs and chunking of a time-series.
+
+For each configuration, report the time to write the time-series, the size of
+the file, and the latency of reading individual time steps in a random order,
+as the renderers do with ``data[tstep][:]``.
+
+The ``legacy`` configurations are those previously used by the unpack scripts
+i.e., ``zlib`` level 9 with the default chunking (Raikoke), and uncompressed
+(Reykjanes).
+
+Execute with ``python -m geojav.benchmarks.netcdf [FNAME]``, where the optional
+``FNAME`` is an unpacked time-series NetCDF file. Otherwise, a synthetic sparse
+plume is used. Note that the file is likely to be in the page cache when read.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import statistics
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+import click
+import netCDF4 as nc
+import numpy as np
+
+from geojav.netcdf import codecs, save
+
+if TYPE_CHECKING:
+    from iris.cube import Cube
+
+LEVELS: dict[str, tuple[int, ...]] = {
+    "zlib": (1, 4, 9),
+    "zstd": (1, 3, 9),
+    "bzip2": (9,),
+    "blosc_lz4": (5,),
+    "blosc_zstd": (5,),
+}
+READS: int = 50
+SHAPE: tuple[int, int, int, int] = (48, 20, 200, 300)
+
+
+def synthesize(shape: tuple[int, int, int, int] = SHAPE) -> Cube:
+    """Create a sparse plume-like time-series, which grows over time."""
+    from iris.coords import DimCoord
+    from iris.cube import Cube
+
+    rng = np.random.default_rng(0)
+    nt, nz, ny, nx = shape
+    data = np.zeros(shape, dtype=np.float32)
+
+    for t in range(nt):
+        # a blob of positive values which drifts and spreads over time
+        cy, cx = ny // 4 + t * ny // (2 * nt), nx // 4 + t * nx // (2 * nt)
+        ry, rx = max(2, t * ny // (4 * nt)), max(2, t * nx // (4 * nt))
+        blob = data[t, : nz // 2, cy - ry : cy + ry, cx - rx : cx + rx]
+        blob[:] = rng.lognormal(size=blob.shape)
+        blob[rng.random(blob.shape) < 0.3] = 0
+
+    names = ("time", "altitude", "latitude", "longitude")
+    coords = [
+        (DimCoord(np.arange(n, dtype=float), long_name=name, units="1"), dim)
+        for dim, (name, n) in enumerate(zip(names, shape))
+    ]
+    coords[0][0].standard_name = "time"
+    coords[0][0].units = "hours since epoch"
+
+    return Cube(data, long_name="air_concentration", units="mg/m3", dim_coords_and_dims=coords)
+
+
+def configurations() -> list[tuple[str, dict]]:
+    """Return the labelled keyword arguments of each configuration."""
+    result = [
+        ("legacy zlib-9", {"legacy": True, "zlib": True, "complevel": 9}),
+        ("legacy none", {"legacy": True}),
+        ("none", {"codec": "none"}),
+    ]
+
+    for codec in codecs()[1:]:
+        result.extend(
+            (f"{codec}-{level}", {"codec": codec, "complevel": level}) for level in LEVELS[codec]
+        )
+
+    return result
+
+
+def read_latency(fname: Path, reads: int) -> list[float]:
+    """Return the latency (s) of reading time steps, in a random order."""
+    rng = np.random.default_rng(0)
+    timings = []
+
+    with nc.Dataset(fname) as ds:
+        # the data variable is the only variable spanning all dimensions
+        var = max(ds.variables.values(), key=lambda var: var.ndim)
+        steps = rng.integers(var.shape[0], size=reads)
+        for tstep in steps:
+            start = time.perf_counter()
+            var[tstep][:]
+            timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+@click.command()
+@click.argument("fname", required=False, type=click.Path(exists=True, path_type=Path))
+@click.option("-r", "--reads", default=READS, show_default=True, help="Number of time steps read.")
+def main(fname: Path | None, reads: int) -> None:
+    import iris
+
+    iris.FUTURE.save_split_attrs = True
+
+    cube = synthesize() if fname is None else iris.load_cube(fname)
+    # realise the data, so that only the writing is timed
+    cube.data  # noqa: B018
+    nbytes = cube.data.nbytes / 1024**2
+
+    print(f"\n{cube.summary(shorten=True)} ({nbytes:.1f}MiB)\n")
+    print(
+        f"\t{'configuration':<16} {'write':>9} {'size':>10} {'ratio':>7} "
+        f"{'read p50':>10} {'read p95':>10}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, kwargs in configurations():
+            target = Path(tmpdir) / f"{label.replace(' ', '_')}.nc"
+            start = time.perf_counter()
+            try:
+                if kwargs.pop("legacy", False):
+                    iris.save(cube, target, **kwargs)
+                else:
+                    save(cube, target, **kwargs)
+            except Exception as err:  # noqa: BLE001
+                print(f"\t{label:<16} failed: {err}")
+                continue
+            elapsed = time.perf_counter() - start
+
+            size = target.stat().st_size / 1024**2
+            timings = sorted(read_latency(target, reads))
+            p50 = statistics.median(timings) * 1000
+            p95 = timings[int(0.95 * (len(timings) - 1))] * 1000
+
+            print(
+                f"\t{label:<16} {elapsed:>8.2f}s {size:>8.1f}MiB {nbytes / size:>6.1f}x "
+                f"{p50:>8.2f}ms {p95:>8.2f}ms"
+            )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare loading the Raikoke QVA tarball with iris and with :mod:`geojav.qva`.
+
+The iris path extracts the QVA files to disk and loads them with the generic
+NAME loader, as the Raikoke unpack originally did. The :mod:`geojav.qva` path
+parses the members straight from the tarball, both in-process and with a pool
+of worker processes.
+
+Execute with ``python -m geojav.benchmarks.qva``.
+
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import statistics
+import tarfile
+import tempfile
+import time
+from typing import TYPE_CHECKING
+
+import click
+import numpy as np
+
+from geojav.qva import PATTERN, load_tarball
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from iris.cube import Cube
+
+ASSET: str = "raikoke/QVA_grid1.tar.gz"
+COORDS: tuple[str, ...] = ("time", "flight_level", "latitude", "longitude")
+REPEAT: int = 3
+
+
+def load_iris(fname: Path) -> Cube:
+    """Extract the QVA files of the tarball, and load them with iris."""
+    import iris
+
+    with tempfile.TemporaryDirectory() as tmpdir, tarfile.open(fname) as tar:
+        members = [
+            member for member in tar.getmembers() if Path(member.name).match(PATTERN)
+        ]
+        tar.extractall(path=tmpdir, members=members, filter="data")
+        cube = iris.load_cube([str(Path(tmpdir) / member.name) for member in members])
+        # realise the data before the extracted files are removed
+        cube.data  # noqa: B018
+
+    return cube
+
+
+def timeit(func: Callable[[], Cube], repeat: int) -> tuple[Cube, float]:
+    """Return the result of the `func`, and the median of its timings (s)."""
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cube = func()
+        timings.append(time.perf_counter() - start)
+
+    return cube, statistics.median(timings)
+
+
+@click.command()
+@click.argument("fname", required=False, type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    help="Maximum number of parsing processes (default: number of CPUs).",
+)
+@click.option("-r", "--repeat", default=REPEAT, show_default=True, help="Number of measurements.")
+def main(fname: Path | None, processes: int | None, repeat: int) -> None:
+    if fname is None:
+        from geojav.fetch import fetch_assets
+
+        print("\nFetching assets ...\n")
+        (fname,) = fetch_assets([ASSET])
+
+    processes = processes or os.cpu_count()
+
+    print(f"\nBenchmarking {fname.name} ({repeat=}) ...\n")
+
+    expected, baseline = timeit(lambda: load_iris(fname), repeat)
+    print(f"\tiris (extract + load):      {baseline:8.3f}s")
+
+    for workers in sorted({1, processes}):
+        cube, elapsed = timeit(lambda workers=workers: load_tarball(fname, workers=workers), repeat)
+        print(
+            f"\tgeojav.qva ({workers=:>3}):     {elapsed:8.3f}s "
+            f"({baseline / elapsed:.1f}x faster)"
+        )
+
+        if not np.array_equal(cube.data, expected.data):
+            emsg = f"geojav.qva ({workers=}) data differs from iris"
+            raise SystemExit(emsg)
+        for name in COORDS:
+            if cube.coord(name) != expected.coord(name):
+                emsg = f"geojav.qva ({workers=}) {name!r} coordinate differs from iris"
+                raise SystemExit(emsg)
+
+    print(f"\n{expected.summary(shorten=True)}\n")
+
+
+if __name__ == "__main__":
+    main()
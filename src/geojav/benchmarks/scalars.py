@@ -0,0 +1,112 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare the chain of copies of preparing the scalars of a frame with the buffer.
+
+The scalars of each time step of a synthetic plume are prepared as previously
+i.e., masking the non-positive cells, filling them with NaN, then flattening,
+and casting to ``float32``, with the flat cell ids of a cropped time step
+computed from its indices, versus casting straight into a reused ``float32``
+buffer and masking in place, see :class:`geojav.scalars.Buffer`.
+
+Report the latency and the peak memory allocated per frame, for the cropped
+bounding box of the active cells of each time step, as built by
+:func:`geojav.prepare.build`, and for the whole time step, as filled into the
+row of the shared scalars, see :func:`geojav.scalars.flatten`.
+
+Execute with ``python -m geojav.benchmarks.scalars``.
+
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import time
+import tracemalloc
+from typing import Any
+
+import click
+import numpy as np
+
+from geojav import crop, scalars
+from geojav.benchmarks.netcdf import synthesize
+from geojav.benchmarks.sparse import percentiles
+
+REPEATS: int = 5
+SHAPE: tuple[int, int, int, int] = (24, 40, 300, 400)
+
+
+def measure(prepare: Callable[[int], Any], nsteps: int, repeats: int) -> tuple[list[float], int]:
+    """Return the timings, and the largest peak memory (bytes), of preparing each time step."""
+    # once, to grow any buffers
+    prepare(nsteps - 1)
+    timings, peak = [], 0
+
+    for _ in range(repeats):
+        for tstep in range(nsteps):
+            start = time.perf_counter()
+            prepare(tstep)
+            timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for tstep in range(nsteps):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        prepare(tstep)
+        _, current = tracemalloc.get_traced_memory()
+        peak = max(peak, current - base)
+    tracemalloc.stop()
+
+    return timings, peak
+
+
+@click.command()
+@click.option("-r", "--repeats", default=REPEATS, show_default=True, help="Number of repeats.")
+def main(repeats: int) -> None:
+    cube = synthesize(SHAPE)
+    data = cube.data
+    nsteps, shape = data.shape[0], data.shape[1:]
+    cropped = [crop.active(data[tstep]) for tstep in range(nsteps)]
+    ncells = sum(data[(tstep, *slices)].size for tstep, slices in enumerate(cropped))
+    print(f"\n{nsteps} time steps of {np.prod(shape)} cells, {ncells // nsteps} cropped cells\n")
+
+    buffer = scalars.buffer()
+    row = np.empty(np.prod(shape), dtype=scalars.DTYPE)
+
+    def chain_cropped(tstep: int) -> None:
+        slices = cropped[tstep]
+        np.ma.masked_less_equal(data[(tstep, *slices)], 0).filled(np.nan).flatten()
+        crop.cell_ids(slices, shape)
+
+    def buffer_cropped(tstep: int) -> None:
+        slices = cropped[tstep]
+        buffer.fill(data[(tstep, *slices)])
+        buffer.cell_ids(slices, shape)
+
+    def chain_whole(tstep: int) -> None:
+        tdata = np.ma.masked_less_equal(data[tstep][:], 0)
+        row[:] = np.ma.filled(tdata.astype(scalars.DTYPE), np.nan).ravel()
+
+    def buffer_whole(tstep: int) -> None:
+        scalars.flatten(data, tstep, out=row)
+
+    print(f"\t{'scalars':<8} {'prepare':<8} {'p50':>9} {'p95':>9} {'peak':>10}")
+    for label, chain, buffered in (
+        ("cropped", chain_cropped, buffer_cropped),
+        ("whole", chain_whole, buffer_whole),
+    ):
+        for name, prepare in (("chain", chain), ("buffer", buffered)):
+            timings, peak = measure(prepare, nsteps, repeats)
+            p50, p95 = percentiles(timings)
+            print(
+                f"\t{label:<8} {name:<8} {p50:>7.2f}ms {p95:>7.2f}ms "
+                f"{peak / 1024**2:>7.2f}MiB"
+            )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare the dense time-series with its sparse plume store.
+
+Report the size on disk of each, and the latency of preparing the scalars of
+individual time steps in a random order i.e., reading the dense time step,
+masking its non-positive cells and flattening it, as the renderers do, versus
+reading only the positive cells of the time step from the plume store.
+
+Execute with ``python -m geojav.benchmarks.sparse [FNAME]``, where the optional
+``FNAME`` is an unpacked time-series NetCDF file. Otherwise, a synthetic sparse
+plume is used. Note that the files are likely to be in the page cache when read.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import statistics
+import tempfile
+import time
+
+import click
+import netCDF4 as nc
+import numpy as np
+
+from geojav import sparse
+from geojav.benchmarks.netcdf import READS, synthesize
+from geojav.netcdf import save
+
+
+def size(path: Path) -> int:
+    """Return the size (bytes) of the file, or of all the files in the directory."""
+    if path.is_dir():
+        return sum(fname.stat().st_size for fname in path.iterdir())
+    return path.stat().st_size
+
+
+def percentiles(timings: list[float]) -> tuple[float, float]:
+    """Return the median and 95th percentile (ms) of the timings."""
+    timings = sorted(timings)
+    return statistics.median(timings) * 1000, timings[int(0.95 * (len(timings) - 1))] * 1000
+
+
+@click.command()
+@click.argument("fname", required=False, type=click.Path(exists=True, path_type=Path))
+@click.option("-r", "--reads", default=READS, show_default=True, help="Number of time steps read.")
+def main(fname: Path | None, reads: int) -> None:
+    import iris
+
+    iris.FUTURE.save_split_attrs = True
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+
+        if fname is None:
+            cube = synthesize()
+            fname = tmpdir / "series.nc"
+            save(cube, fname)
+        else:
+            cube = iris.load_cube(fname)
+
+        start = time.perf_counter()
+        plume = sparse.sparsify(cube.data)
+        store = sparse.path(tmpdir / fname.name)
+        sparse.save(plume, store)
+        elapsed = time.perf_counter() - start
+
+        plume = sparse.load(store)
+        density = plume.values.size / (plume.ncells * plume.nsteps)
+        nbytes = cube.data.nbytes / 1024**2
+        print(
+            f"\n{cube.summary(shorten=True)} ({nbytes:.1f}MiB uncompressed, "
+            f"{100 * density:.1f}% positive cells)\n"
+        )
+        print(f"\tsparsified and saved in {elapsed:.2f}s\n")
+
+        rng = np.random.default_rng(0)
+        steps = rng.integers(plume.nsteps, size=reads)
+        dense, frames = [], []
+
+        with nc.Dataset(fname) as ds:
+            # the data variable is the only variable spanning all dimensions
+            var = max(ds.variables.values(), key=lambda var: var.ndim)
+            for tstep in steps:
+                start = time.perf_counter()
+                np.ma.masked_less_equal(var[tstep][:], 0).filled(np.nan).flatten()
+                dense.append(time.perf_counter() - start)
+
+        for tstep in steps:
+            start = time.perf_counter()
+            # copy the memory mapped time step, as pyvista would
+            indices, values = (np.array(array) for array in plume[tstep])
+            frames.append(time.perf_counter() - start)
+
+        print(f"\t{'format':<8} {'size':>10} {'read p50':>10} {'read p95':>10}")
+        for label, path, timings in (("dense", fname, dense), ("sparse", store, frames)):
+            p50, p95 = percentiles(timings)
+            print(f"\t{label:<8} {size(path) / 1024**2:>8.2f}MiB {p50:>8.2f}ms {p95:>8.2f}ms")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
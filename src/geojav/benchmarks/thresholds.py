@@ -0,0 +1,84 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Compare thresholding a frame with searching its threshold index.
+
+The largest thresholded frame of a synthetic plume is thresholded at a range
+of percentiles of its values, as the renderers previously did when the
+threshold slider is moved, and the same cells are counted and extracted from
+the sorted frame with its threshold index, see :mod:`geojav.thresholds`.
+
+Execute with ``python -m geojav.benchmarks.thresholds``.
+
+"""
+
+from __future__ import annotations
+
+import time
+
+import click
+import numpy as np
+
+from geojav import thresholds
+from geojav.benchmarks.frames import thresholded
+from geojav.benchmarks.netcdf import synthesize
+from geojav.benchmarks.sparse import percentiles
+
+PERCENTILES: tuple[float, ...] = (10.0, 50.0, 90.0, 99.0)
+REPEATS: int = 20
+SHAPE: tuple[int, int, int, int] = (8, 40, 300, 400)
+
+
+@click.command()
+@click.option("-r", "--repeats", default=REPEATS, show_default=True, help="Number of repeats.")
+def main(repeats: int) -> None:
+    cube = synthesize(SHAPE)
+    frame = max(thresholded(cube.data), key=lambda frame: frame.n_cells)
+    print(f"\nFrame with {frame.n_cells} cells\n")
+
+    start = time.perf_counter()
+    ordered = thresholds.sort(frame)
+    print(f"\tsort {(time.perf_counter() - start) * 1000:.2f}ms (once, when prepared)")
+
+    start = time.perf_counter()
+    index = thresholds.ThresholdIndex(ordered)
+    print(f"\tindex {(time.perf_counter() - start) * 1000:.2f}ms\n")
+
+    print(
+        f"\t{'percentile':>10} {'cells':>9} {'threshold p50':>14} {'count p50':>10} "
+        f"{'extract p50':>12} {'extract p95':>12}"
+    )
+    for percentile in PERCENTILES:
+        value = float(np.nanpercentile(frame["data"], percentile))
+        filtered, counts, extracts = [], [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            expected = frame.threshold(value)
+            filtered.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            ncells = index.count(value)
+            counts.append(time.perf_counter() - start)
+
+            # a new index, as the same cells would otherwise be reused
+            index = thresholds.ThresholdIndex(ordered)
+            start = time.perf_counter()
+            result = index.extract(value)
+            extracts.append(time.perf_counter() - start)
+
+        assert ncells == result.n_cells == expected.n_cells
+        f50, _ = percentiles(filtered)
+        c50, _ = percentiles(counts)
+        e50, e95 = percentiles(extracts)
+        print(
+            f"\t{percentile:>10.0f} {ncells:>9} {f50:>12.2f}ms {c50:>8.3f}ms "
+            f"{e50:>10.2f}ms {e95:>10.2f}ms"
+        )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
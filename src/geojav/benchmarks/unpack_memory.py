@@ -0,0 +1,117 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Check that a streamed unpack of a long time-series stays within its memory budget.
+
+A synthetic time-series of one NetCDF file per time step is unpacked with
+:func:`geojav.stream.stream`, and the growth in the peak resident set size
+(RSS) of the process is compared against the memory budget.
+
+Execute with ``python -m geojav.benchmarks.unpack_memory``. Requires a POSIX
+platform, for :mod:`resource`.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import resource
+import sys
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from geojav.stream import stream
+
+BUDGET: int = 64
+NAME: str = "SULPHUR_DIOXIDE_AIR_CONCENTRATION"
+SHAPE: tuple[int, int, int] = (20, 200, 300)
+STEPS: int = 240
+
+
+def peak_rss() -> int:
+    """Return the peak resident set size (bytes) of the process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, whereas macos reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def synthesize(tmpdir: Path, steps: int, shape: tuple[int, int, int]) -> list[Path]:
+    """Create a time-series of one NetCDF file per time step, in bounded memory."""
+    import iris
+    from iris.coords import DimCoord
+    from iris.cube import Cube
+
+    rng = np.random.default_rng(0)
+    coords = [
+        (DimCoord(np.arange(n, dtype=float), long_name=name, units="1"), dim)
+        for dim, (name, n) in enumerate(zip(("altitude", "latitude", "longitude"), shape))
+    ]
+    fnames = []
+
+    for step in range(steps):
+        data = np.zeros(shape, dtype=np.float32)
+        # every fifth time step is empty
+        if step % 5:
+            data[:, : shape[1] // 2] = rng.random((shape[0], shape[1] // 2, shape[2]))
+        cube = Cube(data, long_name=NAME, units="g/m3", dim_coords_and_dims=coords)
+        cube.add_aux_coord(DimCoord(float(step), standard_name="time", units="hours since epoch"))
+        fname = tmpdir / f"Fields_grid1_C1_T{step}.nc"
+        iris.save(cube, fname)
+        fnames.append(fname)
+
+    return fnames
+
+
+@click.command()
+@click.option("-b", "--budget", default=BUDGET, show_default=True, help="Memory budget (MiB).")
+@click.option("-s", "--steps", default=STEPS, show_default=True, help="Number of time steps.")
+def main(budget: int, steps: int) -> None:
+    import iris
+
+    iris.FUTURE.save_split_attrs = True
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        fnames = synthesize(tmpdir, steps, SHAPE)
+        nbytes = np.prod(SHAPE) * np.dtype(np.float32).itemsize
+        total = steps * nbytes / 1024**2
+
+        print(f"\nStreaming {steps} time steps ({total:.1f}MiB) with {budget=}MiB ...\n")
+
+        def load(fnames: list[Path]) -> iris.cube.Cube:
+            return iris.load_cube(fnames, NAME)
+
+        def prepare(cube: iris.cube.Cube) -> iris.cube.Cube:
+            cube.convert_units("μg/m^3")
+            return cube
+
+        baseline = peak_rss()
+        start = time.perf_counter()
+        summary = stream(fnames, tmpdir / "series.nc", load, prepare=prepare, budget=budget)
+        elapsed = time.perf_counter() - start
+        growth = (peak_rss() - baseline) / 1024**2
+
+        cube = iris.load_cube(summary.fname)
+        expected = steps - len(range(0, steps, 5))
+
+    print(
+        f"\n\t{summary.nkept} of {summary.nsteps} time steps in {summary.nchunks} chunks, "
+        f"{elapsed:.2f}s, peak RSS growth={growth:.1f}MiB\n"
+    )
+
+    if cube.shape[0] != expected or summary.nkept != expected:
+        emsg = f"expected {expected} populated time steps, got {cube.shape[0]}"
+        raise SystemExit(emsg)
+
+    if growth > budget:
+        emsg = f"peak RSS growth exceeds the memory budget ({growth:.1f}MiB > {budget}MiB)"
+        raise SystemExit(emsg)
+
+
+if __name__ == "__main__":
+    main()
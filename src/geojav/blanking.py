@@ -0,0 +1,129 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Blanked frames, which keep the structured mesh and hide its inactive cells.
+
+Rather than thresholding the frame of each time step to an explicit
+:class:`pyvista.UnstructuredGrid`, with its own points, connectivity, offsets
+and cell types, a blanked frame is the structured mesh of the renderer, shared
+by every frame, see :mod:`geojav.scalars`, with the cells below the threshold
+hidden by a ``vtkGhostType`` cell array. Only the scalars and one byte per cell
+differ between frames, and moving the threshold only refills the ghost array.
+
+The hidden cells are never rendered, but other filters e.g., clipping or
+contouring, may still visit them, so the visible cells are extracted for
+these, see :func:`explicit`.
+
+Enable the blanked frames of the renderers with the ``GEOJAV_BLANKED_FRAMES``
+environment variable.
+
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from geojav import thresholds
+
+if TYPE_CHECKING:
+    import pyvista as pv
+
+__all__ = ["ENV", "GHOSTS", "HIDDEN", "BlankIndex", "enabled", "explicit"]
+
+ENV: str = "GEOJAV_BLANKED_FRAMES"
+GHOSTS: str = "vtkGhostType"
+# the ghost flag of a hidden cell i.e., vtkDataSetAttributes.HIDDENCELL
+HIDDEN: int = 32
+
+
+def enabled() -> bool:
+    """Determine whether the blanked frames are enabled."""
+    return os.environ.get(ENV, "").lower() not in ("", "0", "false", "no", "off")
+
+
+def explicit(frame: pv.DataSet) -> pv.DataSet:
+    """Return only the visible cells of a blanked frame, otherwise the frame."""
+    if GHOSTS not in frame.cell_data.keys():
+        return frame
+
+    name = frame.active_scalars_name
+    result = frame.extract_cells(
+        np.flatnonzero(frame.cell_data[GHOSTS] == 0),
+        pass_cell_ids=False,
+        pass_point_ids=False,
+    )
+    result.cell_data.remove(GHOSTS)
+    result.set_active_scalars(name, preference="cell")
+
+    return result
+
+
+class BlankIndex:
+    """The cells of a frame at or above a threshold, hidden rather than extracted.
+
+    The same interface as :class:`geojav.thresholds.ThresholdIndex`, for
+    frames of the whole structured mesh, with NaN in each inactive cell.
+
+    Parameters
+    ----------
+    frame : DataSet
+        The frame, which is not modified.
+    name : str, optional
+        The name of the cell data array to threshold. Defaults to the active
+        scalars of the frame.
+
+    """
+
+    def __init__(self, frame: pv.DataSet, name: str | None = None) -> None:
+        self.frame = frame
+        self.name = frame.active_scalars_name if name is None else name
+        self.values = np.asarray(frame.cell_data[self.name])
+        self.size = int(np.count_nonzero(~np.isnan(self.values)))
+        self._last: tuple[float, int, pv.DataSet] | None = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _visible(self, threshold: float) -> np.ndarray:
+        # NaN never compares at or above the threshold, so is always hidden
+        return self.values >= thresholds.bound(self.values.dtype, threshold)
+
+    def count(self, threshold: float) -> int:
+        """Return the number of cells at or above the threshold."""
+        if self._last is not None and self._last[0] == threshold:
+            return self._last[1]
+        return int(np.count_nonzero(self._visible(threshold)))
+
+    def extract(self, threshold: float) -> pv.DataSet:
+        """Return the frame, with the cells below the threshold hidden.
+
+        Equivalent to ``frame.threshold(threshold)`` when rendered, but the
+        frame keeps the structured mesh. A frame without visible cells is empty.
+
+        """
+        import pyvista as pv
+
+        if self._last is not None and self._last[0] == threshold:
+            return self._last[2]
+
+        visible = self._visible(threshold)
+        ncells = int(np.count_nonzero(visible))
+
+        if ncells:
+            # a new ghost array, rather than refilling that of a previous frame,
+            # which may still be rendered
+            ghosts = np.multiply(~visible, HIDDEN, dtype=np.uint8)
+            result = self.frame.copy(deep=False)
+            result.cell_data.set_array(ghosts, GHOSTS, deep_copy=False)
+            result.set_active_scalars(self.name, preference="cell")
+        else:
+            result = pv.UnstructuredGrid()
+
+        self._last = threshold, ncells, result
+
+        return result
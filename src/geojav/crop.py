@@ -0,0 +1,76 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Crop a time step to the bounding box of its active cells.
+
+The plume of a time step typically occupies a small sub-box of the domain, so
+only that sub-box need be read, assigned to the mesh and thresholded. The index
+bounding box of the active cells is either calculated from the time step, or
+read from the statistics sidecar of the time-series, see :mod:`geojav.stats`.
+
+The data of a time step is ordered ``(z, y, x)``, whereas the structured grid of
+the renderers is ordered ``(x, y, z)``, so the bounding box is reversed for the
+grid.
+
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+__all__ = ["active", "cell_ids", "is_empty", "voi"]
+
+
+def active(data: np.ndarray) -> tuple[slice, ...]:
+    """Return the index slices of the bounding box of the positive cells.
+
+    Parameters
+    ----------
+    data : ndarray or MaskedArray
+        The data of a time step.
+
+    Returns
+    -------
+    tuple of slice
+        The slice of each dimension. The slices are empty when there are no
+        positive cells.
+
+    """
+    positive = np.ma.filled(data, 0) > 0
+    slices = []
+
+    for dim in range(positive.ndim):
+        axes = tuple(axis for axis in range(positive.ndim) if axis != dim)
+        (indices,) = np.nonzero(positive.any(axis=axes))
+        slices.append(slice(int(indices[0]), int(indices[-1]) + 1) if indices.size else slice(0, 0))
+
+    return tuple(slices)
+
+
+def is_empty(slices: tuple[slice, ...]) -> bool:
+    """Determine whether the bounding box contains no cells."""
+    return any(item.stop <= item.start for item in slices)
+
+
+def voi(slices: tuple[slice, ...]) -> tuple[int, ...]:
+    """Return the structured grid volume of interest of the bounding box.
+
+    The volume of interest is the inclusive ``(imin, imax, jmin, jmax, kmin,
+    kmax)`` point extent of the cells of the ``(z, y, x)`` bounding box, as
+    required by :meth:`pyvista.StructuredGrid.extract_subset`.
+
+    """
+    return tuple(bound for item in reversed(slices) for bound in (item.start, item.stop))
+
+
+def cell_ids(slices: tuple[slice, ...], shape: tuple[int, ...]) -> np.ndarray:
+    """Return the flat cell indices of the domain, within the bounding box.
+
+    The indices are in the order of the cells of the cropped grid, without
+    allocating the whole domain.
+
+    """
+    grids = np.ogrid[tuple(slices)]
+    return np.ravel(np.ravel_multi_index(tuple(grids), shape))
@@ -0,0 +1,376 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Concurrent and resumable fetching of registry assets into the pooch cache."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING
+
+from geojav.lock import lock
+from geojav.verify import Stamps, file_hash, split_hash
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import pooch
+    import requests
+
+__all__ = ["WORKERS", "Download", "Downloader", "fetch_asset", "fetch_assets"]
+
+CHUNK_SIZE: int = 64 * 1024
+PARTIAL_SUFFIX: str = ".part"
+TIMEOUT: int = 60
+WORKERS: int = 8
+
+
+@dataclass
+class Download:
+    """Summary of fetching a single asset."""
+
+    fname: Path
+    nbytes: int = 0
+    offset: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def cached(self) -> bool:
+        return self.nbytes == 0 and self.offset == 0
+
+
+def _hasher(known_hash: str | None) -> tuple[hashlib._Hash | None, str | None]:
+    if known_hash is None:
+        return None, None
+
+    alg, digest = split_hash(known_hash)
+    return hashlib.new(alg), digest
+
+
+def _update(hasher: hashlib._Hash | None, fname: Path, chunk_size: int) -> None:
+    if hasher is None:
+        return
+
+    with fname.open("rb") as fin:
+        while chunk := fin.read(chunk_size):
+            hasher.update(chunk)
+
+
+class Downloader:
+    """Resumable HTTP downloader that shares a single session.
+
+    Bytes are streamed into a ``.part`` file alongside the target, which is
+    kept when a transfer is interrupted, and subsequently resumed with an HTTP
+    ``Range`` request. The registry hash is updated incrementally as the bytes
+    arrive, so the completed file is never re-read for verification before
+    being moved into place.
+
+    Reusing one :class:`requests.Session` across all worker threads keeps the
+    underlying connections alive between assets, rather than paying for a new
+    TCP/TLS handshake per file.
+
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        chunk_size: int = CHUNK_SIZE,
+        timeout: int = TIMEOUT,
+    ) -> None:
+        self.session = session
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def download(
+        self,
+        url: str,
+        fname: Path,
+        known_hash: str | None = None,
+        retry_if_failed: int = 0,
+    ) -> Download:
+        """Download the `url` to `fname`, resuming any previous partial transfer.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the asset.
+        fname : Path
+            The target file name of the asset.
+        known_hash : str, optional
+            The expected ``[alg:]digest`` of the asset. The algorithm defaults
+            to ``sha256``. Verification is skipped when not provided.
+        retry_if_failed : int, default=0
+            The number of times to retry after a network error or a hash
+            mismatch. Network errors resume from the partial file.
+
+        Returns
+        -------
+        Download
+
+        """
+        import requests.exceptions
+
+        result = Download(fname=fname)
+        start = time.perf_counter()
+
+        for attempt in range(1 + retry_if_failed):
+            try:
+                nbytes, offset = self._download(url, fname, known_hash)
+                result.nbytes += nbytes
+                result.offset = result.offset or offset
+                break
+            except requests.exceptions.RequestException:
+                if attempt == retry_if_failed:
+                    raise
+            except ValueError:
+                fname.with_name(f"{fname.name}{PARTIAL_SUFFIX}").unlink(missing_ok=True)
+                if attempt == retry_if_failed:
+                    raise
+            time.sleep(min(attempt + 1, 10))
+
+        result.elapsed = time.perf_counter() - start
+
+        return result
+
+    def _download(
+        self, url: str, fname: Path, known_hash: str | None
+    ) -> tuple[int, int]:
+        hasher, digest = _hasher(known_hash)
+        partial = fname.with_name(f"{fname.name}{PARTIAL_SUFFIX}")
+        partial.parent.mkdir(parents=True, exist_ok=True)
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        nbytes = 0
+
+        with self.session.get(
+            url, headers=headers, stream=True, timeout=self.timeout
+        ) as response:
+            if response.status_code == 416:
+                # the partial file already holds the complete content
+                response.close()
+            else:
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # the server ignored the range request, start afresh
+                    offset = 0
+                mode = "ab" if offset else "wb"
+                if offset:
+                    _update(hasher, partial, self.chunk_size)
+                with partial.open(mode) as fout:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        fout.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        nbytes += len(chunk)
+
+        if response.status_code == 416:
+            _update(hasher, partial, self.chunk_size)
+
+        if hasher is not None and hasher.hexdigest() != digest:
+            emsg = (
+                f"{hasher.name.upper()} hash of downloaded file ({fname.name}) "
+                f"does not match the known hash: expected {digest}, "
+                f"got {hasher.hexdigest()}."
+            )
+            raise ValueError(emsg)
+
+        os.replace(partial, fname)
+
+        return nbytes, offset
+
+
+def _matches(fname: Path, known_hash: str | None) -> bool:
+    if known_hash is None:
+        return True
+
+    alg, digest = split_hash(known_hash)
+    return file_hash(fname, alg=alg) == digest
+
+
+def _stat(fname: Path) -> tuple[int, int] | None:
+    try:
+        stat = fname.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _session(workers: int) -> requests.Session:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def _size(nbytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024 or unit == "GB":
+            break
+        nbytes /= 1024
+
+    return f"{nbytes:.1f} {unit}"
+
+
+def fetch_asset(
+    asset: str,
+    downloader: Downloader | None = None,
+    cache: pooch.Pooch | None = None,
+    stamps: Stamps | None = None,
+) -> Download:
+    """Fetch the registry asset into the cache, unless it is already available.
+
+    Parameters
+    ----------
+    asset : str
+        The registry name of the asset.
+    downloader : Downloader, optional
+        The downloader to use. Defaults to a downloader with its own session.
+    cache : Pooch, optional
+        The pooch instance managing the asset. Defaults to
+        :data:`geojav.CACHE`.
+    stamps : Stamps, optional
+        The verification stamps of the `cache`. When provided, a cached asset
+        is only trusted if it is stamped as verified, and a fetched asset is
+        stamped. Otherwise, a cached asset is hashed to verify it.
+
+    Returns
+    -------
+    Download
+
+    """
+    if cache is None:
+        from geojav import CACHE as cache
+
+    if downloader is None:
+        downloader = Downloader(_session(1))
+
+    fname = Path(cache.abspath) / asset
+    known_hash = cache.registry[asset]
+    before = _stat(fname)
+
+    if before is not None:
+        if stamps is not None:
+            available = stamps.check(asset, fname, known_hash)
+        else:
+            available = _matches(fname, known_hash)
+        if available:
+            return Download(fname=fname)
+
+    # serialize fetching the asset across threads and processes sharing the
+    # cache, so that concurrent jobs trigger only one download
+    with lock(fname):
+        after = _stat(fname)
+        if after is not None and after != before and _matches(fname, known_hash):
+            # another job fetched the asset while we waited on the lock
+            download = Download(fname=fname)
+        else:
+            download = downloader.download(
+                cache.get_url(asset),
+                fname,
+                known_hash=known_hash,
+                retry_if_failed=cache.retry_if_failed,
+            )
+
+    if stamps is not None:
+        stamps.stamp(asset, fname, known_hash)
+
+    return download
+
+
+def fetch_assets(
+    assets: Iterable[str],
+    workers: int = WORKERS,
+    cache: pooch.Pooch | None = None,
+    reverify: bool = False,
+) -> list[Path]:
+    """Fetch the registry assets with a bounded pool of worker threads.
+
+    Cached assets with a valid verification stamp are trusted without being
+    re-read. Any other cached assets are first hashed in parallel, and those
+    that fail verification are fetched again.
+
+    Parameters
+    ----------
+    assets : iterable of str
+        The registry names of the assets to fetch.
+    workers : int, default=WORKERS
+        The maximum number of concurrent downloads.
+    cache : Pooch, optional
+        The pooch instance managing the assets. Defaults to
+        :data:`geojav.CACHE`.
+    reverify : bool, default=False
+        Discard the verification stamps, and re-hash every cached asset.
+
+    Returns
+    -------
+    list of Path
+        The local path of each asset, in the same order as `assets`.
+
+    """
+    if cache is None:
+        from geojav import CACHE as cache
+
+    assets = list(assets)
+    stamps = Stamps.load(cache)
+
+    if reverify:
+        stamps.clear()
+
+    stamps.verify(assets, cache)
+
+    workers = max(1, min(workers, len(assets) or 1))
+    downloader = Downloader(_session(workers))
+
+    downloads: dict[str, Download] = {}
+    n_assets = len(assets)
+    width = len(str(n_assets))
+    start = time.perf_counter()
+
+    try:
+        with downloader.session, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    fetch_asset, asset, downloader=downloader, cache=cache, stamps=stamps
+                ): asset
+                for asset in assets
+            }
+            for i, future in enumerate(as_completed(futures), start=1):
+                asset = futures[future]
+                downloads[asset] = download = future.result()
+                if download.cached:
+                    status = "cached"
+                else:
+                    rate = download.nbytes / download.elapsed if download.elapsed else 0
+                    status = (
+                        f"{_size(download.nbytes)} in {download.elapsed:.2f}s "
+                        f"({_size(rate)}/s)"
+                    )
+                    if download.offset:
+                        status += f", resumed at {_size(download.offset)}"
+                print(f"\t[{i:>{width}}/{n_assets}] {asset}: {status}")
+    finally:
+        stamps.save()
+
+    elapsed = time.perf_counter() - start
+    fetched = [download for download in downloads.values() if not download.cached]
+    total = sum(download.nbytes for download in fetched)
+    rate = total / elapsed if elapsed else 0
+    print(
+        f"\n\tFetched {len(fetched)} of {n_assets} assets, "
+        f"{_size(total)} in {elapsed:.2f}s ({_size(rate)}/s, {workers=})"
+    )
+
+    return [downloads[asset].fname for asset in assets]
@@ -0,0 +1,572 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Consolidated store of the thresholded frames of a time-series.
+
+Rather than a legacy VTK file per time step, all of the frames rendered from a
+time-series are stored in a single compressed NetCDF4 (HDF5) file, with a group
+per time step, so that any time step may be read, or written, independently.
+
+Each frame is stored as compact arrays i.e., its points, its ``int32`` cell
+connectivity and offsets, its ``uint8`` cell types, and each of its point, cell
+and field data arrays. The frame is rebuilt from the arrays without parsing,
+and each array is compressed with a fast codec, see :func:`geojav.netcdf.codecs`.
+
+The store is versioned by the identity of the time-series i.e., the size and
+modification time of its file, see :func:`identity`, and by the parameters that
+the frames are prepared with, so that stale frames are never served, see
+:func:`generation` and :func:`collect`.
+
+Recently rendered frames are also held in memory, in front of the store, up to
+a byte budget, which may be configured with the ``GEOJAV_FRAME_BUDGET``
+environment variable (MiB).
+
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import ExitStack
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import threading
+from typing import TYPE_CHECKING, Any
+import uuid
+
+import numpy as np
+
+import netCDF4 as nc
+
+from geojav.lock import lock
+from geojav.netcdf import codecs
+
+if TYPE_CHECKING:
+    import pyvista as pv
+
+__all__ = [
+    "BUDGET",
+    "CODEC",
+    "COMPLEVEL",
+    "CORRUPT",
+    "FORMAT",
+    "LOCK",
+    "SUFFIX",
+    "FrameCache",
+    "FrameStore",
+    "Packed",
+    "collect",
+    "digest",
+    "generation",
+    "identity",
+    "pack",
+]
+
+ACTIVE: str = "active_scalars"
+ATTRIBUTES: tuple[str, ...] = ("point_data", "cell_data", "field_data")
+BUDGET: int = 512 * 1024**2
+BUDGET_ENV: str = "GEOJAV_FRAME_BUDGET"
+CELLTYPES: str = "celltypes"
+CODEC: str = "blosc_lz4"
+COMPLEVEL: int = 5
+CONNECTIVITY: str = "connectivity"
+# the suffix of a store that cannot be opened, which is set aside
+CORRUPT: str = ".corrupt"
+DIGEST_SIZE: int = 8
+FALLBACK: str = "zlib"
+# the version of the preparation of the frames, which is bumped whenever the
+# frames prepared from the same content change
+FORMAT: int = 3
+KEY: str = "key"
+# the smallest array (bytes) compressed, as the blosc filter fails to compress,
+# rather than stores, a tiny buffer
+MIN_NBYTES: int = 1024
+OFFSETS: str = "offsets"
+POINTS: str = "points"
+SEPARATOR: str = ":"
+STALE: str = "stale_"
+SUFFIX: str = ".frames.nc"
+
+# serialise all access to the HDF5 library, which is not thread-safe, and is
+# shared by every frame store and netCDF4 dataset of the process
+LOCK: threading.RLock = threading.RLock()
+# the netCDF errors of a file that is not a valid store i.e., NC_ENOTNC and
+# NC_EHDFERR, which is also raised for a file locked by another process
+NC_ERRORS: tuple[int, ...] = (-51, -101)
+
+
+def _group(tstep: int) -> str:
+    return f"tstep_{tstep}"
+
+
+def _locked(fname: Path) -> bool:
+    # whether another process holds the hdf5 lock of the file, which is only
+    # probed on posix, as a locked file may not be renamed on windows
+    if os.name == "nt":
+        return False
+
+    import fcntl
+
+    with fname.open("rb") as fh:
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    return False
+
+
+def _index_dtype(frame: pv.UnstructuredGrid) -> np.dtype:
+    # the smallest dtype of the cell connectivity and offsets of the frame
+    small = np.dtype("int32")
+    return small if frame.cell_connectivity.size <= np.iinfo(small).max else np.dtype("int64")
+
+
+@dataclass
+class Packed:
+    """The compact arrays of a frame, which are cheap to pickle between processes."""
+
+    arrays: dict[str, np.ndarray]
+    active: str | None = None
+
+    @property
+    def ncells(self) -> int:
+        """The number of cells of the frame."""
+        return self.arrays[CELLTYPES].size if CELLTYPES in self.arrays else 0
+
+    def unpack(self) -> pv.UnstructuredGrid:
+        """Rebuild the frame."""
+        return _build(self.arrays, self.active)
+
+
+def pack(frame: pv.UnstructuredGrid) -> Packed:
+    """Return the compact arrays of the frame. An empty frame has no arrays."""
+    arrays = _arrays(frame) if frame.n_cells else {}
+    return Packed(arrays=arrays, active=frame.active_scalars_name if arrays else None)
+
+
+def _arrays(frame: pv.UnstructuredGrid) -> dict[str, np.ndarray]:
+    dtype = _index_dtype(frame)
+    arrays = {
+        POINTS: np.asarray(frame.points),
+        CONNECTIVITY: frame.cell_connectivity.astype(dtype, copy=False),
+        OFFSETS: frame.cell_offsets.astype(dtype, copy=False),
+        CELLTYPES: np.asarray(frame.celltypes, dtype=np.uint8),
+    }
+    for attribute in ATTRIBUTES:
+        data = getattr(frame, attribute)
+        arrays.update(
+            {f"{attribute}{SEPARATOR}{name}": np.asarray(data[name]) for name in data.keys()}
+        )
+
+    return arrays
+
+
+def _build(arrays: dict[str, np.ndarray], active: str | None) -> pv.UnstructuredGrid:
+    import pyvista as pv
+    from vtkmodules.util.numpy_support import numpy_to_vtk
+    from vtkmodules.vtkCommonDataModel import vtkCellArray
+
+    frame = pv.UnstructuredGrid()
+    if POINTS not in arrays:
+        return frame
+
+    cells = vtkCellArray()
+    cells.SetData(
+        numpy_to_vtk(arrays[OFFSETS], deep=True),
+        numpy_to_vtk(arrays[CONNECTIVITY], deep=True),
+    )
+    frame.points = arrays[POINTS]
+    frame.SetCells(numpy_to_vtk(arrays[CELLTYPES], deep=True), cells)
+
+    for key, array in arrays.items():
+        attribute, sep, name = key.partition(SEPARATOR)
+        if sep:
+            getattr(frame, attribute)[name] = array
+
+    if active is not None:
+        frame.set_active_scalars(active, preference="cell")
+
+    return frame
+
+
+class FrameStore:
+    """Random access store of the thresholded frame of each time step.
+
+    The store is opened for appending, and is created if it does not exist.
+    A store that cannot be opened e.g., left corrupt by an interrupted write,
+    is set aside with a ``.corrupt`` suffix and recreated, as its frames may
+    always be rebuilt. A store that is locked by another process is never set
+    aside.
+
+    The store has a single writer, so the process holds the lock of the store,
+    see :func:`geojav.lock.lock`, until the store is closed. A store locked by
+    another process e.g., pre-warming the store, raises a :class:`TimeoutError`,
+    unless `detach`, in which case the store is detached i.e., no frame is read
+    from, or written to, the store, so that the frames are only held in memory.
+
+    Each frame may be stored with a key of the content it was prepared from,
+    see :func:`digest`, in which case the frame is only returned for the same
+    key. A stale frame is replaced when its time step is stored again, and the
+    space of the stale frames is reclaimed when the store is next opened.
+
+    Access to the store is serialised by :data:`LOCK`, as the HDF5 library is
+    not thread-safe.
+
+    """
+
+    def __init__(
+        self,
+        fname: str | Path,
+        codec: str | None = None,
+        complevel: int = COMPLEVEL,
+        timeout: float | None = 0.0,
+        detach: bool = False,
+    ) -> None:
+        self.fname = Path(fname)
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+        if codec is None:
+            codec = CODEC if CODEC in codecs() else FALLBACK
+        self.codec = codec
+        self.complevel = complevel
+        self._lock = LOCK
+        self._ds: nc.Dataset | None = None
+        # the lock of the single writer, which is held until the store is closed
+        self._writer = ExitStack()
+        try:
+            self._writer.enter_context(lock(self.fname, timeout=timeout))
+        except TimeoutError:
+            if detach:
+                return
+            emsg = (
+                f"The frame store {str(self.fname)!r} is in use by another process "
+                "e.g., a renderer, or a pre-warm of the store."
+            )
+            raise TimeoutError(emsg) from None
+
+        try:
+            with self._lock:
+                self._ds = self._open()
+        except BaseException:
+            self._writer.close()
+            raise
+
+    def _open(self) -> nc.Dataset:
+        if self.fname.exists():
+            try:
+                ds = nc.Dataset(self.fname, "a")
+            except OSError as err:
+                if err.errno not in NC_ERRORS or _locked(self.fname):
+                    raise
+                os.replace(self.fname, self.fname.with_name(f"{self.fname.name}{CORRUPT}"))
+            else:
+                if any(name.startswith(STALE) for name in ds.groups):
+                    ds = self._compact(ds)
+                return ds
+
+        return nc.Dataset(self.fname, "w", format="NETCDF4")
+
+    def _compact(self, ds: nc.Dataset) -> nc.Dataset:
+        # groups may not be deleted, so rewrite only the current frames
+        tmp = self.fname.with_name(f".{self.fname.name}")
+        with nc.Dataset(tmp, "w", format="NETCDF4") as compact:
+            for name, group in ds.groups.items():
+                if not name.startswith(STALE):
+                    self._write(compact, name, *self._read(group))
+        ds.close()
+        os.replace(tmp, self.fname)
+
+        return nc.Dataset(self.fname, "a")
+
+    @staticmethod
+    def _read(group: nc.Group) -> tuple[dict[str, np.ndarray], str | None, str | None]:
+        group.set_auto_maskandscale(False)
+        arrays = {
+            name: var[:].reshape(var.getncattr("shape")) for name, var in group.variables.items()
+        }
+        return arrays, getattr(group, ACTIVE, None), getattr(group, KEY, None)
+
+    def _write(
+        self,
+        ds: nc.Dataset,
+        name: str,
+        arrays: dict[str, np.ndarray],
+        active: str | None,
+        key: str | None,
+    ) -> None:
+        compression = None if self.codec in (None, "none") else self.codec
+        group = ds.createGroup(name)
+        if active is not None and arrays:
+            group.setncattr(ACTIVE, active)
+        if key is not None:
+            group.setncattr(KEY, key)
+
+        for aname, array in arrays.items():
+            group.createDimension(aname, array.size)
+            if array.dtype.kind in "OSU":
+                var = group.createVariable(aname, str, (aname,))
+                var[:] = array.ravel().astype(object)
+            else:
+                codec = compression if array.nbytes >= MIN_NBYTES else None
+                var = group.createVariable(
+                    aname,
+                    array.dtype,
+                    (aname,),
+                    compression=codec,
+                    complevel=self.complevel,
+                    shuffle=True,
+                    chunksizes=(array.size,) if codec else None,
+                )
+                var[:] = array.ravel()
+            var.setncattr("shape", list(array.shape))
+
+    def __contains__(self, tstep: int) -> bool:
+        if self.detached:
+            return False
+        with self._lock:
+            return _group(tstep) in self._ds.groups
+
+    def __len__(self) -> int:
+        if self.detached:
+            return 0
+        with self._lock:
+            return sum(not name.startswith(STALE) for name in self._ds.groups)
+
+    def __enter__(self) -> FrameStore:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def detached(self) -> bool:
+        """Whether the store is in use by another process, so is never read or written."""
+        return self._ds is None
+
+    def close(self) -> None:
+        """Close the store, and release its lock."""
+        with self._lock:
+            if not self.detached and self._ds.isopen():
+                self._ds.close()
+        self._writer.close()
+
+    def stored(self, tstep: int, key: str | None = None) -> bool:
+        """Determine whether the time step is stored, with the same `key`."""
+        if self.detached:
+            return False
+        with self._lock:
+            if (group := self._ds.groups.get(_group(tstep))) is None:
+                return False
+            return key is None or getattr(group, KEY, None) == key
+
+    def get(self, tstep: int, key: str | None = None) -> pv.UnstructuredGrid | None:
+        """Return the frame of the time step.
+
+        Returns ``None`` if the time step is not stored, or if it is stored
+        with a different `key`.
+
+        """
+        if self.detached:
+            return None
+        with self._lock:
+            if (group := self._ds.groups.get(_group(tstep))) is None:
+                return None
+            if key is not None and getattr(group, KEY, None) != key:
+                return None
+
+            arrays, active, _ = self._read(group)
+
+        return _build(arrays, active)
+
+    def put(
+        self,
+        tstep: int,
+        frame: pv.UnstructuredGrid | Packed,
+        key: str | None = None,
+    ) -> None:
+        """Store the frame, or packed frame, of the time step, with the `key` of its content.
+
+        Storing the frame of a time step again, with the same key, has no
+        effect. An empty frame is stored as an empty group. A frame is never
+        stored by a detached store.
+
+        """
+        if self.detached:
+            return
+        packed = frame if isinstance(frame, Packed) else pack(frame)
+
+        with self._lock:
+            if (group := self._ds.groups.get(name := _group(tstep))) is not None:
+                if getattr(group, KEY, None) == key:
+                    return
+                # the stale frame is set aside, until the store is compacted
+                self._ds.renameGroup(name, f"{STALE}{uuid.uuid4().hex}")
+
+            self._write(self._ds, name, packed.arrays, packed.active, key)
+            # flush the frame, to narrow the window in which an interrupted
+            # process may leave the store corrupt
+            self._ds.sync()
+
+
+def digest(*parts: Any) -> str:
+    """Return a short hash of the parts, to key the frames or their store.
+
+    Arrays are hashed by their dtype, shape and content, and any other part by
+    its representation.
+
+    """
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            hasher.update(f"{part.dtype.str}{part.shape}".encode())
+            hasher.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, bytes):
+            hasher.update(part)
+        else:
+            hasher.update(repr(part).encode())
+
+    return hasher.hexdigest()
+
+
+def identity(path: str | Path) -> tuple[int, int]:
+    """Return the size and latest modification time (ns) of the file or directory."""
+    path = Path(path)
+    fnames = [path] if path.is_file() else [fname for fname in path.rglob("*") if fname.is_file()]
+    stats = [fname.stat() for fname in fnames]
+
+    return sum(stat.st_size for stat in stats), max((stat.st_mtime_ns for stat in stats), default=0)
+
+
+def generation(cache_dir: str | Path, name: str, *params: Any) -> Path:
+    """Return the frame store of the time-series, versioned by its parameters.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        The directory of the frame stores.
+    name : str
+        The name of the time-series.
+    *params : any
+        The identity of the time-series, see :func:`identity`, and the
+        parameters that the frames are prepared with e.g., the variable and
+        the geometry of the mesh. The frames of different parameters are kept
+        in different generations of the store, see :func:`collect`.
+
+    """
+    version = digest(FORMAT, *params)
+    return Path(cache_dir) / f"{name}-{version}" / f"{name}{SUFFIX}"
+
+
+def collect(fname: str | Path) -> list[Path]:
+    """Remove all of the other generations of the frame store.
+
+    A generation whose store is in use by another process is kept.
+
+    Returns
+    -------
+    list of Path
+        The directories of the generations removed.
+
+    """
+    fname = Path(fname)
+    name, _, _ = fname.parent.name.rpartition("-")
+    removed = []
+
+    for path in fname.parent.parent.glob(f"{name}-*"):
+        if path.is_dir() and path != fname.parent and (path / fname.name).exists():
+            try:
+                with lock(path / fname.name, timeout=0.0):
+                    shutil.rmtree(path, ignore_errors=True)
+            except TimeoutError:
+                continue
+            removed.append(path)
+
+    return removed
+
+
+def _budget() -> int:
+    # the byte budget may be configured (MiB) with the environment variable
+    if (budget := os.environ.get(BUDGET_ENV)) is None:
+        return BUDGET
+
+    return int(float(budget) * 1024**2)
+
+
+class FrameCache:
+    """In-memory least recently used cache of frames, bounded by a byte budget.
+
+    The least recently used frames are evicted whenever the frames cached
+    exceed the budget. A frame larger than the whole budget is never cached.
+
+    Frames are cached, and returned, as shallow copies, so that a consumer
+    setting the arrays of a frame does not modify the cached frame.
+
+    """
+
+    def __init__(self, budget: int | None = None) -> None:
+        self.budget = _budget() if budget is None else budget
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._frames: OrderedDict[int, tuple[pv.UnstructuredGrid, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, tstep: int) -> bool:
+        with self._lock:
+            return tstep in self._frames
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(frames={len(self)}, nbytes={self.nbytes}, "
+            f"budget={self.budget}, hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions})"
+        )
+
+    def clear(self) -> None:
+        """Remove all the frames, but not the counters."""
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    def get(self, tstep: int) -> pv.UnstructuredGrid | None:
+        """Return the frame of the time step, or ``None`` if not cached."""
+        with self._lock:
+            if (item := self._frames.get(tstep)) is None:
+                self.misses += 1
+                return None
+
+            self._frames.move_to_end(tstep)
+            self.hits += 1
+
+        return item[0].copy(deep=False)
+
+    def put(self, tstep: int, frame: pv.UnstructuredGrid) -> None:
+        """Cache the frame of the time step, evicting the least recently used."""
+        # the memory of the frame and its arrays, which is reported in KiB
+        nbytes = frame.actual_memory_size * 1024
+        frame = frame.copy(deep=False)
+
+        with self._lock:
+            if (item := self._frames.pop(tstep, None)) is not None:
+                self.nbytes -= item[1]
+
+            if nbytes > self.budget:
+                return
+
+            self._frames[tstep] = (frame, nbytes)
+            self.nbytes += nbytes
+
+            while self.nbytes > self.budget:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
@@ -0,0 +1,100 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Advisory inter-process file locking."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+__all__ = ["LOCK_SUFFIX", "lock"]
+
+LOCK_SUFFIX: str = ".lock"
+POLL: float = 0.1
+
+
+@contextmanager
+def lock(
+    fname: str | Path,
+    poll: float = POLL,
+    timeout: float | None = None,
+) -> Iterator[Path]:
+    """Hold an exclusive advisory lock on `fname` for the duration of the context.
+
+    The lock is held on a sibling ``.lock`` file, which is deliberately never
+    removed, as unlinking a lock file that another process is waiting on would
+    allow two processes to hold the "same" lock. The lock is released by the
+    operating system should the holding process die.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The file name to lock.
+    poll : float, default=POLL
+        The interval (seconds) between attempts to acquire the lock, on
+        platforms without a blocking lock primitive, or with a `timeout`.
+    timeout : float, optional
+        The maximum time (seconds) to wait for the lock, otherwise a
+        :class:`TimeoutError` is raised. Defaults to waiting indefinitely.
+
+    Yields
+    ------
+    Path
+        The file name of the lock.
+
+    """
+    fname = Path(fname)
+    lname = fname.with_name(f"{fname.name}{LOCK_SUFFIX}")
+    lname.parent.mkdir(parents=True, exist_ok=True)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def wait() -> None:
+        if deadline is not None and time.monotonic() >= deadline:
+            emsg = f"Timed out waiting for the lock of {str(fname)!r}."
+            raise TimeoutError(emsg)
+        time.sleep(poll)
+
+    with lname.open("a+b") as fh:
+        fd = fh.fileno()
+
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    fh.seek(0)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    wait()
+            try:
+                yield lname
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            if deadline is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        wait()
+            try:
+                yield lname
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
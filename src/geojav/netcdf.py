@@ -0,0 +1,251 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Save, and append time steps to, a NetCDF time-series.
+
+The time-series has an unlimited time dimension, and its data variable is
+chunked by time step, as each time step is read individually when rendered.
+
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import netCDF4 as nc
+
+if TYPE_CHECKING:
+    from iris.cube import Cube
+
+__all__ = [
+    "CODEC",
+    "COMPLEVEL",
+    "RANGE",
+    "append",
+    "codecs",
+    "last_time",
+    "read_range",
+    "save",
+    "update_range",
+]
+
+CODEC: str = "zlib"
+COMPLEVEL: int = 4
+RANGE: str = "actual_range"
+UNLIMITED: list[str] = ["time"]
+
+
+class _Dataset(nc.Dataset):
+    """Dataset that compresses the data variable created by iris with a codec.
+
+    The iris saver only supports the ``zlib`` codec, so any other codec
+    supported by the netCDF4 build is substituted when iris creates the
+    compressed data variable. The HDF5 shuffle filter is only applied with
+    ``zlib`` by netCDF4, so the shuffle of the ``blosc`` codecs is passed as
+    their own byte shuffle, and is dropped for any other codec.
+
+    """
+
+    def __init__(self, fname: str | Path, codec: str) -> None:
+        super().__init__(fname, "w", format="NETCDF4")
+        # bypass the netCDF attributes of the dataset
+        self.__dict__["codec"] = codec
+
+    def createVariable(self, varname, datatype, dimensions=(), **kwargs):  # noqa: N802
+        if kwargs.pop("zlib", False):
+            kwargs["compression"] = self.codec
+            shuffle = kwargs.pop("shuffle", False)
+            if self.codec.startswith("blosc_"):
+                kwargs["blosc_shuffle"] = int(shuffle)
+        return super().createVariable(varname, datatype, dimensions, **kwargs)
+
+
+def codecs() -> list[str]:
+    """Return the compression codecs supported by the netCDF4 build."""
+    blosc = nc.__has_blosc_support__
+    supported = {
+        "zlib": True,
+        "zstd": nc.__has_zstandard_support__,
+        "bzip2": nc.__has_bzip2_support__,
+        "blosc_lz4": blosc,
+        "blosc_zstd": blosc,
+    }
+
+    return ["none", *(codec for codec, available in supported.items() if available)]
+
+
+def _variable(ds: nc.Dataset, name: str) -> nc.Variable:
+    for var in ds.variables.values():
+        names = (var.name, getattr(var, "long_name", None), getattr(var, "standard_name", None))
+        if name in names:
+            return var
+
+    emsg = f"No variable {name!r} in {ds.filepath()!r}."
+    raise KeyError(emsg)
+
+
+def save(
+    cube: Cube,
+    fname: str | Path,
+    codec: str | None = CODEC,
+    complevel: int = COMPLEVEL,
+    shuffle: bool = True,
+    **kwargs,
+) -> None:
+    """Save the cube with an unlimited time dimension, so that it may be appended.
+
+    The data is chunked by time step, unless otherwise specified with the
+    ``chunksizes`` keyword.
+
+    Parameters
+    ----------
+    cube : Cube
+        The time-series to save.
+    fname : str or Path
+        The NetCDF file name.
+    codec : str, default=CODEC
+        The compression codec of the data, see :func:`codecs`. Use ``None``
+        or ``"none"`` to save the data uncompressed.
+    complevel : int, default=COMPLEVEL
+        The compression level of the codec.
+    shuffle : bool, default=True
+        Shuffle the bytes before compression i.e., the HDF5 shuffle filter for
+        ``zlib``, or the byte shuffle of the ``blosc`` codecs. Ignored by the
+        ``zstd`` and ``bzip2`` codecs, which netCDF4 never shuffles.
+    **kwargs : dict, optional
+        Passed through to :func:`iris.save`.
+
+    """
+    import iris
+
+    if (tdim := cube.coord_dims("time")) and "chunksizes" not in kwargs:
+        chunksizes = list(cube.shape)
+        chunksizes[tdim[0]] = 1
+        kwargs["chunksizes"] = tuple(chunksizes)
+
+    kwargs.update(unlimited_dimensions=UNLIMITED, complevel=complevel, shuffle=shuffle)
+
+    if codec in (None, "none", "zlib"):
+        iris.save(cube, fname, zlib=codec == "zlib", **kwargs)
+        return
+
+    if codec not in codecs():
+        emsg = f"Unsupported NetCDF codec {codec!r}, expected one of {', '.join(codecs())}."
+        raise ValueError(emsg)
+
+    # iris defers writing any lazy data to a user-provided dataset until
+    # after it is closed
+    with _Dataset(fname, codec) as ds:
+        delayed = iris.save(cube, ds, saver="nc", zlib=True, compute=False, **kwargs)
+
+    delayed.compute()
+
+
+def append(cube: Cube, fname: str | Path) -> int:
+    """Append the time steps of the cube to an existing NetCDF time-series.
+
+    The file must have been created with :func:`save` from a compatible cube,
+    with time as its leading dimension. Only the data, along with the points
+    and bounds of the coordinates spanning time, are appended.
+
+    Parameters
+    ----------
+    cube : Cube
+        The time steps to append.
+    fname : str or Path
+        The NetCDF file name.
+
+    Returns
+    -------
+    int
+        The number of time steps in the file, after appending.
+
+    """
+    from cf_units import Unit
+
+    (tdim,) = cube.coord_dims("time")
+    if tdim != 0:
+        emsg = f"Expected time to be the leading dimension, got dimension {tdim}."
+        raise ValueError(emsg)
+
+    with nc.Dataset(fname, "a") as ds:
+        var = _variable(ds, cube.name())
+        start = len(ds.dimensions[var.dimensions[0]])
+        stop = start + cube.shape[0]
+
+        for coord in cube.coords(dimensions=tdim):
+            # as with iris, an unnamed variable is named after its coordinate
+            if (cvar := ds.variables.get(coord.var_name or coord.name())) is None:
+                continue
+            coord = coord.copy()
+            if hasattr(cvar, "units"):
+                coord.convert_units(Unit(cvar.units, calendar=getattr(cvar, "calendar", None)))
+            cvar[start:stop] = coord.points
+            if coord.has_bounds() and (bounds := getattr(cvar, "bounds", None)) in ds.variables:
+                ds.variables[bounds][start:stop] = coord.bounds
+
+        var[start:stop] = cube.data
+
+    return stop
+
+
+def last_time(fname: str | Path) -> datetime | None:
+    """Return the latest time stored in the NetCDF time-series, if any."""
+    from cf_units import Unit
+
+    with nc.Dataset(fname) as ds:
+        if (var := ds.variables.get("time")) is None or not var.size:
+            return None
+        unit = Unit(var.units, calendar=getattr(var, "calendar", None))
+        latest = unit.num2pydate(np.max(var[:]))
+
+    return latest
+
+
+def read_range(fname: str | Path, name: str) -> tuple[float, float] | None:
+    """Return the stored data range of the named variable, if any."""
+    with nc.Dataset(fname) as ds:
+        var = _variable(ds, name)
+        if RANGE not in var.ncattrs():
+            return None
+        dmin, dmax = var.getncattr(RANGE)
+
+    return float(dmin), float(dmax)
+
+
+def update_range(
+    fname: str | Path, name: str, dmin: float, dmax: float, merge: bool = True
+) -> tuple[float, float]:
+    """Update the stored data range of the named variable in place.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The NetCDF file name.
+    name : str
+        The name of the data variable.
+    dmin, dmax : float
+        The data range.
+    merge : bool, default=True
+        Widen any existing stored range, rather than replacing it.
+
+    Returns
+    -------
+    tuple of float
+        The stored data range.
+
+    """
+    with nc.Dataset(fname, "a") as ds:
+        var = _variable(ds, name)
+        if merge and RANGE in var.ncattrs():
+            current = var.getncattr(RANGE)
+            dmin, dmax = min(dmin, float(current[0])), max(dmax, float(current[1]))
+        var.setncattr(RANGE, np.array([dmin, dmax], dtype=var.dtype))
+
+    return float(dmin), float(dmax)
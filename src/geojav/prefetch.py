@@ -0,0 +1,177 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Background preparation of the frames of the neighbouring time steps.
+
+As the time step slider is scrubbed, the frames of the next time steps in the
+direction of scrubbing, and of the previous time step, are prepared by a pool
+of worker threads, so that the renderer finds them in the frame cache, see
+:class:`geojav.frames.FrameCache`, rather than preparing them on the Qt thread.
+
+Frames are prepared concurrently, so the shared mesh is never modified, and
+each thread extracts its frames from its own shallow copy of the mesh, see
+:func:`local`. Any array that is not thread-safe to read e.g., a NetCDF
+variable, is wrapped with :class:`Serialised`.
+
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import pyvista as pv
+
+__all__ = ["AHEAD", "BEHIND", "WORKERS", "Prefetcher", "Serialised", "local"]
+
+AHEAD: int = 4
+BEHIND: int = 1
+WORKERS: int = 2
+
+_local = threading.local()
+
+
+def local(mesh: pv.DataSet) -> pv.DataSet:
+    """Return the shallow copy of the mesh owned by the calling thread.
+
+    The copy shares the arrays of the mesh, but none of the state that VTK
+    lazily builds on a mesh when extracting from it.
+
+    """
+    meshes = _local.__dict__.setdefault("meshes", {})
+    if (item := meshes.get(id(mesh))) is None or item[0] is not mesh:
+        item = meshes[id(mesh)] = (mesh, mesh.copy(deep=False))
+
+    return item[1]
+
+
+class Serialised:
+    """Serialise the reads of an array that is not thread-safe.
+
+    Other attributes of the array are delegated, without the lock.
+
+    """
+
+    def __init__(self, array: Any, lock: threading.RLock) -> None:
+        self.array = array
+        self.lock = lock
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.array, name)
+
+    def __getitem__(self, key: Any) -> Any:
+        with self.lock:
+            return self.array[key]
+
+
+class Prefetcher:
+    """Prepare the frames of the neighbouring time steps in the background.
+
+    Parameters
+    ----------
+    prepare : callable
+        Prepare, and cache, the frame of a time step.
+    nsteps : int
+        The number of time steps, which wrap around.
+    cached : callable, optional
+        Determine whether the frame of a time step is already cached, in which
+        case it is not prepared again.
+    ahead : int, default=AHEAD
+        The number of time steps prepared in the direction of scrubbing.
+    behind : int, default=BEHIND
+        The number of time steps prepared against the direction of scrubbing.
+    workers : int, default=WORKERS
+        The number of worker threads.
+
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[int], pv.UnstructuredGrid],
+        nsteps: int,
+        cached: Callable[[int], bool] | None = None,
+        ahead: int = AHEAD,
+        behind: int = BEHIND,
+        workers: int = WORKERS,
+    ) -> None:
+        self.prepare = prepare
+        self.nsteps = nsteps
+        self.cached = cached
+        self.ahead = ahead
+        self.behind = behind
+        self.direction = 1
+        self._last: int | None = None
+        self._pending: dict[int, Future] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def _steer(self, tstep: int) -> None:
+        # the direction of scrubbing is that of the shortest step around
+        # the wrapped time steps, and is unchanged when re-rendering
+        if self._last is not None and (delta := (tstep - self._last) % self.nsteps):
+            self.direction = 1 if delta <= self.nsteps // 2 else -1
+        self._last = tstep
+
+    def _wanted(self, tstep: int) -> list[int]:
+        offsets = [self.direction * step for step in range(1, self.ahead + 1)]
+        offsets += [-self.direction * step for step in range(1, self.behind + 1)]
+        wanted = dict.fromkeys((tstep + offset) % self.nsteps for offset in offsets)
+        wanted.pop(tstep, None)
+
+        return list(wanted)
+
+    def _task(self, tstep: int) -> pv.UnstructuredGrid | None:
+        if self.cached is not None and self.cached(tstep):
+            return None
+        return self.prepare(tstep)
+
+    def get(self, tstep: int) -> pv.UnstructuredGrid:
+        """Return the frame of the time step, and prefetch its neighbours.
+
+        The frame is waited upon when it is already being prepared in the
+        background, otherwise it is prepared on the calling thread.
+
+        """
+        with self._lock:
+            self._steer(tstep)
+            if (future := self._pending.pop(tstep, None)) is not None and future.cancel():
+                # not yet started, so rather prepared on the calling thread
+                future = None
+
+            wanted = self._wanted(tstep)
+            for step in list(self._pending):
+                if self._pending[step].done() or (
+                    step not in wanted and self._pending[step].cancel()
+                ):
+                    del self._pending[step]
+
+        # a prefetched frame is None when it was found already cached
+        if future is None or (result := future.result()) is None:
+            result = self.prepare(tstep)
+
+        with self._lock:
+            if not self._closed:
+                for step in wanted:
+                    if step not in self._pending and not (self.cached and self.cached(step)):
+                        self._pending[step] = self._executor.submit(self._task, step)
+
+        return result
+
+    def close(self, wait: bool = False) -> None:
+        """Cancel the pending frames, and stop the worker threads.
+
+        Optionally, wait for the frames being prepared e.g., before closing
+        the frame store that they are prepared from.
+
+        """
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
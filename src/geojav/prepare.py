@@ -0,0 +1,627 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Prepare the frames of the renderers, either interactively or offline.
+
+The frame of a time step is the plume of the time step, on the mesh of the
+renderer, and is prepared once, then served from the frame store and the
+in-memory frame cache of the time-series, see :mod:`geojav.frames`.
+
+The same :class:`Frames` of a :class:`Dataset` are used by its renderer, to
+prepare frames on demand, and by :func:`warm`, to pre-warm the frame store of
+the dataset with a pool of processes before rendering e.g.,
+
+    python -m geojav.prepare raikoke --processes 4
+
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+import multiprocessing
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any
+
+import click
+import numpy as np
+
+import netCDF4 as nc
+
+from geojav import blanking, crop, frames, prefetch, scalars, sparse, stats, store, thresholds
+
+if TYPE_CHECKING:
+    from iris.cube import Cube
+    import pyvista as pv
+
+    from geojav.stats import Stats
+
+__all__ = ["DATASETS", "Dataset", "Frames", "Geometry", "Source", "build", "load", "warm"]
+
+BASE_DIR: Path = Path(__file__).parent
+# the start method of the pre-warm processes, which do not inherit the open
+# HDF5 handles of the parent process
+START_METHOD: str = "spawn"
+
+
+@dataclass
+class Source:
+    """The time-series of a dataset, and where its data is read from."""
+
+    cube: Cube
+    data: Any
+    path: Path
+    stats: Stats | None = None
+
+
+@dataclass
+class Geometry:
+    """The structured mesh of a renderer, and the coordinates it is built from.
+
+    The `z` coordinate is the scaled vertical coordinate of the points of the
+    mesh.
+
+    """
+
+    mesh: pv.StructuredGrid
+    x_cb: np.ndarray
+    y_cb: np.ndarray
+    z_cb: np.ndarray
+    z: np.ndarray
+    zscale: float
+
+    @property
+    def params(self) -> tuple[Any, ...]:
+        """The parameters that the frames prepared on the mesh depend on."""
+        return self.x_cb, self.y_cb, self.z, self.zscale
+
+
+def load(fname: str | Path, variable: str) -> Source:
+    """Load the time-series, preferring any Zarr store or sparse plume store.
+
+    A Zarr store is only preferred when the optional ``zarr`` package is
+    installed, otherwise the NetCDF file is loaded, if any.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The time-series NetCDF file.
+    variable : str
+        The name of the data variable of the NetCDF file.
+
+    """
+    import iris
+
+    fname = Path(fname)
+
+    zname = fname.with_suffix(store.SUFFIX)
+    if zname.exists() and (store.available() or not fname.exists()):
+        # prefer any zarr store, which is read lock-free, one chunk per time step
+        cube, data, path = store.load(zname), store.open_data(zname), zname
+    else:
+        cube, path = iris.load_cube(fname), fname
+        # serialise the reads of the time steps, which are also read in the background
+        data = prefetch.Serialised(nc.Dataset(fname).variables[variable], frames.LOCK)
+
+    if (pname := sparse.path(fname)).exists():
+        # prefer any sparse plume store, which only reads the positive cells
+        data, path = sparse.load(pname), pname
+
+    # the statistics of each time step, if unpacked
+    plume_stats = stats.load(sname) if (sname := stats.path(fname)).exists() else None
+
+    return Source(cube=cube, data=data, path=path, stats=plume_stats)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """A dataset of a renderer i.e., its unpacked time-series, mesh and frames.
+
+    The same dataset is used by its renderer, and to pre-warm its frame store,
+    see :func:`warm`.
+
+    """
+
+    name: str
+    title: str
+    base_dir: Path
+    # the file name of the unpacked time-series, within the data directory
+    fname: str
+    variable: str
+    vertical: str
+    # the Earth radius, in the units of the scaled vertical coordinate
+    radius: float
+    # the units of the radius per unit of the vertical coordinate
+    scale: float = 1.0
+    # the height of the mean cell, once exaggerated, over its latitude step
+    aspect: float = 1.0
+    # the frames have the flat cell index of the mesh
+    idx: bool = False
+
+    @property
+    def path(self) -> Path:
+        """The unpacked time-series NetCDF file."""
+        return self.base_dir / "data" / self.fname
+
+    @property
+    def unpacked(self) -> bool:
+        """Whether the time-series is unpacked, as NetCDF or Zarr."""
+        return self.path.exists() or self.path.with_suffix(store.SUFFIX).exists()
+
+    def load(self) -> Source:
+        """Load the unpacked time-series, see :func:`load`."""
+        return load(self.path, self.variable)
+
+    def geometry(self, cube: Cube) -> Geometry:
+        """Build the mesh of the renderer, with a vertically exaggerated height."""
+        import pyvista as pv
+        from geovista.common import to_cartesian
+
+        y_cb = cube.coord("latitude").contiguous_bounds()
+        x_cb = cube.coord("longitude").contiguous_bounds()
+        z_cb = cube.coord(self.vertical).contiguous_bounds()
+
+        # the heights in Earth radii, exaggerated by the mean latitude step
+        # (radians) over the mean height step
+        z_h = z_cb * self.scale / self.radius
+        zscale = self.aspect * np.mean(np.diff(y_cb)) * (np.pi / 180) / np.mean(np.diff(z_h))
+        z_h = z_h * zscale
+
+        xx, yy, zz = np.meshgrid(x_cb, y_cb, z_h, indexing="ij")
+        shape = xx.shape
+        xyz = to_cartesian(xx, yy, zlevel=zz, zscale=1)
+        mesh = pv.StructuredGrid(*(xyz[:, axis].reshape(shape) for axis in range(3)))
+
+        return Geometry(mesh=mesh, x_cb=x_cb, y_cb=y_cb, z_cb=z_cb, z=z_h, zscale=zscale)
+
+    def frames(
+        self,
+        source: Source,
+        geometry: Geometry,
+        shared: bool | None = None,
+        blanked: bool | None = None,
+    ) -> Frames:
+        """Return the frames of the time-series, on the mesh of the renderer."""
+        return Frames(
+            self.name,
+            self.base_dir / "vtk",
+            source,
+            geometry,
+            idx=self.idx,
+            shared=shared,
+            blanked=blanked,
+        )
+
+
+DATASETS: dict[str, Dataset] = {
+    "raikoke": Dataset(
+        name="raikoke",
+        title="Raikoke",
+        base_dir=BASE_DIR / "raikoke",
+        fname="volcanic_ash_air_concentration.nc",
+        variable="volcanic_ash_air_concentration",
+        vertical="flight_level",
+        # Earth radius in feet taking 1 m = 3.281 Ft, and 100 Ft per flight level
+        radius=6371 * 1000 * 3.281,
+        scale=100.0,
+        # for picking flight levels
+        idx=True,
+    ),
+    "reykjanes": Dataset(
+        name="reykjanes",
+        title="Reykjanes",
+        base_dir=BASE_DIR / "reykjanes",
+        fname="sulphur_dioxide_air_concentration.nc",
+        variable="SULPHUR_DIOXIDE_AIR_CONCENTRATION",
+        vertical="altitude",
+        # Earth radius in m
+        radius=6371000.0,
+        aspect=0.5,
+    ),
+}
+
+
+def build(
+    mesh: pv.StructuredGrid,
+    data: Any,
+    tstep: int,
+    plume_stats: Stats | None = None,
+    idx: bool = False,
+) -> pv.UnstructuredGrid:
+    """Build the frame of the time step, with only its positive cells.
+
+    The mesh is never modified, so frames may be built concurrently. The cells
+    of the frame are sorted by ascending value, see :func:`geojav.thresholds.sort`.
+
+    Parameters
+    ----------
+    mesh : StructuredGrid
+        The mesh of the renderer.
+    data : Plume or array-like
+        The sparse plume, or the dense data with time as its leading dimension.
+    tstep : int
+        The time step.
+    plume_stats : Stats, optional
+        The statistics of the time-series, to only read the bounding box of
+        the active cells of the time step.
+    idx : bool, default=False
+        Also add the flat cell index of the mesh of each cell of the frame.
+
+    """
+    import pyvista as pv
+    from geovista.crs import WGS84, to_wkt
+
+    if isinstance(data, sparse.Plume):
+        # build the frame from only the positive cells of the plume
+        indices, values = data[tstep]
+        result = mesh.extract_cells(indices)
+        result["data"] = values
+        if idx:
+            result["idx"] = indices
+        to_wkt(result, WGS84)
+        result.active_scalars_name = "data"
+        return thresholds.sort(result)
+
+    # crop to the bounding box of the active cells before thresholding,
+    # only reading the bounding box when it is known from the statistics
+    if plume_stats is not None:
+        slices = plume_stats.slices(tstep)
+        tdata = data[(tstep, *slices)] if not crop.is_empty(slices) else None
+    else:
+        tdata = data[tstep][:]
+        slices = crop.active(tdata)
+        tdata = tdata[slices]
+
+    if crop.is_empty(slices):
+        return pv.UnstructuredGrid()
+
+    # the scalars and cell ids are views of the buffer of this thread, which
+    # are copied by the threshold
+    buffer = scalars.buffer()
+    result = mesh.extract_subset(crop.voi(slices))
+    result["data"] = buffer.fill(tdata)
+    if idx:
+        result["idx"] = buffer.cell_ids(slices, data.shape[1:])
+    to_wkt(result, WGS84)
+    result.active_scalars_name = "data"
+
+    return thresholds.sort(result.threshold())
+
+
+def _prepare(
+    source: Source,
+    geometry: Geometry,
+    tstep: int,
+    idx: bool,
+    shared: bool,
+) -> frames.Packed | np.ndarray:
+    if shared:
+        return scalars.flatten(source.data, tstep)
+
+    # frames are also prepared in the background, so extract from the
+    # shallow copy of the mesh of this thread
+    mesh = prefetch.local(geometry.mesh)
+    return frames.pack(build(mesh, source.data, tstep, plume_stats=source.stats, idx=idx))
+
+
+class Frames:
+    """The frames of a time-series, on the mesh of a renderer.
+
+    Frames are served from the in-memory frame cache, then the frame store,
+    and are otherwise built and stored. Optionally, the frames share the
+    geometry of the mesh, with only their memory mapped scalars differing,
+    see :mod:`geojav.scalars`, and may also hide their inactive cells, rather
+    than extract their active cells, see :mod:`geojav.blanking`.
+
+    The frame store has a single writer. A frame store in use by another
+    process e.g., another renderer, or a pre-warm, is detached, and its frames
+    are only held in memory, see :class:`geojav.frames.FrameStore`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the time-series.
+    cache_dir : str or Path
+        The directory of the frame stores.
+    source : Source
+        The time-series.
+    geometry : Geometry
+        The mesh of the renderer.
+    idx : bool, default=False
+        Add the flat cell index of the mesh of each cell of the frames.
+    shared : bool, optional
+        Share the geometry of the mesh between the frames. Defaults to the
+        ``GEOJAV_SHARED_GEOMETRY`` environment variable.
+    blanked : bool, optional
+        Hide the cells of the frames below a threshold, which implies `shared`.
+        Defaults to the ``GEOJAV_BLANKED_FRAMES`` environment variable.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cache_dir: str | Path,
+        source: Source,
+        geometry: Geometry,
+        idx: bool = False,
+        shared: bool | None = None,
+        blanked: bool | None = None,
+    ) -> None:
+        from geovista.crs import WGS84, to_wkt
+
+        self.source = source
+        self.geometry = geometry
+        self.idx = idx
+        self.blanked = blanking.enabled() if blanked is None else blanked
+        cube = source.cube
+
+        # the identity of the time-series i.e., the size and modification time
+        # of the file, or store, that the frames are prepared from
+        self._identity = frames.identity(source.path)
+        # the frame store is versioned by the identity and variable of the
+        # time-series, and by how the frames are prepared, and any other versions
+        # are removed. A store in use by another process e.g., another renderer,
+        # or a pre-warm, is detached, and the frames are only held in memory
+        self.store = frames.FrameStore(
+            frames.generation(
+                cache_dir,
+                name,
+                *self._identity,
+                cube.name(),
+                str(cube.units),
+                type(source.data).__name__,
+                *geometry.params,
+            ),
+            detach=True,
+        )
+        if not self.store.detached:
+            frames.collect(self.store.fname)
+        # the recently rendered frames, held in memory in front of the frame store
+        self.cache = frames.FrameCache()
+        self._index: tuple[int, thresholds.ThresholdIndex | blanking.BlankIndex] | None = None
+        self._times = cube.coord("time").points
+
+        self.scalars = self.shared = None
+        if self.blanked or (scalars.enabled() if shared is None else shared):
+            mesh = geometry.mesh
+            self.shared = mesh.copy(deep=False)
+            if idx:
+                self.shared.cell_data["idx"] = scalars.cell_ids(mesh.n_cells)
+            to_wkt(self.shared, WGS84)
+            self.scalars = scalars.Scalars(
+                self.store.fname.with_name(f"{name}{scalars.SUFFIX}"),
+                (len(self), mesh.n_cells),
+                private=self.store.detached,
+            )
+
+    def __len__(self) -> int:
+        return self._times.size
+
+    def key(self, tstep: int) -> str:
+        """Return the key of the time step i.e., its time and the identity of the time-series.
+
+        Any change to the time-series, including appending time steps to it,
+        changes its identity, and so the version of the frame store, see
+        :func:`geojav.frames.generation`.
+
+        """
+        return frames.digest(self._times[tstep], *self._identity)
+
+    def stored(self, tstep: int) -> bool:
+        """Determine whether the current frame of the time step is stored."""
+        key = self.key(tstep)
+        if self.scalars is not None:
+            return self.scalars.filled(tstep, key)
+        return self.store.stored(tstep, key)
+
+    def cached(self, tstep: int) -> bool:
+        """Determine whether the frame of the time step is served from memory."""
+        if self.scalars is not None:
+            return self.scalars.filled(tstep, self.key(tstep))
+        return tstep in self.cache
+
+    def prepare(self, tstep: int) -> frames.Packed | np.ndarray:
+        """Prepare the frame of the time step, without storing it.
+
+        Returns
+        -------
+        Packed or ndarray
+            The packed frame, or the flattened scalars of the time step when
+            the geometry is shared.
+
+        """
+        return _prepare(self.source, self.geometry, tstep, self.idx, self.scalars is not None)
+
+    def put(self, tstep: int, prepared: frames.Packed | np.ndarray) -> np.ndarray | None:
+        """Store the prepared frame of the time step, see :meth:`prepare`."""
+        key = self.key(tstep)
+        if self.scalars is not None:
+            return self.scalars.put(tstep, prepared, key)
+
+        self.store.put(tstep, prepared, key)
+        return None
+
+    def get(self, tstep: int) -> pv.DataSet:
+        """Return the frame of the time step, preparing it on first use."""
+        if self.scalars is not None:
+            # point the shared geometry at the memory mapped scalars of the
+            # time step, which are filled on first use
+            key = self.key(tstep)
+            if (values := self.scalars.get(tstep, key)) is None:
+                # cast straight into the row of the time step
+                values = self.scalars.fill(
+                    tstep, key, lambda row: scalars.flatten(self.source.data, tstep, out=row)
+                )
+            return scalars.frame(self.shared, values)
+
+        if (result := self.cache.get(tstep)) is not None:
+            # served from memory e.g., when scrubbing back and forth
+            return result
+
+        if (result := self.store.get(tstep, self.key(tstep))) is None:
+            packed = self.prepare(tstep)
+            self.put(tstep, packed)
+            result = packed.unpack()
+
+        self.cache.put(tstep, result)
+
+        return result
+
+    def index(
+        self, tstep: int, frame: pv.DataSet | None = None
+    ) -> thresholds.ThresholdIndex | blanking.BlankIndex:
+        """Return the threshold index of the frame of the time step.
+
+        The index of the most recent time step is reused, so that moving the
+        threshold only searches the index.
+
+        """
+        if self._index is None or self._index[0] != tstep:
+            frame = self.get(tstep) if frame is None else frame
+            index = blanking.BlankIndex if self.blanked else thresholds.ThresholdIndex
+            self._index = tstep, index(frame)
+
+        return self._index[1]
+
+    def close(self) -> None:
+        """Close the frame store."""
+        self.store.close()
+
+
+# the time-series, mesh and cell index option of a pre-warm process
+_worker: tuple[Source, Geometry, bool] | None = None
+
+
+def _initialise(dataset: Dataset) -> None:
+    # each process prepares frames from its own time-series and mesh, but
+    # never opens the frame store, which has a single writer
+    global _worker
+
+    source = dataset.load()
+    _worker = source, dataset.geometry(source.cube), dataset.idx
+
+
+def _task(tstep: int, shared: bool) -> tuple[int, Any, float]:
+    start = time.perf_counter()
+    source, geometry, idx = _worker
+    prepared = _prepare(source, geometry, tstep, idx, shared)
+
+    return tstep, prepared, time.perf_counter() - start
+
+
+def warm(
+    dataset: Dataset | str,
+    processes: int | None = None,
+    force: bool = False,
+    echo: Any = print,
+) -> int:
+    """Pre-warm the frame store of the dataset with a pool of processes.
+
+    The frames are prepared by the processes, and stored by the calling
+    process, which holds the lock of the single writer of the frame store
+    for the whole pre-warm. A frame store in use by another process e.g., a
+    renderer, raises a :class:`TimeoutError`, rather than pre-warming only
+    the memory of this process.
+
+    Parameters
+    ----------
+    dataset : Dataset or str
+        The dataset, or its name, see :data:`DATASETS`.
+    processes : int, optional
+        The maximum number of processes. Defaults to the number of CPUs.
+    force : bool, default=False
+        Prepare every frame, rather than only the frames not already stored.
+    echo : callable, default=print
+        Report the timing of each time step, and the total throughput.
+
+    Returns
+    -------
+    int
+        The number of frames prepared.
+
+    """
+    if isinstance(dataset, str):
+        dataset = DATASETS[dataset]
+
+    source = dataset.load()
+    plume = dataset.frames(source, dataset.geometry(source.cube))
+
+    try:
+        if plume.store.detached:
+            emsg = (
+                f"The frame store {str(plume.store.fname)!r} is in use by another process "
+                "e.g., a renderer, or another pre-warm of the store."
+            )
+            raise TimeoutError(emsg)
+
+        shared = plume.scalars is not None
+        steps = [tstep for tstep in range(len(plume)) if force or not plume.stored(tstep)]
+        echo(f"Preparing {len(steps)} of {len(plume)} frames ...")
+
+        if not steps:
+            return 0
+
+        start = time.perf_counter()
+        context = multiprocessing.get_context(START_METHOD)
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=_initialise,
+            initargs=(dataset,),
+        ) as executor:
+            futures = [executor.submit(_task, tstep, shared) for tstep in steps]
+            for future in as_completed(futures):
+                tstep, prepared, elapsed = future.result()
+                plume.put(tstep, prepared)
+                ncells = np.count_nonzero(~np.isnan(prepared)) if shared else prepared.ncells
+                echo(f"\ttime step {tstep:>4}: {elapsed * 1000:>8.1f}ms, {ncells:>9} cells")
+
+        elapsed = time.perf_counter() - start
+    finally:
+        # release the lock of the frame store
+        plume.close()
+
+    rate = len(steps) / elapsed if elapsed else 0.0
+    echo(f"Prepared {len(steps)} frames in {elapsed:.2f}s ({rate:.2f} frames/s)")
+
+    return len(steps)
+
+
+@click.command()
+@click.argument("name", type=click.Choice(list(DATASETS)))
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    help="Maximum number of frame preparation processes (default: number of CPUs).",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Prepare every frame, rather than only the frames not already stored.",
+)
+def main(name: str, processes: int | None, force: bool) -> None:
+    """Pre-warm the frame store of the dataset NAME."""
+    dataset = DATASETS[name]
+
+    if not dataset.unpacked:
+        print(f"\nNo {dataset.title} time-series to pre-warm, unpack it first ...\n")
+        return
+
+    print(f"\nPre-warming the {dataset.title} frame store ...\n")
+
+    try:
+        # the frames are prepared by the processes, and stored by this process
+        warm(dataset, processes=processes, force=force)
+    except TimeoutError as err:
+        raise click.ClickException(str(err)) from None
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
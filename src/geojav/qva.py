@@ -0,0 +1,431 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Ingest NAME QVA grid text files straight from a tarball.
+
+The tarball is decompressed in a single forward pass of its stream, and the
+content of each matching member is handed off as it is read, to be parsed by a
+pool of worker processes into a single ``(time, flight_level, latitude,
+longitude)`` array, without any member being extracted to disk.
+
+The rows of data of each QVA file are parsed in one vectorized pass, rather
+than line-by-line as with the generic NAME loader of iris.
+
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+import io
+import os
+from pathlib import Path
+import re
+import tarfile
+from typing import IO, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from iris.cube import Cube
+
+__all__ = ["PATTERN", "Field", "load_tarball", "parse", "read_header"]
+
+EARTH_RADIUS: float = 6371229.0
+ENCODING: str = "latin-1"
+# the number of time steps that the data is first allocated for, before growing
+NSTEPS: int = 8
+PATTERN: str = "QVA_grid1_*.txt"
+PRELIMINARY_COLS: int = 4
+TIME_FORMAT: str = "%d/%m/%Y %H:%M %Z"
+TIME_UNITS: str = "hours since epoch"
+
+# the order of the column headings in the "Fields:" block of a NAME III file
+HEADINGS: tuple[str, ...] = (
+    "Species Category",
+    "Name",
+    "Quantity",
+    "Species",
+    "Units",
+    "Sources",
+    "Ensemble Av",
+    "Time Av or Int",
+    "Horizontal Av or Int",
+    "Vertical Av or Int",
+    "Prob Perc",
+    "Prob Perc Ens",
+    "Prob Perc Time",
+    "Time",
+    "Z",
+    "D",
+)
+
+# the headings encoded elsewhere within the cube, rather than as attributes
+EXCLUDE: tuple[str, ...] = (
+    "Fields",
+    "Number of field cols",
+    "Number of fields",
+    "Number of preliminary cols",
+    "Time",
+    "Units",
+    "X grid origin",
+    "X grid resolution",
+    "X grid size",
+    "Y grid origin",
+    "Y grid resolution",
+    "Y grid size",
+    "Z",
+)
+
+PATTERN_FL = re.compile(r"^From\s*FL(?P<lower>\d+(\.\d+)?)\s*-\s*(?:to\s*)?FL(?P<upper>\d+(\.\d+)?)\s*$")
+PATTERN_PERIOD = re.compile(r"\s*(?:(\d{1,2})day)?\s*(?:(\d{1,2})hr)?\s*(?:(\d{1,2})min)?")
+
+
+@dataclass
+class Field:
+    """The metadata of a single time step parsed from a QVA file."""
+
+    name: str
+    units: str
+    time: datetime
+    period: timedelta
+    averaged: bool
+    levels: list[tuple[float, float]]
+    header: dict[str, str | int | float | None] = field(repr=False)
+    attributes: dict[str, str | int | float] = field(repr=False)
+
+
+def _cast(key: str, value: str) -> str | int | float | None:
+    if not value:
+        return None
+    if key in ("X grid origin", "Y grid origin", "X grid resolution", "Y grid resolution"):
+        return float(value)
+    if key in (
+        "X grid size",
+        "Y grid size",
+        "Number of preliminary cols",
+        "Number of field cols",
+        "Number of fields",
+    ):
+        return int(value)
+    return value
+
+
+def _is_data(line: str) -> bool:
+    try:
+        float(line.split(",", 1)[0])
+    except ValueError:
+        return False
+    return True
+
+
+def read_header(text: IO[str]) -> tuple[dict, dict[str, list[str]], str]:
+    """Read the header and column headings of a NAME III QVA file.
+
+    Parameters
+    ----------
+    text : text stream
+        The content of the QVA file.
+
+    Returns
+    -------
+    tuple
+        The header key/value pairs, the column headings keyed by heading name
+        (each with one entry per field), and the first row of data. On return,
+        the `text` stream is positioned at the second row of data.
+
+    """
+    header: dict[str, str | int | float | None] = {"NAME Version": next(text).strip()}
+
+    for line in text:
+        key, sep, value = line.partition(":")
+        if not sep:
+            break
+        key = key.strip()
+        header[key] = _cast(key, value.strip())
+
+    # gather the column headings up to the first row of data, the last of
+    # which are the column titles of the preliminary columns
+    lines, line = [], ""
+    for line in text:
+        if _is_data(line):
+            break
+        if line.strip():
+            lines.append(line)
+    else:
+        line = ""
+
+    npre = header.get("Number of preliminary cols") or PRELIMINARY_COLS
+    headings: dict[str, list[str]] = {}
+
+    for name, line_heading in zip(HEADINGS, lines[-len(HEADINGS) - 1 : -1]):
+        cols = [col.strip() for col in line_heading.split(",")]
+        label = " ".join(col for col in cols[:npre] if col).rstrip(":")
+        headings[label if label in HEADINGS else name] = cols[npre:-1]
+
+    return header, headings, line
+
+
+def _period(averaging: str) -> timedelta:
+    match = PATTERN_PERIOD.search(averaging)
+    days, hours, minutes = (float(group) if group else 0.0 for group in match.groups())
+    return timedelta(days=days, hours=hours, minutes=minutes)
+
+
+def _levels(headings: dict[str, list[str]]) -> list[tuple[float, float]]:
+    levels = []
+
+    for z in headings["Z"]:
+        if (match := PATTERN_FL.match(z)) is None:
+            emsg = f"Unsupported QVA vertical level {z!r}, expected 'From FLxxx - FLyyy'."
+            raise ValueError(emsg)
+        levels.append((float(match["lower"]), float(match["upper"])))
+
+    return levels
+
+
+def _field(header: dict, headings: dict[str, list[str]]) -> Field:
+    if len(times := set(headings["Time"])) != 1:
+        emsg = f"Expected a single time per QVA file, got {len(times)}."
+        raise ValueError(emsg)
+
+    time = datetime.strptime(times.pop(), TIME_FORMAT)
+    averaging = (headings.get("Time Av or Int") or [""])[0]
+    name = f"{headings['Species'][0]} {headings['Quantity'][0]}"
+
+    attributes = {
+        key: value[0] if isinstance(value, list) else value
+        for key, value in (header | headings).items()
+        if key not in EXCLUDE
+    }
+
+    return Field(
+        name=name.upper().replace(" ", "_"),
+        units=headings["Units"][0],
+        time=time,
+        period=_period(averaging),
+        averaged="averag" in averaging,
+        levels=_levels(headings),
+        header=header,
+        attributes={key: value for key, value in attributes.items() if value},
+    )
+
+
+def _read_data(text: IO[str], line: str, field: Field) -> tuple[np.ndarray, np.ndarray]:
+    npre = field.header.get("Number of preliminary cols") or PRELIMINARY_COLS
+    ncols = npre + len(field.levels)
+
+    # parse all the rows of data in a single vectorized pass, discarding the
+    # empty column following the trailing delimiter of the last row
+    block = (line + text.read()).rstrip().rstrip(",")
+    rows = np.fromstring(block, dtype=np.float64, sep=",") if block else np.empty(0)
+
+    if rows.size % ncols:
+        emsg = f"Expected {ncols} columns per row of QVA data, got {rows.size} values."
+        raise ValueError(emsg)
+
+    rows = rows.reshape(-1, ncols)
+    # convert the one-based grid indices to zero-based
+    yx = rows[:, [1, 0]].T.astype(np.intp) - 1
+    values = rows[:, npre:].T.astype(np.float32)
+
+    return yx, values
+
+
+def parse(content: bytes | str) -> tuple[Field, np.ndarray, np.ndarray]:
+    """Parse the content of a NAME III QVA file.
+
+    Parameters
+    ----------
+    content : bytes or str
+        The content of the QVA file.
+
+    Returns
+    -------
+    tuple
+        The field metadata, the zero-based ``(y, x)`` grid indices of the
+        populated grid cells with shape ``(2, N)``, and their values with
+        shape ``(levels, N)``.
+
+    """
+    if isinstance(content, bytes):
+        content = content.decode(ENCODING)
+
+    text = io.StringIO(content)
+    header, headings, line = read_header(text)
+    field = _field(header, headings)
+
+    return (field, *_read_data(text, line, field))
+
+
+def _members(
+    tar: tarfile.TarFile,
+    pattern: str,
+    predicate: Callable[[str], bool] | None,
+) -> Iterator[tuple[str, bytes]]:
+    # the tarball is opened as a stream, so the content of each member may
+    # only be read while it is the current member, and the compressed stream
+    # is only ever read forwards, once
+    for member in tar:
+        if (
+            member.isfile()
+            and fnmatch(Path(member.name).name, pattern)
+            and (predicate is None or predicate(member.name))
+        ):
+            yield member.name, tar.extractfile(member).read()
+
+
+def _parsed(
+    contents: Iterable[tuple[str, bytes]],
+    workers: int | None,
+) -> Iterator[tuple[str, tuple[Field, np.ndarray, np.ndarray]]]:
+    if workers == 1:
+        for name, content in contents:
+            yield name, parse(content)
+        return
+
+    # bound the number of members in flight, so that the decompressed content
+    # of the whole tarball is never held in memory at once
+    bound = 2 * (workers or os.cpu_count() or 1)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, content in contents:
+            pending.append((name, executor.submit(parse, content)))
+            if len(pending) >= bound:
+                name, future = pending.popleft()
+                yield name, future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
+
+
+def _cube(data: np.ndarray, fields: list[Field], levels: list[tuple[float, float]]) -> Cube:
+    from cf_units import CALENDAR_STANDARD, Unit
+    from iris.coord_systems import GeogCS
+    from iris.coords import CellMethod, DimCoord
+    from iris.cube import Cube
+
+    # order the time steps chronologically
+    order = np.argsort([field.time for field in fields], kind="stable")
+    if np.any(order != np.arange(order.size)):
+        data = data[order]
+        fields = [fields[i] for i in order]
+
+    first = fields[0]
+    header = first.header
+    tunit = Unit(TIME_UNITS, calendar=CALENDAR_STANDARD)
+
+    times = [field.time for field in fields]
+    time = DimCoord(
+        tunit.date2num(times).astype(float),
+        standard_name="time",
+        units=tunit,
+        bounds=tunit.date2num(
+            [(field.time - field.period, field.time) for field in fields]
+        ).astype(float),
+    )
+    flight_level = DimCoord(
+        [sum(level) / 2 for level in levels],
+        long_name="flight_level",
+        units="unknown",
+        bounds=levels,
+        attributes={"positive": "up"},
+    )
+
+    crs = GeogCS(EARTH_RADIUS)
+    coords = []
+    for axis, name in (("Y", "latitude"), ("X", "longitude")):
+        step, count = header[f"{axis} grid resolution"], header[f"{axis} grid size"]
+        points = header[f"{axis} grid origin"] + np.arange(count, dtype=np.float64) * step
+        coord = DimCoord(
+            points,
+            standard_name=name,
+            units="degrees",
+            coord_system=crs,
+            circular=name == "longitude" and np.isclose(count * step, 360.0),
+        )
+        coord.guess_bounds()
+        coords.append(coord)
+
+    latitude, longitude = coords
+    cube = Cube(
+        data,
+        long_name=first.name,
+        units=first.units,
+        attributes=first.attributes,
+        dim_coords_and_dims=[(time, 0), (flight_level, 1), (latitude, 2), (longitude, 3)],
+    )
+
+    if first.averaged:
+        cube.add_cell_method(CellMethod("mean", "time"))
+
+    return cube
+
+
+def load_tarball(
+    fname: str | Path,
+    pattern: str = PATTERN,
+    predicate: Callable[[str], bool] | None = None,
+    workers: int | None = None,
+) -> Cube | None:
+    """Load the QVA time-series directly from the members of a tarball.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The file name of the (compressed) tarball.
+    pattern : str, default=PATTERN
+        The glob pattern of the QVA member file names.
+    predicate : callable, optional
+        Only members whose name satisfies the predicate are loaded.
+    workers : int, optional
+        The maximum number of parsing processes. Defaults to the number of
+        CPUs. A single worker parses the members in-process.
+
+    Returns
+    -------
+    Cube or None
+        The ``(time, flight_level, latitude, longitude)`` cube, or ``None``
+        if no members matched.
+
+    """
+    # the number of members is not known until the whole stream is read, so
+    # the data is grown in place, see np.ndarray.resize, which reallocates,
+    # rather than copies, the data
+    data, levels, fields = None, None, []
+
+    with tarfile.open(fname, "r|*") as tar:
+        contents = _members(tar, pattern, predicate)
+
+        for i, (name, (field, yx, values)) in enumerate(_parsed(contents, workers)):
+            header = field.header
+
+            if data is None:
+                levels = sorted(set(field.levels))
+                shape = (NSTEPS, len(levels), header["Y grid size"], header["X grid size"])
+                data = np.zeros(shape, dtype=np.float32)
+            elif not set(field.levels) <= set(levels):
+                emsg = f"Inconsistent QVA flight levels in {name!r}."
+                raise ValueError(emsg)
+
+            if i == data.shape[0]:
+                data.resize((2 * i, *data.shape[1:]))
+
+            zindex = np.array([levels.index(level) for level in field.levels])
+            data[i][zindex[:, np.newaxis], yx[0], yx[1]] = values
+            fields.append(field)
+
+    if data is None:
+        return None
+
+    data.resize((len(fields), *data.shape[1:]))
+
+    return _cube(data, fields, levels)
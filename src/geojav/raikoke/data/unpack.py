@@ -5,39 +5,168 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from pathlib import Path
-import tarfile
+import shutil
 
+import click
 import iris
-
-from geojav import CACHE
-
-
-def main() -> None:
+from iris.util import new_axis
+
+from geojav import CACHE, sparse, stats
+from geojav.fetch import WORKERS, fetch_assets
+from geojav.netcdf import CODEC, COMPLEVEL
+from geojav.qva import load_tarball
+from geojav.ranges import data_ranges
+from geojav.registry import Asset, Index, Window
+from geojav.store import SUFFIX, available
+from geojav.stream import backend, codecs, discard_counterpart, save
+
+TIME_FORMATS: list[str] = ["%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%Y%m%d%H%M"]
+
+
+@click.command()
+@click.option(
+    "-w",
+    "--workers",
+    default=WORKERS,
+    show_default=True,
+    help="Maximum number of concurrent asset downloads.",
+)
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    help="Maximum number of QVA parsing processes (default: number of CPUs).",
+)
+@click.option(
+    "-c",
+    "--codec",
+    type=click.Choice(codecs()),
+    default=CODEC,
+    show_default=True,
+    help=(
+        "Compression codec of the time-series NetCDF file or Zarr store. The bytes are "
+        "shuffled before compression, except by zstd or bzip2 for a NetCDF file, or by "
+        "any codec other than blosc for a Zarr store. A Zarr store does not support bzip2."
+    ),
+)
+@click.option(
+    "-l",
+    "--complevel",
+    default=COMPLEVEL,
+    show_default=True,
+    help="Compression level of the codec.",
+)
+@click.option(
+    "--reverify",
+    is_flag=True,
+    help="Re-hash all cached assets, ignoring their verification stamps.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=TIME_FORMATS),
+    help="Only process time steps at or after this time (UTC).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=TIME_FORMATS),
+    help="Only process time steps at or before this time (UTC).",
+)
+@click.option(
+    "-u",
+    "--update",
+    is_flag=True,
+    help="Append any new time steps to an existing time-series NetCDF file or Zarr store.",
+)
+@click.option(
+    "--zarr",
+    is_flag=True,
+    help="Unpack to a Zarr store, rather than a NetCDF file (requires zarr).",
+)
+@click.option(
+    "--sparse",
+    "plume",
+    is_flag=True,
+    help="Also unpack the positive cells of each time step to a sparse plume store.",
+)
+def main(
+    workers: int,
+    processes: int | None,
+    codec: str,
+    complevel: int,
+    reverify: bool,
+    start: datetime | None,
+    end: datetime | None,
+    update: bool,
+    zarr: bool,
+    plume: bool,
+) -> None:
     iris.FUTURE.save_split_attrs = True
 
-    if Path("volcanic_ash_air_concentration.nc").exists():
-        print("\nRaikoke time-series NetCDF file already exists, skipping ...\n")
-        return
+    target = f"volcanic_ash_air_concentration{SUFFIX if zarr else '.nc'}"
+    kind = "Zarr store" if zarr else "NetCDF file"
+    io = backend(target)
+    latest = None
+
+    # validate the options of the format before anything is fetched or written
+    if zarr and not available():
+        emsg = "The optional 'zarr' package is required by '--zarr' e.g., pip install geojav[zarr]."
+        raise click.UsageError(emsg)
+    if codec not in io.codecs():
+        emsg = f"Unsupported codec {codec!r} for a {kind}, choose from {', '.join(io.codecs())}."
+        raise click.BadParameter(emsg, param_hint="'--codec'")
+
+    if Path(target).exists():
+        if not update:
+            print(f"\nRaikoke time-series {kind} already exists, skipping ...\n")
+            return
+        latest = io.last_time(target)
+        if plume and not sparse.path(target).exists():
+            emsg = "No sparse plume store to update, rebuild the time-series instead."
+            raise click.UsageError(emsg)
+        print(f"\nUpdating Raikoke time-series {kind} after {latest} ...")
+
+    window = Window(start=start, end=end)
 
     print("\nFetching assets ...\n")
 
     # fetch the raikoke assets in the registry
-    for asset in CACHE.registry_files:
-        if asset.startswith("raikoke"):
-            CACHE.fetch(asset)
+    assets = Index.from_cache(CACHE).select("raikoke", window)
+    fetch_assets(assets, workers=workers, reverify=reverify)
 
-    print("\nExtracting QVA files from tarball ...\n")
+    print("\nLoading QVA files from tarball ...\n")
 
     fname = CACHE.abspath / "raikoke" / "QVA_grid1.tar.gz"
 
-    with tarfile.open(fname, "r:gz") as tar:
-        tar.extractall(filter="data")
+    def predicate(name: str) -> bool:
+        asset = Asset.parse(name)
+        return asset in window and (latest is None or asset.time is None or asset.time > latest)
 
-    print("\nLoading QVA files ...\n")
+    # stream the QVA timeseries data from the NAME model straight out of the
+    # tarball, only loading the QVA files within any time window, and after
+    # any time steps already unpacked
+    cube = load_tarball(fname, predicate=predicate, workers=processes)
+
+    if cube is None:
+        print("\tNo new time steps in the requested window, skipping ...\n")
+        return
+
+    if window or latest is not None:
+        # honour the time window, regardless of the QVA file names
+        constraint = iris.Constraint(
+            time=lambda cell: (start is None or cell.point >= start)
+            and (end is None or cell.point <= end)
+            and (latest is None or cell.point > latest)
+        )
+        cube = cube.extract(constraint)
+        if cube is None:
+            print("\tNo new time steps in the requested window, skipping ...\n")
+            return
+        if not cube.coord_dims("time"):
+            # a single time step is extracted with a scalar time coordinate
+            cube = new_axis(cube, "time")
 
-    # load the QVA timeseries data from the NAME model
-    cube = iris.load_cube("QVA_grid1_*.txt")
     print(cube)
 
     if cube.units == "g/m3":
@@ -47,33 +176,61 @@ def main() -> None:
 
     # calculate the data range for each time step
     print("\nCalculating data range for each time step ...\n")
-    dmin, dmax = None, None
-    tsteps = []
-    for i, scube in enumerate(cube.slices_over("time")):
-        data = scube.data
-        min, max = data.min(), data.max()
-        if dmin is None or min < dmin:
-            dmin = min
-        if dmax is None or max > dmax:
-            dmax = max
-        if data.sum():
-            tsteps.append(i)
-
-    dmin, dmax = float(dmin), float(dmax)
+    ranges = data_ranges(cube)
+    dmin, dmax = ranges.dmin, ranges.dmax
     print(f"\t{dmin=}, {dmax=}")
 
     # discard time steps with no data
     print("\nDiscarding time steps with no data ...\n")
+    if not ranges.steps:
+        print("\tNo time steps with data, skipping ...\n")
+        return
     slicer = [slice(None)] * cube.ndim
-    slicer[cube.coord_dims("time")[0]] = tsteps
+    slicer[cube.coord_dims("time")[0]] = ranges.steps
     cube = cube[tuple(slicer)]
     print(cube)
 
-    # serialize to a netcdf file (compressed)
-    print("\nSaving QVA to NetCDF ...\n")
-    fname = f"{cube.name().lower()}.nc"
-    iris.save(cube, fname, complevel=9, zlib=True)
-    print(f"\tCreated {fname!r}\n")
+    if latest is None:
+        # serialize to a netcdf file or zarr store (compressed), with an
+        # unlimited time dimension so that it may later be updated, and chunked
+        # by time step as each time step is read individually when rendered
+        # via a temporary file, so that a failed save never leaves a partial target
+        print(f"\nSaving QVA to {kind} ({codec=}, {complevel=}) ...\n")
+        dmin, dmax = save(cube, target, dmin, dmax, codec=codec, complevel=complevel)
+        if (other := discard_counterpart(target)) is not None:
+            print(f"\tRemoved stale {str(other)!r}")
+    else:
+        # append only the new time steps to the existing netcdf file or zarr store
+        print(f"\nAppending QVA to {kind} ...\n")
+        io.append(cube, target)
+        dmin, dmax = io.update_range(target, cube.name(), dmin, dmax, merge=True)
+
+    print(f"\tStored data range {dmin=}, {dmax=}")
+    print(f"\t{'Updated' if latest else 'Created'} {target!r}")
+
+    # summarise the statistics of each time step, so that the renderer may
+    # set its ranges without reading the data
+    sidecar = stats.path(target)
+    if latest is None:
+        stats.save(stats.summarise_data(cube.data), sidecar)
+    elif sidecar.exists():
+        stats.append(stats.summarise_data(cube.data), sidecar)
+    if sidecar.exists():
+        print(f"\t{'Updated' if latest else 'Created'} {str(sidecar)!r}")
+
+    # store only the positive cells of each time step, so that a frame may
+    # be rendered from its plume alone, keeping any existing store in step
+    store = sparse.path(target)
+    if latest is None and plume:
+        sparse.save(sparse.sparsify(cube.data), store)
+    elif latest is None and store.exists():
+        # discard a stale plume store of a previous time-series
+        shutil.rmtree(store)
+    elif store.exists():
+        sparse.append(sparse.sparsify(cube.data), store)
+    if store.exists():
+        print(f"\t{'Updated' if latest else 'Created'} {str(store)!r}")
+    print()
     print("Done 👍")
 
 
@@ -10,13 +10,11 @@ from pathlib import Path
 
 from cf_units import Unit
 import geovista
-from geovista.common import to_cartesian, to_lonlat, wrap
+from geovista.common import to_lonlat, wrap
 from geovista.pantry.data import capitalise
 from geovista.crs import to_wkt, WGS84
 from geovista.qt import GeoBackgroundPlotter
 from geovista.themes import restore_plot_theme
-import iris
-import netCDF4 as nc
 import numpy as np
 import pyvista as pv
 from pyvista.plotting.picking import PICKED_REPRESENTATION_NAMES
@@ -25,9 +23,12 @@ from geopy.location import Location
 from geopy.exc import GeocoderUnavailable
 from matplotlib.colors import ListedColormap
 
-BASE_DIR = Path(__file__).parent
+from geojav import blanking, prefetch
+from geojav.prepare import DATASETS
 
-Re = 6371 * 1000 * 3.281 # Earth radius in feet taking 1 m = 3.281 Ft
+BASE_DIR = Path(__file__).parent
+# the time-series, mesh and frames of the renderer, shared with pre-warm
+dataset = DATASETS["raikoke"]
 
 feet = Unit("feet")
 meter = Unit("meter")
@@ -50,6 +51,9 @@ isosurfaces_range = (min_threshold, 6.0)
 iterations = 20
 passband = 0.1
 flight_level = 0
+ncells = 0
+actor_threshold = None
+title_threshold = r"Threshold (mg m$^{\text{-3}}$)"
 
 
 @dataclass
@@ -94,24 +98,6 @@ def qva(vmin=0.2, vmax=13.0):
     return ListedColormap(colors, name="qva", N=N)
 
 
-def cache(mesh, data, tstep) -> pv.UnstructuredGrid:
-    tdir = BASE_DIR / "vtk"
-    tdir.mkdir(exist_ok=True)
-    fname = tdir / f"raikoke_{tstep}.vtk"
-    if not fname.exists():
-        tdata = np.ma.masked_less_equal(data[tstep][:], 0).filled(np.nan).flatten()
-        mesh["data"] = tdata
-        mesh["idx"] = np.arange(mesh.n_cells)
-        to_wkt(mesh, WGS84)
-        mesh.active_scalars_name = "data"
-        tmp = mesh.threshold()
-        tmp.save(fname)
-        result = tmp
-    else:
-        result = pv.read(fname)
-    return result
-
-
 def callback_isosurfaces(value) -> None:
     global isosurfaces
 
@@ -178,6 +164,12 @@ def callback_passband(value) -> None:
     callback_render(None)
 
 
+def label_threshold() -> None:
+    # show the number of cells at or above the threshold, before they are rendered
+    if actor_threshold is not None:
+        actor_threshold.GetRepresentation().SetTitleText(f"{title_threshold} [{ncells:,} cells]")
+
+
 def callback_threshold(value) -> None:
     global threshold
     global p
@@ -451,6 +443,12 @@ def checkbox_smooth(flag: bool) -> None:
         callback_render(None)
 
 
+def callback_close() -> None:
+    # stop prefetching, then release the lock of the frame store
+    prefetcher.close(wait=True)
+    plume_frames.close()
+
+
 def callback_render(value) -> None:
     global tstep
     global n_tsteps
@@ -484,6 +482,7 @@ def callback_render(value) -> None:
     global feet
     global meter
     global frame
+    global ncells
 
 
     if value is None:
@@ -496,13 +495,27 @@ def callback_render(value) -> None:
     value = int(f"{value:.0f}")
     tstep = value % n_tsteps
 
-    frame = cache(mesh, data, tstep)
+    level = min_threshold if show_isosurfaces else threshold
+    if plume_stats is not None and not plume_stats.maxs[tstep] >= (level or 0):
+        # nothing in the time step reaches the threshold, so skip the frame
+        frame = pv.UnstructuredGrid()
+        ncells = 0
+        label_threshold()
+    else:
+        frame = prefetcher.get(tstep)
+
+        # search the index of the frame for the cells at or above the threshold,
+        # rather than thresholding every cell
+        index = plume_frames.index(tstep, frame)
+        ncells = index.count(threshold)
+        label_threshold()
+
+        frame = index.extract(level)
 
-    if show_isosurfaces:
-        if min_threshold:
-            frame = frame.threshold(min_threshold)
-    elif threshold:
-        frame = frame.threshold(threshold)
+        if show_clip or show_smooth or show_isosurfaces or show_flight:
+            # the filters also visit the hidden cells of a blanked frame, so
+            # only keep its visible cells
+            frame = blanking.explicit(frame)
 
     if frame.is_empty:
         p.remove_actor("plume")
@@ -615,11 +628,10 @@ def callback_render(value) -> None:
 
 
 # sort the assets in date ascending date order
-fname = BASE_DIR / "data" / "volcanic_ash_air_concentration.nc"
-cube = iris.load_cube(fname)
-
-ds = nc.Dataset(fname)
-data = ds.variables["volcanic_ash_air_concentration"]
+# load the time-series, preferring any zarr store or sparse plume store, along
+# with the statistics of each time step, if unpacked
+source = dataset.load()
+cube, data, plume_stats = source.cube, source.data, source.stats
 
 # bootstrap
 t = cube.coord("time")
@@ -633,32 +645,40 @@ fmt = "%Y-%m-%d %H:%M UTC"
 n_tsteps = t.shape[0]
 tstep = 0
 
-y_cb = y.contiguous_bounds()
-x_cb = x.contiguous_bounds()
-z_cb = z.contiguous_bounds()
+geometry = dataset.geometry(cube)
+mesh = geometry.mesh
+x_cb, y_cb, z_cb, zscale = geometry.x_cb, geometry.y_cb, geometry.z_cb, geometry.zscale
 
 n_hcells = (x_cb.size - 1) * (y_cb.size - 1)
 
-zscale = np.mean(np.diff(y_cb))*(np.pi/180)/(np.mean(np.diff(z_cb))*100/Re) #mean latitude step (radians)/mean altitude step (feet) over Earth Radius
-z_h =(z_cb*100)/Re*zscale
+# the fixed range of the standard QVA ash concentration colour bands, which is
+# never derived from the data, so that each band means the same in any dataset
+dmin, dmax = 0.2, 13.0
+threshold_range = (min_threshold, 6.0)
 
-xx, yy, zz = np.meshgrid(x_cb, y_cb, z_h, indexing="ij")
-shape = xx.shape
+if plume_stats is not None and plume_stats.steps:
+    # set the slider ranges from the statistics of the plume, rather than the data
+    upper = float(np.nanmax(plume_stats.percentile(99.0)))
+    if upper > min_threshold:
+        threshold_range = isosurfaces_range = (min_threshold, upper)
 
-dmin, dmax = 0.2, 13.0
 clim = (dmin, dmax)
 
-xyz = to_cartesian(xx, yy, zlevel=zz, zscale=1)
-mesh = pv.StructuredGrid(xyz[:, 0].reshape(shape), xyz[:, 1].reshape(shape), xyz[:, 2].reshape(shape))
-
 cmap = qva(*clim)
 color = "white"
 
-frame = cache(mesh, data, tstep)
+# the frames of the time-series, served from memory, then the frame store
+plume_frames = dataset.frames(source, geometry)
+
+# prepare the neighbouring time steps in the background, while scrubbing
+prefetcher = prefetch.Prefetcher(plume_frames.get, n_tsteps, cached=plume_frames.cached)
+
+frame = prefetcher.get(tstep)
 
 _ = restore_plot_theme()
 
 p = GeoBackgroundPlotter()
+p.app_window.signal_close.connect(callback_close)
 p.set_background(color="black")
 
 sargs = {
@@ -770,7 +790,7 @@ p.add_slider_widget(
 
 actor_threshold = p.add_slider_widget(
     callback_threshold,
-    (0.2, 6.0),
+    threshold_range,
     value=threshold,
     pointa=(0.55, 0.75),
     pointb=(0.90, 0.75),
@@ -779,9 +799,10 @@ actor_threshold = p.add_slider_widget(
     style="modern",
     slider_width=0.02,
     tube_width=0.001,
-    title=r"Threshold (mg m$^{\text{-3}}$)",
+    title=title_threshold,
     title_height=0.02,
 )
+label_threshold()
 
 actor_isosurfaces = p.add_slider_widget(
     callback_isosurfaces,
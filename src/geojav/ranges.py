@@ -0,0 +1,106 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Fused per time step data range and empty step detection of a cube."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from iris.cube import Cube
+
+__all__ = ["Ranges", "data_ranges"]
+
+BLOCK_SIZE: int = 8 * 1024 * 1024
+
+
+@dataclass
+class Ranges:
+    """The data range of each time step, and whether it is populated."""
+
+    mins: np.ndarray
+    maxs: np.ndarray
+    populated: np.ndarray
+
+    @property
+    def dmin(self) -> float:
+        """The minimum over all the time steps."""
+        return float(np.nanmin(self.mins))
+
+    @property
+    def dmax(self) -> float:
+        """The maximum over all the time steps."""
+        return float(np.nanmax(self.maxs))
+
+    @property
+    def steps(self) -> list[int]:
+        """The indices of the populated time steps."""
+        return np.flatnonzero(self.populated).tolist()
+
+
+def _reduce(block: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # reduce a (steps, values) block, where a fully masked step has no range
+    if np.ma.isMaskedArray(block):
+        mins = block.min(axis=1).filled(np.nan)
+        maxs = block.max(axis=1).filled(np.nan)
+        populated = block.filled(0).any(axis=1)
+    else:
+        mins, maxs, populated = block.min(axis=1), block.max(axis=1), block.any(axis=1)
+
+    return mins, maxs, populated
+
+
+def data_ranges(cube: Cube, dim: str = "time", block_size: int = BLOCK_SIZE) -> Ranges:
+    """Calculate the data range of each step of the cube, in a single pass.
+
+    A step is populated if any of its values are non-zero.
+
+    Realised data is reduced in blocks of consecutive steps, each of
+    (at most) `block_size` bytes, rather than one step at a time. Lazy data is
+    reduced by a single dask computation, so the cube is never realised, and
+    each chunk is only loaded once for all the reductions.
+
+    Parameters
+    ----------
+    cube : Cube
+        The cube to reduce.
+    dim : str, default="time"
+        The name of the coordinate of the step dimension.
+    block_size : int, default=BLOCK_SIZE
+        The maximum size (bytes) of each block of realised data.
+
+    Returns
+    -------
+    Ranges
+
+    """
+    (tdim,) = cube.coord_dims(dim)
+    nsteps = cube.shape[tdim]
+
+    if cube.has_lazy_data():
+        import dask.array as da
+
+        data = da.moveaxis(cube.lazy_data(), tdim, 0).reshape(nsteps, -1)
+        mins, maxs, populated = da.compute(
+            data.min(axis=1), data.max(axis=1), (data != 0).any(axis=1)
+        )
+        mins = np.ma.filled(mins.astype(float), np.nan)
+        maxs = np.ma.filled(maxs.astype(float), np.nan)
+        populated = np.ma.filled(populated, False)
+    else:
+        data = np.moveaxis(cube.data, tdim, 0).reshape(nsteps, -1)
+        step = max(1, block_size // max(1, data[:1].nbytes))
+        mins, maxs, populated = (
+            np.concatenate(results)
+            for results in zip(
+                *(_reduce(data[i : i + step]) for i in range(0, nsteps, step)), strict=True
+            )
+        )
+
+    return Ranges(mins=mins, maxs=maxs, populated=populated)
@@ -0,0 +1,131 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Structured index of the time steps encoded in the registry asset names."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import pooch
+
+__all__ = ["Asset", "Index", "Window", "parse_steps", "parse_time"]
+
+TIME_FORMAT: str = "%Y%m%d%H%M"
+PATTERN_STEP = re.compile(r"_T(?P<step>\d+)_")
+PATTERN_TIME = re.compile(r"_(?P<time>\d{12})(?:\.|$)")
+
+
+def parse_time(name: str) -> datetime | None:
+    """Return the timestamp encoded in the asset or member `name`, if any."""
+    if (match := PATTERN_TIME.search(name)) is None:
+        return None
+
+    return datetime.strptime(match["time"], TIME_FORMAT)
+
+
+def parse_steps(value: str | None) -> tuple[int | None, int | None]:
+    """Parse an inclusive ``[first]:[last]`` time step range, or a single step."""
+    if not value:
+        return None, None
+
+    first, sep, last = value.partition(":")
+
+    try:
+        first = int(first) if first else None
+        last = (int(last) if last else None) if sep else first
+    except ValueError:
+        emsg = f"Expected a time step range of the form 'first:last', got {value!r}."
+        raise ValueError(emsg) from None
+
+    return first, last
+
+
+@dataclass(frozen=True)
+class Window:
+    """Inclusive time and time step bounds used to select assets."""
+
+    start: datetime | None = None
+    end: datetime | None = None
+    first: int | None = None
+    last: int | None = None
+
+    def __bool__(self) -> bool:
+        return any(bound is not None for bound in (self.start, self.end, self.first, self.last))
+
+    def __contains__(self, asset: Asset) -> bool:
+        if asset.time is not None:
+            if self.start is not None and asset.time < self.start:
+                return False
+            if self.end is not None and asset.time > self.end:
+                return False
+        if asset.step is not None:
+            if self.first is not None and asset.step < self.first:
+                return False
+            if self.last is not None and asset.step > self.last:
+                return False
+        return True
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A registry asset, along with any time step metadata in its name."""
+
+    name: str
+    dataset: str
+    known_hash: str | None = None
+    step: int | None = None
+    time: datetime | None = None
+
+    @classmethod
+    def parse(cls, name: str, known_hash: str | None = None) -> Asset:
+        dataset = name.split("/", 1)[0]
+        step = int(match["step"]) if (match := PATTERN_STEP.search(name)) else None
+        return cls(name, dataset, known_hash=known_hash, step=step, time=parse_time(name))
+
+
+class Index:
+    """Registry assets grouped by dataset, and ordered by time step."""
+
+    def __init__(self, assets: Iterable[Asset]) -> None:
+        def key(asset: Asset) -> tuple:
+            return (asset.step is not None, asset.step or 0, asset.time or datetime.min, asset.name)
+
+        self.datasets: dict[str, list[Asset]] = {}
+
+        for asset in sorted(assets, key=key):
+            self.datasets.setdefault(asset.dataset, []).append(asset)
+
+    @classmethod
+    def from_cache(cls, cache: pooch.Pooch | None = None) -> Index:
+        """Create the index from the registry of the `cache`."""
+        if cache is None:
+            from geojav import CACHE as cache
+
+        return cls(Asset.parse(name, known_hash) for name, known_hash in cache.registry.items())
+
+    def __getitem__(self, dataset: str) -> list[Asset]:
+        return self.datasets[dataset]
+
+    def steps(self, dataset: str) -> list[Asset]:
+        """Return the time step assets of the `dataset`."""
+        return [asset for asset in self[dataset] if asset.step is not None or asset.time is not None]
+
+    def select(self, dataset: str, window: Window | None = None) -> list[str]:
+        """Return the names of the `dataset` assets within the time `window`.
+
+        Assets without any time step metadata are always selected.
+
+        """
+        if window is None:
+            window = Window()
+
+        return [asset.name for asset in self[dataset] if asset in window]
@@ -5,68 +5,195 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from pathlib import Path
 
+import click
 import iris
 
-from geojav import CACHE
-
-
-def main() -> None:
+from geojav import CACHE, sparse, stats
+from geojav.fetch import WORKERS, fetch_assets
+from geojav.netcdf import CODEC, COMPLEVEL
+from geojav.registry import Index, Window, parse_steps, parse_time
+from geojav.store import SUFFIX, available
+from geojav.stream import BUDGET, backend, codecs, stream
+
+TIME_FORMATS: list[str] = ["%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%Y%m%d%H%M"]
+
+
+@click.command()
+@click.option(
+    "-w",
+    "--workers",
+    default=WORKERS,
+    show_default=True,
+    help="Maximum number of concurrent asset downloads.",
+)
+@click.option(
+    "-b",
+    "--budget",
+    default=BUDGET,
+    show_default=True,
+    help="Memory budget (MiB) of the time steps unpacked at once.",
+)
+@click.option(
+    "-c",
+    "--codec",
+    type=click.Choice(codecs()),
+    default=CODEC,
+    show_default=True,
+    help=(
+        "Compression codec of the time-series NetCDF file or Zarr store. The bytes are "
+        "shuffled before compression, except by zstd or bzip2 for a NetCDF file, or by "
+        "any codec other than blosc for a Zarr store. A Zarr store does not support bzip2."
+    ),
+)
+@click.option(
+    "-l",
+    "--complevel",
+    default=COMPLEVEL,
+    show_default=True,
+    help="Compression level of the codec.",
+)
+@click.option(
+    "--reverify",
+    is_flag=True,
+    help="Re-hash all cached assets, ignoring their verification stamps.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=TIME_FORMATS),
+    help="Only process time steps at or after this time (UTC).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=TIME_FORMATS),
+    help="Only process time steps at or before this time (UTC).",
+)
+@click.option(
+    "--steps",
+    help="Only process the inclusive registry time step range 'first:last'.",
+)
+@click.option(
+    "-u",
+    "--update",
+    is_flag=True,
+    help="Append any new time steps to an existing time-series NetCDF file or Zarr store.",
+)
+@click.option(
+    "--zarr",
+    is_flag=True,
+    help="Unpack to a Zarr store, rather than a NetCDF file (requires zarr).",
+)
+@click.option(
+    "--sparse",
+    "plume",
+    is_flag=True,
+    help="Also unpack the positive cells of each time step to a sparse plume store.",
+)
+def main(
+    workers: int,
+    budget: int,
+    codec: str,
+    complevel: int,
+    reverify: bool,
+    start: datetime | None,
+    end: datetime | None,
+    steps: str | None,
+    update: bool,
+    zarr: bool,
+    plume: bool,
+) -> None:
     iris.FUTURE.save_split_attrs = True
     iris.FUTURE.date_microseconds = True
 
-    if Path("sulphur_dioxide_air_concentration.nc").exists():
-        print("\nReykjanes time-series NetCDF file already exists, skipping ...\n")
-        return
+    name = "SULPHUR_DIOXIDE_AIR_CONCENTRATION"
+    fname = f"{name.lower()}{SUFFIX if zarr else '.nc'}"
+    kind = "Zarr store" if zarr else "NetCDF file"
+    io = backend(fname)
+    latest = None
+
+    # validate the options of the format before anything is fetched or written
+    if zarr and not available():
+        emsg = "The optional 'zarr' package is required by '--zarr' e.g., pip install geojav[zarr]."
+        raise click.UsageError(emsg)
+    if codec not in io.codecs():
+        emsg = f"Unsupported codec {codec!r} for a {kind}, choose from {', '.join(io.codecs())}."
+        raise click.BadParameter(emsg, param_hint="'--codec'")
+
+    if Path(fname).exists():
+        if not update:
+            print(f"\nReykjanes time-series {kind} already exists, skipping ...\n")
+            return
+        latest = io.last_time(fname)
+        if plume and not sparse.path(fname).exists():
+            emsg = "No sparse plume store to update, rebuild the time-series instead."
+            raise click.UsageError(emsg)
+        print(f"\nUpdating Reykjanes time-series {kind} after {latest} ...")
+
+    try:
+        first, last = parse_steps(steps)
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="'--steps'") from None
+
+    window = Window(start=start, end=end, first=first, last=last)
 
     print("\nFetching assets ...\n")
 
-    # fetch all the reykjanes assets in the registry
-    for asset in CACHE.registry_files:
-        if asset.startswith("reykjanes"):
-            CACHE.fetch(asset)
+    # fetch the reykjanes assets in the registry, within any time window
+    assets = Index.from_cache(CACHE).select("reykjanes", window)
+    if not assets:
+        print("\tNo time steps in the requested window, skipping ...\n")
+        return
+    if latest is not None:
+        # only the time steps after those already unpacked are required
+        assets = [asset for asset in assets if (time := parse_time(asset)) is None or time > latest]
+        if not assets:
+            print("\tNo new time steps, skipping ...\n")
+            return
+    fnames = fetch_assets(assets, workers=workers, reverify=reverify)
 
     # load the so2 dataset
-    name = "SULPHUR_DIOXIDE_AIR_CONCENTRATION"
-
-    print(f"\nLoading {' '.join(part.capitalize() for part in name.split('_'))} ...\n")
-    cube = iris.load_cube(CACHE.abspath / "reykjanes" / "*.nc", name)
-    print(cube)
-
-    if cube.units != (target := "μg/m^3"):
-        print(f"\nConverting units {str(cube.units)!r} -> {target!r} ...")
-        cube.convert_units(target)
-
-    # calculate the data range for each time step
-    print("\nCalculating data range for each time step ...\n")
-    dmin, dmax = None, None
-    tsteps = []
-    for i, scube in enumerate(cube.slices_over("time")):
-        data = scube.data
-        min, max = data.min(), data.max()
-        if dmin is None or min < dmin:
-            dmin = min
-        if dmax is None or max > dmax:
-            dmax = max
-        if data.sum():
-            tsteps.append(i)
-
-    dmin, dmax = float(dmin), float(dmax)
+    units = "μg/m^3"
+
+    def load(fnames: list[Path]) -> iris.cube.Cube:
+        return iris.load_cube(fnames, name)
+
+    def prepare(cube: iris.cube.Cube) -> iris.cube.Cube:
+        if cube.units != units:
+            cube.convert_units(units)
+        return cube
+
+    # stream chunks of time steps into a netcdf file or zarr store, converting units,
+    # calculating the data range and discarding time steps with no data,
+    # compressed and chunked by time step
+    print(f"\nUnpacking {' '.join(part.capitalize() for part in name.split('_'))} ...\n")
+    summary = stream(
+        fnames,
+        fname,
+        load,
+        prepare=prepare,
+        budget=budget,
+        update=update,
+        plume=plume,
+        codec=codec,
+        complevel=complevel,
+    )
+
+    dmin, dmax = summary.dmin, summary.dmax
     print(f"\t{dmin=}, {dmax=}")
+    print(f"\tDiscarded {summary.nsteps - summary.nkept} of {summary.nsteps} time steps with no data")
+
+    if not summary.nkept:
+        print("\tNo time steps with data, skipping ...\n")
+        return
 
-    # discard time steps with no data
-    print("\nDiscarding time steps with no data ...\n")
-    slicer = [slice(None)] * cube.ndim
-    slicer[cube.coord_dims("time")[0]] = tsteps
-    cube = cube[tuple(slicer)]
-    print(cube)
-
-    # serialize to a netcdf file
-    print(f'\nSaving to NetCDF ...\n')
-    fname = f"{cube.name().lower()}.nc"
-    iris.save(cube, fname)
-    print(f"\tCreated {fname!r}\n")
+    print(f"\n{io.load(fname) if zarr else iris.load_cube(fname)}")
+    print(f"\n\t{'Updated' if latest else 'Created'} {fname!r}")
+    for sidecar in (stats.path(fname), sparse.path(fname)):
+        if sidecar.exists():
+            print(f"\t{'Updated' if latest else 'Created'} {str(sidecar)!r}")
+    print()
     print("Done 👍")
 
 
@@ -11,18 +11,20 @@ from pathlib import Path
 
 from cf_units import Unit
 import geovista
-from geovista.common import to_cartesian
 from geovista.pantry.data import capitalise
 from geovista.crs import to_wkt, WGS84
 from geovista.qt import GeoBackgroundPlotter
 from geovista.themes import restore_plot_theme
-import iris
-import netCDF4 as nc
 import numpy as np
 import pyvista as pv
 from geopy.geocoders import Nominatim
 
+from geojav import blanking, prefetch
+from geojav.prepare import DATASETS
+
 BASE_DIR = Path(__file__).parent
+# the time-series, mesh and frames of the renderer, shared with pre-warm
+dataset = DATASETS["reykjanes"]
 
 #
 # callback state
@@ -40,6 +42,9 @@ isosurfaces = 200
 iterations = 20
 passband = 0.1
 log_scale = True
+ncells = 0
+actor_threshold = None
+title_threshold = r"Threshold $(\mu g \ m^{-3})$"
 
 class GeocodeDummy:
     def __init__(self,address,longitude,latitude):
@@ -47,24 +52,6 @@ class GeocodeDummy:
         self.longitude = longitude
         self.latitude = latitude
 
-def cache(mesh, data, tstep) -> pv.UnstructuredGrid:
-    tdir = BASE_DIR / "vtk"
-    tdir.mkdir(exist_ok=True)
-    fname = tdir / f"reykjanes_{tstep:03}.vtk"
-    if not fname.exists():
-        tdata = np.ma.masked_less_equal(data[tstep][:], 0).filled(np.nan).flatten()
-        mesh["data"] = tdata
-        to_wkt(mesh, WGS84)
-        mesh.active_scalars_name = "data"
-        tmp = mesh.threshold()
-        tmp.save(fname)
-        result = tmp
-    else:
-        result = pv.read(fname)
-
-    return result
-
-
 def callback_isosurfaces(value) -> None:
     global isosurfaces
 
@@ -118,6 +105,12 @@ def callback_passband(value) -> None:
     callback_render(None)
 
 
+def label_threshold() -> None:
+    # show the number of cells at or above the threshold, before they are rendered
+    if actor_threshold is not None:
+        actor_threshold.GetRepresentation().SetTitleText(f"{title_threshold} [{ncells:,} cells]")
+
+
 def callback_threshold(value) -> None:
     global threshold
 
@@ -278,6 +271,12 @@ def checkbox_smooth(flag: bool) -> None:
         callback_render(None)
 
 
+def callback_close() -> None:
+    # stop prefetching, then release the lock of the frame store
+    prefetcher.close(wait=True)
+    plume_frames.close()
+
+
 def callback_render(value) -> None:
     global tstep
     global n_tsteps
@@ -302,6 +301,7 @@ def callback_render(value) -> None:
     global actor_scalar_bar
     global iterations
     global passband
+    global ncells
 
 
     if value is None:
@@ -312,10 +312,27 @@ def callback_render(value) -> None:
     value = int(f"{value:.0f}")
     tstep = value % n_tsteps
 
-    frame = cache(mesh, data, tstep)
+    level = 0 if show_isosurfaces else threshold
+    if plume_stats is not None and not plume_stats.maxs[tstep] >= (level or 0):
+        # nothing in the time step reaches the threshold, so skip the frame
+        frame = pv.UnstructuredGrid()
+        ncells = 0
+        label_threshold()
+    else:
+        frame = prefetcher.get(tstep)
+
+        # search the index of the frame for the cells at or above the threshold,
+        # rather than thresholding every cell
+        index = plume_frames.index(tstep, frame)
+        ncells = index.count(threshold)
+        label_threshold()
 
-    if not show_isosurfaces and threshold:
-        frame = frame.threshold(threshold)
+        frame = index.extract(level)
+
+        if show_clip or show_smooth or show_isosurfaces:
+            # the filters also visit the hidden cells of a blanked frame, so
+            # only keep its visible cells
+            frame = blanking.explicit(frame)
 
     if frame.is_empty:
         p.remove_actor("plume")
@@ -402,11 +419,10 @@ def callback_render(value) -> None:
 
 
 # sort the assets in date ascending date order
-fname = BASE_DIR / "data" / "sulphur_dioxide_air_concentration.nc"
-cube = iris.load_cube(fname)
-
-ds = nc.Dataset(fname)
-data = ds.variables["SULPHUR_DIOXIDE_AIR_CONCENTRATION"]
+# load the time-series, preferring any zarr store or sparse plume store, along
+# with the statistics of each time step, if unpacked
+source = dataset.load()
+cube, data, plume_stats = source.cube, source.data, source.stats
 
 # bootstrap
 t = cube.coord("time")
@@ -420,39 +436,45 @@ fmt = "%Y-%m-%d %H:%M UTC"
 n_tsteps = t.shape[0]
 tstep = 0
 
-y_cb = y.contiguous_bounds()
-x_cb = x.contiguous_bounds() #degrees
-z_cb = z.contiguous_bounds() #in m
-
-Re = 6371000 # Earth radius in m
-z_h = z_cb/Re #z_cb in Earth radii
-
-zscale = np.mean(np.diff(y_cb))*(np.pi/180) / (2*np.mean(np.diff(z_h))) #
-z_fix = z_h
-
-xx, yy, zz = np.meshgrid(x_cb, y_cb, z_fix, indexing="ij")
-shape = xx.shape
+geometry = dataset.geometry(cube)
+mesh = geometry.mesh
+zscale = geometry.zscale
 
 clim_isosurfaces = 0.0, 4027.0
 clim_log_scale = 1e-3, 5e4
+threshold_range = 0.1, 500.0
+
+if plume_stats is not None and plume_stats.steps:
+    # set the ranges from the statistics of the plume, rather than the data
+    dmax = plume_stats.dmax
+    clim_isosurfaces = 0.0, dmax
+    clim_log_scale = max(clim_log_scale[0], plume_stats.dmin), dmax
+    upper = float(np.nanmax(plume_stats.percentile(99.0)))
+    if upper > threshold_range[0]:
+        threshold_range = threshold_range[0], upper
+
 clim = clim_log_scale if log_scale else clim_isosurfaces
 
 isosurfaces_range = clim_isosurfaces
 
-xyz = to_cartesian(xx, yy, zlevel=zz, zscale=zscale)
-mesh = pv.StructuredGrid(xyz[:, 0].reshape(shape), xyz[:, 1].reshape(shape), xyz[:, 2].reshape(shape))
-
 domain = mesh.extract_feature_edges()
 to_wkt(domain, WGS84)
 
 cmap = "magma_r"
 color = "white"
 
-frame = cache(mesh, data, tstep)
+# the frames of the time-series, served from memory, then the frame store
+plume_frames = dataset.frames(source, geometry)
+
+# prepare the neighbouring time steps in the background, while scrubbing
+prefetcher = prefetch.Prefetcher(plume_frames.get, n_tsteps, cached=plume_frames.cached)
+
+frame = prefetcher.get(tstep)
 
 _ = restore_plot_theme()
 
 p = GeoBackgroundPlotter()
+p.app_window.signal_close.connect(callback_close)
 p.set_background(color="black")
 
 sargs = {
@@ -517,7 +539,7 @@ p.add_slider_widget(
 
 actor_threshold = p.add_slider_widget(
     callback_threshold,
-    (0.1, 500.0),
+    threshold_range,
     value=threshold,
     pointa=(0.55, 0.80),
     pointb=(0.90, 0.80),
@@ -526,9 +548,10 @@ actor_threshold = p.add_slider_widget(
     style="modern",
     slider_width=0.02,
     tube_width=0.001,
-    title=r"Threshold $(\mu g \ m^{-3})$",
+    title=title_threshold,
     title_height=0.02,
 )
+label_threshold()
 
 actor_isosurfaces = p.add_slider_widget(
     callback_isosurfaces,
@@ -0,0 +1,264 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Memory mapped scalars of all the time steps, for a shared frame geometry.
+
+Rather than a thresholded frame per time step, each with its own copy of the
+geometry, the frame of every time step may share the geometry of the whole
+mesh, built once, with only its scalars differing. The scalars of all the time
+steps are held in a single memory mapped ``float32`` array of shape
+``(time, ncells)``, in the cell order of the mesh, so a frame is produced by
+pointing a shallow copy of the geometry at the row view of its time step.
+
+The rows are filled on first use, and each row is keyed by its time step, and
+the identity of the time-series, see :func:`geojav.frames.digest`, so that a
+stale row is refilled.
+
+The scalars of a time step are cast straight into their row, or into a reused
+buffer of the calling thread, see :class:`Buffer`, and masked in place, rather
+than through a chain of masked, filled and flattened copies.
+
+Enable the shared geometry frames of the renderers with the
+``GEOJAV_SHARED_GEOMETRY`` environment variable.
+
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+from pathlib import Path
+import threading
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from geojav import sparse
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import pyvista as pv
+
+__all__ = [
+    "ENV",
+    "SUFFIX",
+    "Buffer",
+    "Scalars",
+    "buffer",
+    "cell_ids",
+    "enabled",
+    "flatten",
+    "frame",
+]
+
+DTYPE: str = "float32"
+ENV: str = "GEOJAV_SHARED_GEOMETRY"
+KEY_DTYPE: str = "S16"
+KEYS_SUFFIX: str = ".keys.npy"
+SUFFIX: str = ".scalars.npy"
+
+_local = threading.local()
+
+
+def enabled() -> bool:
+    """Determine whether the shared geometry frames are enabled."""
+    return os.environ.get(ENV, "").lower() not in ("", "0", "false", "no", "off")
+
+
+@functools.lru_cache(maxsize=2)
+def cell_ids(ncells: int) -> np.ndarray:
+    """Return the flat cell indices of a mesh, which are shared, so read-only."""
+    result = np.arange(ncells)
+    result.flags.writeable = False
+    return result
+
+
+class Buffer:
+    """Reused buffers of the flattened scalars and cell indices of a frame.
+
+    The buffers grow as needed, and the arrays returned are views of them, so
+    are only valid until the buffer is next filled. Each thread has its own
+    buffer, see :func:`buffer`.
+
+    """
+
+    def __init__(self) -> None:
+        self.values = np.empty(0, dtype=DTYPE)
+        self.mask = np.empty(0, dtype=bool)
+        self.ids = np.empty(0, dtype=np.intp)
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        return array if array.size >= size else np.empty(size, dtype=array.dtype)
+
+    def fill(self, tdata: Any, out: np.ndarray | None = None) -> np.ndarray:
+        """Return the flattened values, with NaN in each non-positive or masked cell.
+
+        The values are cast straight into `out`, when given, otherwise into the
+        buffer, in C order i.e., the cell order of the mesh, then masked in place.
+
+        """
+        size = np.size(tdata)
+        self.mask = self._grow(self.mask, size)
+        mask = self.mask[:size]
+        if out is None:
+            self.values = self._grow(self.values, size)
+            out = self.values[:size]
+
+        np.copyto(out.reshape(np.shape(tdata)), np.ma.getdata(tdata), casting="unsafe")
+        np.less_equal(out, 0, out=mask)
+        if np.ma.is_masked(tdata):
+            np.logical_or(mask, np.ma.getmaskarray(tdata).ravel(), out=mask)
+        np.copyto(out, np.nan, where=mask)
+
+        return out
+
+    def cell_ids(self, slices: tuple[slice, ...], shape: tuple[int, ...]) -> np.ndarray:
+        """Return the flat cell indices of the mesh, within the bounding box.
+
+        See :func:`geojav.crop.cell_ids`.
+
+        """
+        ids = cell_ids(int(np.prod(shape))).reshape(shape)[tuple(slices)]
+        self.ids = self._grow(self.ids, ids.size)
+        out = self.ids[: ids.size]
+        np.copyto(out.reshape(ids.shape), ids)
+
+        return out
+
+
+def buffer() -> Buffer:
+    """Return the buffer of the calling thread."""
+    if (result := getattr(_local, "buffer", None)) is None:
+        result = _local.buffer = Buffer()
+    return result
+
+
+def flatten(data: Any, tstep: int, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the flattened scalars of the time step, with NaN in each non-positive cell.
+
+    Parameters
+    ----------
+    data : Plume or array-like
+        The sparse plume, or the dense data with time as its leading dimension.
+    tstep : int
+        The time step.
+    out : ndarray, optional
+        The ``float32`` array to fill e.g., the row of the time step, rather
+        than a new array.
+
+    """
+    if isinstance(data, sparse.Plume):
+        return data.dense(tstep, out=out)
+
+    if out is None:
+        out = np.empty(int(np.prod(data.shape[1:])), dtype=DTYPE)
+
+    return buffer().fill(data[tstep], out=out)
+
+
+def frame(geometry: pv.DataSet, values: np.ndarray, name: str = "data") -> pv.DataSet:
+    """Return a frame of the geometry, pointed at the scalars without copying.
+
+    The frame is a shallow copy of the geometry, so the geometry itself is
+    never modified, and its points and cells are shared by every frame.
+
+    """
+    result = geometry.copy(deep=False)
+    result.cell_data.set_array(values, name, deep_copy=False)
+    result.active_scalars_name = name
+
+    return result
+
+
+class Scalars:
+    """Memory mapped ``(time, ncells)`` scalars, filled one time step at a time.
+
+    The store is opened for update, and is recreated if it does not exist, or
+    does not have the expected shape. The key of the content of each row is
+    held in a memory mapped sidecar, and is only written after its row, so
+    that an interrupted write leaves a row unkeyed, rather than stale.
+
+    A `private` store is mapped copy-on-write, and is never created, so that
+    the rows filled are only held in the memory of the process e.g., while
+    the store is written by another process. A private store that does not
+    exist, or does not have the expected shape, is held in memory.
+
+    """
+
+    def __init__(self, fname: str | Path, shape: tuple[int, int], private: bool = False) -> None:
+        self.fname = Path(fname)
+        self.kname = self.fname.with_suffix(KEYS_SUFFIX)
+        self.private = private
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+        self.data, self.keys = self._open(tuple(shape))
+
+    def _open(self, shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        from numpy.lib.format import open_memmap
+
+        mode = "c" if self.private else "r+"
+        try:
+            data = open_memmap(self.fname, mode=mode)
+            keys = open_memmap(self.kname, mode=mode)
+        except (OSError, ValueError):
+            pass
+        else:
+            if data.shape == shape and data.dtype == DTYPE and keys.shape == shape[:1]:
+                return data, keys
+
+        if self.private:
+            # the pages of the rows are only allocated when filled
+            return np.zeros(shape, dtype=DTYPE), np.zeros(shape[:1], dtype=KEY_DTYPE)
+
+        # the rows of a new store are never read until filled, so the file is
+        # created sparse, rather than written
+        data = open_memmap(self.fname, mode="w+", dtype=DTYPE, shape=shape)
+        keys = open_memmap(self.kname, mode="w+", dtype=KEY_DTYPE, shape=shape[:1])
+
+        return data, keys
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def filled(self, tstep: int, key: str) -> bool:
+        """Determine whether the row of the time step is filled with the `key`."""
+        return self.keys[tstep] == key.encode()
+
+    def get(self, tstep: int, key: str) -> np.ndarray | None:
+        """Return the row view of the time step, or ``None`` if not filled with the `key`."""
+        return self.data[tstep] if self.filled(tstep, key) else None
+
+    def fill(self, tstep: int, key: str, fill: Callable[[np.ndarray], Any]) -> np.ndarray:
+        """Fill the row of the time step in place, with the `key` of its content.
+
+        Parameters
+        ----------
+        tstep : int
+            The time step.
+        key : str
+            The key of the content of the time step.
+        fill : callable
+            Fill the row view of the time step e.g., see :func:`flatten`.
+
+        Returns
+        -------
+        ndarray
+            The row view of the time step.
+
+        """
+        self.keys[tstep] = b""
+        fill(self.data[tstep])
+        if not self.private:
+            self.data.flush()
+        self.keys[tstep] = key.encode()
+        if not self.private:
+            self.keys.flush()
+
+        return self.data[tstep]
+
+    def put(self, tstep: int, values: np.ndarray, key: str) -> np.ndarray:
+        """Fill the row of the time step with the values, see :meth:`fill`."""
+        return self.fill(tstep, key, lambda row: np.copyto(row, values))
@@ -0,0 +1,224 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Sparse storage of the positive cells of each time step of a time-series.
+
+The plume of a time step typically occupies a small fraction of the domain, and
+the renderers discard all of the zero, negative or masked cells. Instead, only
+the positive cells are stored, compressed sparse row (CSR) style over time i.e.,
+the flat cell indices and ``float32`` values of all the time steps are stored
+contiguously, along with the offset of each time step.
+
+A plume store is a directory, alongside its time-series, containing::
+
+    plume.json    the shape and dtypes of the plume
+    indptr.npy    the offsets of each time step, with length nsteps + 1
+    indices.bin   the flat (C order) cell indices of all the time steps
+    values.bin    the values of all the time steps
+
+The indices and values are memory mapped when loaded, so the cost of reading
+a time step scales with the volume of its plume, rather than its domain.
+
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+__all__ = ["SUFFIX", "Plume", "append", "load", "path", "save", "sparsify"]
+
+INDEX_DTYPES: tuple[str, str] = ("uint32", "int64")
+INDPTR: str = "indptr.npy"
+INDICES: str = "indices.bin"
+META: str = "plume.json"
+SUFFIX: str = ".sparse"
+VALUE_DTYPE: str = "float32"
+VALUES: str = "values.bin"
+
+
+@dataclass
+class Plume:
+    """The positive cells of each time step, CSR style over time."""
+
+    shape: tuple[int, ...]
+    indptr: np.ndarray
+    indices: np.ndarray
+    values: np.ndarray
+
+    def __getitem__(self, tstep: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the flat cell indices and values of the time step."""
+        start, stop = self.indptr[tstep], self.indptr[tstep + 1]
+        return self.indices[start:stop], self.values[start:stop]
+
+    def __len__(self) -> int:
+        return self.nsteps
+
+    @property
+    def ncells(self) -> int:
+        """The number of cells in each time step."""
+        return int(np.prod(self.shape))
+
+    @property
+    def nsteps(self) -> int:
+        """The number of time steps."""
+        return self.indptr.size - 1
+
+    @property
+    def counts(self) -> np.ndarray:
+        """The number of positive cells in each time step."""
+        return np.diff(self.indptr)
+
+    def dense(self, tstep: int, out: np.ndarray | None = None) -> np.ndarray:
+        """Return the flattened time step, with a NaN in each non-positive cell.
+
+        The time step is scattered into `out`, when given, rather than a new array.
+
+        """
+        indices, values = self[tstep]
+        if out is None:
+            result = np.full(self.ncells, np.nan, dtype=VALUE_DTYPE)
+        else:
+            result = out
+            result.fill(np.nan)
+        result[indices] = values
+        return result
+
+
+def _index_dtype(ncells: int) -> np.dtype:
+    # the smallest index dtype of the flat cell indices of a time step
+    small, large = (np.dtype(dtype) for dtype in INDEX_DTYPES)
+    return small if ncells <= np.iinfo(small).max else large
+
+
+def sparsify(data: np.ndarray) -> Plume:
+    """Convert the realised time-series data to a sparse plume.
+
+    Parameters
+    ----------
+    data : ndarray or MaskedArray
+        The data, with time as its leading dimension.
+
+    Returns
+    -------
+    Plume
+        The positive cells of each time step. Zero, negative, NaN and masked
+        cells are discarded.
+
+    """
+    shape = tuple(data.shape[1:])
+    flat = np.ma.filled(data, 0).reshape(data.shape[0], -1)
+    positive = flat > 0
+
+    indptr = np.zeros(data.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.count_nonzero(positive, axis=1), out=indptr[1:])
+    # the row-major non-zeros are ordered by time step, then cell
+    _, indices = np.nonzero(positive)
+
+    return Plume(
+        shape=shape,
+        indptr=indptr,
+        indices=indices.astype(_index_dtype(flat.shape[1])),
+        values=flat[positive].astype(VALUE_DTYPE),
+    )
+
+
+def path(target: str | Path) -> Path:
+    """Return the plume store alongside the time-series `target`."""
+    return Path(target).with_suffix(SUFFIX)
+
+
+def _write_indptr(store: Path, indptr: np.ndarray) -> None:
+    # replace the offsets last and atomically, so that a reader never sees
+    # offsets beyond the indices and values written
+    tmp = store / f".{INDPTR}"
+    with tmp.open("wb") as fh:
+        np.save(fh, indptr)
+    os.replace(tmp, store / INDPTR)
+
+
+def save(plume: Plume, store: str | Path) -> None:
+    """Save the plume to a new store, replacing any existing store."""
+    store = Path(store)
+    store.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "shape": list(plume.shape),
+        "index": plume.indices.dtype.name,
+        "value": VALUE_DTYPE,
+    }
+    (store / META).write_text(json.dumps(meta))
+    plume.indices.tofile(store / INDICES)
+    plume.values.astype(VALUE_DTYPE, copy=False).tofile(store / VALUES)
+    _write_indptr(store, plume.indptr)
+
+
+def append(plume: Plume, store: str | Path) -> int:
+    """Append the time steps of the plume to an existing store.
+
+    Only the new indices and values are written, along with the offsets.
+
+    Returns
+    -------
+    int
+        The number of time steps in the store, after appending.
+
+    """
+    store = Path(store)
+    meta = json.loads((store / META).read_text())
+
+    if tuple(meta["shape"]) != plume.shape:
+        emsg = f"Expected time steps of shape {tuple(meta['shape'])}, got {plume.shape}."
+        raise ValueError(emsg)
+
+    indptr = np.load(store / INDPTR)
+    columns = ((INDICES, meta["index"], plume.indices), (VALUES, meta["value"], plume.values))
+    for name, dtype, array in columns:
+        fname = store / name
+        # discard anything beyond the offsets, from an interrupted append
+        os.truncate(fname, int(indptr[-1]) * np.dtype(dtype).itemsize)
+        with fname.open("ab") as fh:
+            array.astype(dtype, copy=False).tofile(fh)
+
+    indptr = np.concatenate([indptr, indptr[-1] + plume.indptr[1:]])
+    _write_indptr(store, indptr)
+
+    return indptr.size - 1
+
+
+def _map(fname: Path, dtype: str, size: int, mmap: bool) -> np.ndarray:
+    # an empty file may not be memory mapped
+    if not mmap or not size:
+        return np.fromfile(fname, dtype=dtype, count=size)
+    return np.memmap(fname, dtype=dtype, mode="r", shape=(size,))
+
+
+def load(store: str | Path, mmap: bool = True) -> Plume:
+    """Load the plume store.
+
+    Parameters
+    ----------
+    store : str or Path
+        The plume store directory.
+    mmap : bool, default=True
+        Memory map the indices and values, rather than reading them.
+
+    """
+    store = Path(store)
+    meta = json.loads((store / META).read_text())
+    indptr = np.load(store / INDPTR)
+    # ignore any indices and values beyond the offsets, from an interrupted append
+    size = int(indptr[-1])
+
+    return Plume(
+        shape=tuple(meta["shape"]),
+        indptr=indptr,
+        indices=_map(store / INDICES, meta["index"], size, mmap),
+        values=_map(store / VALUES, meta["value"], size, mmap),
+    )
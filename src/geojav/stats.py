@@ -0,0 +1,275 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Per time step statistics of the plume of a time-series.
+
+The statistics are summarised from the positive cells of each time step, see
+:mod:`geojav.sparse`, and saved as a compact sidecar alongside the time-series,
+so that the renderers may set their ranges, and skip time steps, at startup
+without reading any of the data.
+
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from geojav.sparse import Plume
+
+__all__ = [
+    "EDGES",
+    "PERCENTILES",
+    "SUFFIX",
+    "Stats",
+    "append",
+    "load",
+    "path",
+    "save",
+    "summarise",
+    "summarise_data",
+]
+
+# the coarse histogram has half-decade bins, with the values beyond the outer
+# edges counted in the outer bins, so that the bins are the same for all time
+# steps, regardless of when they are unpacked
+EDGES: np.ndarray = np.logspace(-6, 6, 25)
+PERCENTILES: tuple[float, ...] = (1.0, 5.0, 25.0, 50.0, 75.0, 95.0, 99.0)
+SUFFIX: str = ".stats.npz"
+
+
+@dataclass
+class Stats:
+    """The statistics of the positive cells of each time step.
+
+    The statistics of an empty time step are NaN, and its bounding box is
+    empty i.e., each start equals each stop.
+
+    """
+
+    mins: np.ndarray
+    maxs: np.ndarray
+    counts: np.ndarray
+    percentiles: np.ndarray
+    histogram: np.ndarray
+    bbox: np.ndarray
+    q: np.ndarray
+    edges: np.ndarray
+
+    def __len__(self) -> int:
+        return self.counts.size
+
+    @property
+    def dmin(self) -> float:
+        """The minimum over all the time steps."""
+        return float(np.nanmin(self.mins)) if np.any(self.counts) else np.nan
+
+    @property
+    def dmax(self) -> float:
+        """The maximum over all the time steps."""
+        return float(np.nanmax(self.maxs)) if np.any(self.counts) else np.nan
+
+    @property
+    def steps(self) -> list[int]:
+        """The indices of the populated time steps."""
+        return np.flatnonzero(self.counts).tolist()
+
+    def percentile(self, q: float) -> np.ndarray:
+        """Return the stored percentile `q` of each time step."""
+        (index,) = np.flatnonzero(self.q == q)
+        return self.percentiles[:, index]
+
+    def slices(self, tstep: int) -> tuple[slice, ...]:
+        """Return the index slices of the bounding box of the time step."""
+        return tuple(slice(int(start), int(stop)) for start, stop in self.bbox[tstep])
+
+
+def summarise(
+    plume: Plume,
+    q: tuple[float, ...] = PERCENTILES,
+    edges: np.ndarray = EDGES,
+) -> Stats:
+    """Summarise the statistics of each time step of the sparse plume.
+
+    Parameters
+    ----------
+    plume : Plume
+        The positive cells of each time step.
+    q : tuple of float, default=PERCENTILES
+        The percentiles of each time step.
+    edges : ndarray, default=EDGES
+        The edges of the bins of the histogram of each time step.
+
+    Returns
+    -------
+    Stats
+        The statistics of each time step.
+
+    """
+    nsteps, counts = plume.nsteps, plume.counts
+    populated = counts > 0
+    # the start of each populated time step, as each is a non-empty segment
+    starts = plume.indptr[:-1][populated]
+    values, indices = np.asarray(plume.values), np.asarray(plume.indices)
+
+    mins = np.full(nsteps, np.nan, dtype=values.dtype)
+    maxs = np.full(nsteps, np.nan, dtype=values.dtype)
+    percentiles = np.full((nsteps, len(q)), np.nan, dtype=np.float64)
+    bbox = np.zeros((nsteps, len(plume.shape), 2), dtype=np.int64)
+    nbins = edges.size - 1
+    histogram = np.zeros((nsteps, nbins), dtype=np.int64)
+
+    if values.size:
+        mins[populated] = np.minimum.reduceat(values, starts)
+        maxs[populated] = np.maximum.reduceat(values, starts)
+
+        for tstep in np.flatnonzero(populated):
+            start, stop = plume.indptr[tstep], plume.indptr[tstep + 1]
+            percentiles[tstep] = np.percentile(values[start:stop], q)
+
+        bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, nbins - 1)
+        owner = np.repeat(np.arange(nsteps), counts)
+        histogram[:] = np.bincount(owner * nbins + bins, minlength=nsteps * nbins).reshape(
+            nsteps, nbins
+        )
+
+        for dim, index in enumerate(np.unravel_index(indices, plume.shape)):
+            bbox[populated, dim, 0] = np.minimum.reduceat(index, starts)
+            bbox[populated, dim, 1] = np.maximum.reduceat(index, starts) + 1
+
+    return Stats(
+        mins=mins,
+        maxs=maxs,
+        counts=counts.astype(np.int64),
+        percentiles=percentiles,
+        histogram=histogram,
+        bbox=bbox,
+        q=np.asarray(q, dtype=np.float64),
+        edges=np.asarray(edges, dtype=np.float64),
+    )
+
+
+def summarise_data(
+    data: np.ndarray,
+    q: tuple[float, ...] = PERCENTILES,
+    edges: np.ndarray = EDGES,
+) -> Stats:
+    """Summarise the statistics of each time step of the realised data.
+
+    The statistics are those of :func:`summarise` of the sparse plume of the
+    `data`, see :func:`geojav.sparse.sparsify`, but are summarised one time
+    step at a time, so the transient arrays are bounded by a single time step,
+    rather than the plume of all of the time steps.
+
+    Parameters
+    ----------
+    data : ndarray or MaskedArray
+        The data, with time as its leading dimension.
+    q : tuple of float, default=PERCENTILES
+        The percentiles of each time step.
+    edges : ndarray, default=EDGES
+        The edges of the bins of the histogram of each time step.
+
+    Returns
+    -------
+    Stats
+        The statistics of each time step.
+
+    """
+    from geojav.sparse import VALUE_DTYPE
+
+    nsteps, shape = data.shape[0], tuple(data.shape[1:])
+    mins = np.full(nsteps, np.nan, dtype=VALUE_DTYPE)
+    maxs = np.full(nsteps, np.nan, dtype=VALUE_DTYPE)
+    counts = np.zeros(nsteps, dtype=np.int64)
+    percentiles = np.full((nsteps, len(q)), np.nan, dtype=np.float64)
+    bbox = np.zeros((nsteps, len(shape), 2), dtype=np.int64)
+    nbins = edges.size - 1
+    histogram = np.zeros((nsteps, nbins), dtype=np.int64)
+
+    for tstep in range(nsteps):
+        tdata = np.ma.filled(data[tstep], 0)
+        positive = tdata > 0
+        counts[tstep] = np.count_nonzero(positive)
+        if not counts[tstep]:
+            continue
+
+        values = tdata[positive].astype(VALUE_DTYPE, copy=False)
+        mins[tstep], maxs[tstep] = values.min(), values.max()
+        percentiles[tstep] = np.percentile(values, q)
+        bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, nbins - 1)
+        histogram[tstep] = np.bincount(bins, minlength=nbins)
+        del values, bins
+
+        for dim in range(len(shape)):
+            others = tuple(axis for axis in range(len(shape)) if axis != dim)
+            (index,) = np.nonzero(positive.any(axis=others))
+            bbox[tstep, dim] = index[0], index[-1] + 1
+
+    return Stats(
+        mins=mins,
+        maxs=maxs,
+        counts=counts,
+        percentiles=percentiles,
+        histogram=histogram,
+        bbox=bbox,
+        q=np.asarray(q, dtype=np.float64),
+        edges=np.asarray(edges, dtype=np.float64),
+    )
+
+
+def path(target: str | Path) -> Path:
+    """Return the statistics sidecar alongside the time-series `target`."""
+    target = Path(target)
+    return target.with_name(f"{target.stem}{SUFFIX}")
+
+
+def save(stats: Stats, fname: str | Path) -> None:
+    """Save the statistics sidecar, atomically replacing any existing sidecar."""
+    fname = Path(fname)
+    tmp = fname.with_name(f".{fname.name}")
+    with tmp.open("wb") as fh:
+        np.savez(fh, **{field.name: getattr(stats, field.name) for field in fields(stats)})
+    os.replace(tmp, fname)
+
+
+def load(fname: str | Path) -> Stats:
+    """Load the statistics sidecar."""
+    with np.load(fname) as npz:
+        return Stats(**{field.name: npz[field.name] for field in fields(Stats)})
+
+
+def append(stats: Stats, fname: str | Path) -> int:
+    """Append the time steps of the statistics to an existing sidecar.
+
+    Returns
+    -------
+    int
+        The number of time steps in the sidecar, after appending.
+
+    """
+    existing = load(fname)
+
+    if not np.array_equal(existing.q, stats.q) or not np.array_equal(existing.edges, stats.edges):
+        emsg = "Expected statistics with the same percentiles and histogram bins."
+        raise ValueError(emsg)
+
+    combined = Stats(
+        **{
+            field.name: np.concatenate([getattr(existing, field.name), getattr(stats, field.name)])
+            for field in fields(Stats)
+            if field.name not in ("q", "edges")
+        },
+        q=existing.q,
+        edges=existing.edges,
+    )
+    save(combined, fname)
+
+    return len(combined)
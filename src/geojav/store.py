@@ -0,0 +1,379 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Save, append and load a Zarr time-series store.
+
+The store mirrors the NetCDF time-series, with the same variables, coordinates
+and attributes, following the conventions of xarray. The data is chunked by
+time step, so concurrent readers of a time step neither contend on a lock, nor
+read any other time step, and appending a time step only writes its own chunk.
+
+Requires the optional ``zarr`` package.
+
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from geojav.netcdf import CODEC, COMPLEVEL, RANGE
+
+if TYPE_CHECKING:
+    from iris.coord_systems import CoordSystem
+    from iris.coords import DimCoord
+    from iris.cube import Cube
+    import zarr
+
+__all__ = [
+    "SUFFIX",
+    "append",
+    "available",
+    "codecs",
+    "last_time",
+    "load",
+    "open_data",
+    "read_range",
+    "save",
+    "update_range",
+]
+
+BOUNDS: str = "bnds"
+DATA_VAR: str = "data_var"
+GRID_MAPPING: str = "latitude_longitude"
+SUFFIX: str = ".zarr"
+
+
+def available() -> bool:
+    """Determine whether the optional ``zarr`` package is installed."""
+    from importlib.util import find_spec
+
+    return find_spec("zarr") is not None
+
+
+def codecs() -> list[str]:
+    """Return the compression codecs of a Zarr store, see :func:`geojav.netcdf.codecs`."""
+    return ["none", "zlib", "zstd", "blosc_lz4", "blosc_zstd"]
+
+
+def _zarr() -> Any:
+    try:
+        import zarr
+    except ImportError:
+        emsg = "The optional 'zarr' package is required to read or write a Zarr store."
+        raise ImportError(emsg) from None
+
+    return zarr
+
+
+def _var_name(obj: Cube | DimCoord) -> str:
+    # as with iris, an unnamed variable is named after its lowercase name
+    return obj.var_name or "_".join(obj.name().lower().split())
+
+
+def _jsonify(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _compressors(codec: str | None, complevel: int, shuffle: bool) -> list | None:
+    if codec in (None, "none"):
+        return None
+
+    from zarr.codecs import BloscCodec, GzipCodec, ZstdCodec
+
+    if codec == "zlib":
+        return [GzipCodec(level=complevel)]
+    if codec == "zstd":
+        return [ZstdCodec(level=complevel)]
+    if codec.startswith("blosc_"):
+        return [
+            BloscCodec(
+                cname=codec.removeprefix("blosc_"),
+                clevel=complevel,
+                shuffle="shuffle" if shuffle else "noshuffle",
+            )
+        ]
+
+    emsg = f"Unsupported Zarr codec {codec!r}."
+    raise ValueError(emsg)
+
+
+def _grid_mapping(crs: CoordSystem) -> dict[str, Any]:
+    from iris.coord_systems import GeogCS
+
+    if not isinstance(crs, GeogCS):
+        emsg = f"Unsupported coordinate system {type(crs).__name__!r}, expected 'GeogCS'."
+        raise ValueError(emsg)
+
+    attrs = {
+        "grid_mapping_name": GRID_MAPPING,
+        "longitude_of_prime_meridian": crs.longitude_of_prime_meridian,
+    }
+    if crs.semi_major_axis == crs.semi_minor_axis:
+        attrs["earth_radius"] = crs.semi_major_axis
+    else:
+        attrs["semi_major_axis"] = crs.semi_major_axis
+        attrs["semi_minor_axis"] = crs.semi_minor_axis
+
+    return attrs
+
+
+def _coord_system(attrs: dict[str, Any]) -> CoordSystem:
+    from iris.coord_systems import GeogCS
+
+    radius = attrs.get("earth_radius")
+    return GeogCS(
+        semi_major_axis=attrs.get("semi_major_axis", radius),
+        semi_minor_axis=attrs.get("semi_minor_axis", radius),
+        longitude_of_prime_meridian=attrs.get("longitude_of_prime_meridian", 0.0),
+    )
+
+
+def _coord_attrs(coord: DimCoord) -> dict[str, Any]:
+    attrs = {key: _jsonify(value) for key, value in coord.attributes.items()}
+    attrs["units"] = str(coord.units)
+    if coord.units.calendar:
+        attrs["calendar"] = coord.units.calendar
+    if coord.standard_name:
+        attrs["standard_name"] = coord.standard_name
+    if coord.long_name:
+        attrs["long_name"] = coord.long_name
+    if coord.has_bounds():
+        attrs["bounds"] = f"{_var_name(coord)}_{BOUNDS}"
+
+    return attrs
+
+
+def save(
+    cube: Cube,
+    path: str | Path,
+    codec: str | None = CODEC,
+    complevel: int = COMPLEVEL,
+    shuffle: bool = True,
+) -> None:
+    """Save the cube as a Zarr store, chunked by time step.
+
+    Parameters
+    ----------
+    cube : Cube
+        The time-series to save, with a dimension coordinate for each
+        dimension, and time as its leading dimension.
+    path : str or Path
+        The directory of the Zarr store.
+    codec : str, default=CODEC
+        The compression codec of the data, see :func:`codecs`. Use ``None`` or
+        ``"none"`` to save the data uncompressed.
+    complevel : int, default=COMPLEVEL
+        The compression level of the codec.
+    shuffle : bool, default=True
+        Shuffle the bytes before compression, for the ``blosc`` codecs.
+
+    """
+    from iris.fileformats.netcdf.saver import CF_CONVENTIONS_VERSION
+
+    zarr = _zarr()
+
+    if cube.coord_dims("time") != (0,):
+        emsg = "Expected time to be the leading dimension of the cube."
+        raise ValueError(emsg)
+
+    coords = [cube.coord(dimensions=dim, dim_coords=True) for dim in range(cube.ndim)]
+    dims = [_var_name(coord) for coord in coords]
+    name = _var_name(cube)
+
+    crs = cube.coord_system()
+    attributes = getattr(cube.attributes, "globals", cube.attributes)
+    group = zarr.open_group(path, mode="w")
+    group.attrs.update({key: _jsonify(value) for key, value in attributes.items()})
+    group.attrs.update(Conventions=CF_CONVENTIONS_VERSION, **{DATA_VAR: name})
+
+    for dim, coord in zip(dims, coords, strict=True):
+        array = group.create_array(
+            dim,
+            shape=coord.shape,
+            dtype=coord.dtype,
+            chunks=(max(1, coord.shape[0]),),
+            dimension_names=[dim],
+        )
+        array[:] = coord.points
+        array.attrs.update(_coord_attrs(coord))
+        if coord.has_bounds():
+            bounds = group.create_array(
+                f"{dim}_{BOUNDS}",
+                shape=coord.bounds.shape,
+                dtype=coord.bounds.dtype,
+                chunks=coord.bounds.shape,
+                dimension_names=[dim, BOUNDS],
+            )
+            bounds[:] = coord.bounds
+
+    if crs is not None:
+        group.create_array(GRID_MAPPING, shape=(), dtype="i4").attrs.update(_grid_mapping(crs))
+
+    data = group.create_array(
+        name,
+        shape=cube.shape,
+        dtype=cube.dtype,
+        chunks=(1, *cube.shape[1:]),
+        compressors=_compressors(codec, complevel, shuffle),
+        fill_value=np.nan,
+        dimension_names=dims,
+    )
+    locals_ = getattr(cube.attributes, "locals", {})
+    data.attrs.update({key: _jsonify(value) for key, value in locals_.items()})
+    data.attrs.update(units=str(cube.units))
+    if cube.standard_name:
+        data.attrs["standard_name"] = cube.standard_name
+    if cube.long_name:
+        data.attrs["long_name"] = cube.long_name
+    if crs is not None:
+        data.attrs["grid_mapping"] = GRID_MAPPING
+    if cube.cell_methods:
+        data.attrs["cell_methods"] = " ".join(str(method) for method in cube.cell_methods)
+
+    # write one time step at a time, so lazy data is never wholly realised
+    for tstep in range(cube.shape[0]):
+        data[tstep] = np.ma.filled(cube[tstep].data, np.nan)
+
+
+def open_data(path: str | Path, mode: str = "r") -> zarr.Array:
+    """Open the data variable of the Zarr store."""
+    group = _zarr().open_group(path, mode=mode)
+    return group[group.attrs[DATA_VAR]]
+
+
+def append(cube: Cube, path: str | Path) -> int:
+    """Append the time steps of the cube to an existing Zarr store.
+
+    Parameters
+    ----------
+    cube : Cube
+        The time steps to append.
+    path : str or Path
+        The directory of the Zarr store.
+
+    Returns
+    -------
+    int
+        The number of time steps in the store, after appending.
+
+    """
+    from cf_units import Unit
+
+    group = _zarr().open_group(path, mode="a")
+    data = group[group.attrs[DATA_VAR]]
+
+    for coord in cube.coords(dimensions=0, dim_coords=True):
+        array = group[_var_name(coord)]
+        coord = coord.copy()
+        coord.convert_units(Unit(array.attrs["units"], calendar=array.attrs.get("calendar")))
+        array.append(coord.points)
+        if coord.has_bounds() and (bounds := array.attrs.get("bounds")):
+            group[bounds].append(coord.bounds)
+
+    for tstep in range(cube.shape[0]):
+        data.append(np.ma.filled(cube[tstep : tstep + 1].data, np.nan))
+
+    return data.shape[0]
+
+
+def last_time(path: str | Path) -> datetime | None:
+    """Return the latest time stored in the Zarr store, if any."""
+    from cf_units import Unit
+
+    group = _zarr().open_group(path, mode="r")
+    if "time" not in group or not (array := group["time"]).size:
+        return None
+
+    unit = Unit(array.attrs["units"], calendar=array.attrs.get("calendar"))
+    return unit.num2pydate(np.max(array[:]))
+
+
+def read_range(path: str | Path, name: str | None = None) -> tuple[float, float] | None:
+    """Return the stored data range of the data variable, if any."""
+    data = open_data(path)
+    if (stored := data.attrs.get(RANGE)) is None:
+        return None
+
+    dmin, dmax = stored
+    return float(dmin), float(dmax)
+
+
+def update_range(
+    path: str | Path,
+    name: str | None,
+    dmin: float,
+    dmax: float,
+    merge: bool = True,
+) -> tuple[float, float]:
+    """Update the stored data range of the data variable in place.
+
+    See :func:`geojav.netcdf.update_range`.
+
+    """
+    data = open_data(path, mode="a")
+    if merge and (stored := data.attrs.get(RANGE)) is not None:
+        dmin, dmax = min(dmin, float(stored[0])), max(dmax, float(stored[1]))
+    data.attrs[RANGE] = [float(dmin), float(dmax)]
+
+    return float(dmin), float(dmax)
+
+
+def load(path: str | Path) -> Cube:
+    """Load the Zarr store as a cube, with lazy data."""
+    from cf_units import Unit
+    import dask.array as da
+    from iris.coords import DimCoord
+    from iris.cube import Cube, CubeAttrsDict
+    from iris.fileformats.netcdf import parse_cell_methods
+
+    group = _zarr().open_group(path, mode="r")
+    name = group.attrs[DATA_VAR]
+    data = group[name]
+    attrs = dict(data.attrs)
+    if RANGE in attrs:
+        # as with the netcdf time-series, the range has the dtype of the data
+        attrs[RANGE] = np.array(attrs[RANGE], dtype=data.dtype)
+    grid_mapping = attrs.pop("grid_mapping", None)
+    crs = _coord_system(dict(group[grid_mapping].attrs)) if grid_mapping else None
+
+    coords = []
+    for dim, cname in enumerate(data.metadata.dimension_names):
+        array = group[cname]
+        cattrs = dict(array.attrs)
+        bounds = cattrs.pop("bounds", None)
+        standard_name = cattrs.pop("standard_name", None)
+        coord = DimCoord(
+            array[:],
+            standard_name=standard_name,
+            long_name=cattrs.pop("long_name", None),
+            var_name=cname,
+            units=Unit(cattrs.pop("units", None), calendar=cattrs.pop("calendar", None)),
+            bounds=group[bounds][:] if bounds else None,
+            attributes=cattrs,
+            coord_system=crs if standard_name in ("latitude", "longitude") else None,
+        )
+        coords.append((coord, dim))
+
+    cell_methods = parse_cell_methods(attrs.pop("cell_methods", ""))
+    globals_ = {key: value for key, value in group.attrs.items() if key != DATA_VAR}
+
+    return Cube(
+        da.from_zarr(data, chunks=data.chunks),
+        standard_name=attrs.pop("standard_name", None),
+        long_name=attrs.pop("long_name", None),
+        var_name=name,
+        units=attrs.pop("units", None),
+        attributes=CubeAttrsDict(globals=globals_, locals=attrs),
+        cell_methods=cell_methods,
+        dim_coords_and_dims=coords,
+    )
@@ -0,0 +1,352 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Memory-bounded unpacking of a time-series, one chunk of time steps at a time."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import shutil
+from typing import TYPE_CHECKING
+
+from geojav import netcdf, sparse, stats, store
+from geojav.ranges import data_ranges
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from types import ModuleType
+
+    from iris.cube import Cube
+
+__all__ = [
+    "BUDGET",
+    "Summary",
+    "backend",
+    "chunk_steps",
+    "codecs",
+    "discard_counterpart",
+    "save",
+    "stream",
+]
+
+# the default memory budget (MiB) of the time steps in flight
+BUDGET: int = 1024
+# the number of copies of a chunk that may be alive at once i.e., the chunk
+# along with its prepared or populated time steps, plus headroom
+COPIES: int = 3
+MIB: int = 1024 * 1024
+
+
+@dataclass
+class Summary:
+    """Summary of a streamed unpack."""
+
+    fname: Path
+    nsteps: int = 0
+    nkept: int = 0
+    nchunks: int = 0
+    dmin: float | None = None
+    dmax: float | None = None
+
+
+def chunk_steps(nbytes: int, budget: int = BUDGET) -> int:
+    """Return the number of time steps of `nbytes` each that fit the `budget` (MiB)."""
+    return max(1, (budget * MIB) // (COPIES * max(1, nbytes)))
+
+
+def backend(target: str | Path) -> ModuleType:
+    """Return the module that saves and appends to the `target` time-series.
+
+    A `target` with a ``.zarr`` suffix is a Zarr store, see :mod:`geojav.store`,
+    otherwise it is a NetCDF file, see :mod:`geojav.netcdf`.
+
+    """
+    return store if Path(target).suffix == store.SUFFIX else netcdf
+
+
+def codecs() -> list[str]:
+    """Return the compression codecs of either backend, see :func:`backend`.
+
+    Not every codec is supported by both backends, see
+    :func:`geojav.netcdf.codecs` and :func:`geojav.store.codecs`.
+
+    """
+    return list(dict.fromkeys([*netcdf.codecs(), *store.codecs()]))
+
+
+def _tmp(target: Path) -> Path:
+    # the temporary time-series written alongside the target
+    return target.with_name(f".{target.stem}.tmp{target.suffix}")
+
+
+def _remove(path: Path) -> None:
+    # a zarr store is a directory
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def discard_counterpart(target: str | Path) -> Path | None:
+    """Remove the time-series of the `target` in the other format, if any.
+
+    That is, the Zarr store of a NetCDF file, or the NetCDF file of a Zarr
+    store, which is otherwise stale once the `target` is unpacked afresh, and
+    any Zarr store is preferred when loaded, see :func:`geojav.prepare.load`.
+
+    Returns
+    -------
+    Path or None
+        The time-series removed.
+
+    """
+    target = Path(target)
+    other = target.with_suffix(".nc" if target.suffix == store.SUFFIX else store.SUFFIX)
+    if not other.exists():
+        return None
+
+    _remove(other)
+    return other
+
+
+def _replace(src: Path, dst: Path) -> None:
+    # a directory is only replaced when empty
+    if dst.is_dir():
+        shutil.rmtree(dst)
+    os.replace(src, dst)
+
+
+def save(cube: Cube, target: str | Path, dmin: float, dmax: float, **kwargs) -> tuple[float, float]:
+    """Save the cube as the `target` time-series, along with its data range.
+
+    The `target` is written alongside as a temporary file, and only moved into
+    place when complete, so that an interrupted, or failed, save never leaves
+    a partial `target`.
+
+    Parameters
+    ----------
+    cube : Cube
+        The time-series, with time as its leading dimension.
+    target : str or Path
+        The NetCDF file name, or Zarr store, of the time-series, see
+        :func:`backend`.
+    dmin, dmax : float
+        The data range, stored as the ``actual_range`` of the data variable.
+    **kwargs : dict, optional
+        Passed through to the ``save`` of the :func:`backend` e.g., the ``codec``.
+
+    Returns
+    -------
+    tuple of float
+        The stored data range.
+
+    """
+    target = Path(target)
+    tmp = _tmp(target)
+    io = backend(target)
+    _remove(tmp)
+
+    try:
+        io.save(cube, tmp, **kwargs)
+        dmin, dmax = io.update_range(tmp, cube.name(), dmin, dmax, merge=False)
+    except BaseException:
+        _remove(tmp)
+        raise
+
+    _replace(tmp, target)
+
+    return dmin, dmax
+
+
+def _realise(cube: Cube) -> None:
+    # store the lazy data chunk-by-chunk into a preallocated array, rather
+    # than concatenating the chunks only once they are all loaded, which
+    # transiently holds two copies of the data
+    if not cube.has_lazy_data():
+        return
+
+    import dask.array as da
+    import numpy as np
+
+    lazy = cube.lazy_data()
+    empty = np.ma.empty if np.ma.isMaskedArray(lazy._meta) else np.empty
+    data = empty(lazy.shape, dtype=lazy.dtype)
+    da.store(lazy, data)
+
+    # as with iris, a masked array without masked values is realised unmasked
+    if np.ma.isMaskedArray(data) and not np.ma.is_masked(data):
+        data = data.data
+
+    cube.data = data
+
+
+def _time_series(cube: Cube) -> Cube:
+    # a chunk of a single time step may have a scalar time coordinate
+    if not cube.coord_dims("time"):
+        from iris.util import new_axis
+
+        cube = new_axis(cube, "time")
+
+    return cube
+
+
+def stream(
+    fnames: Sequence[Path],
+    target: str | Path,
+    load: Callable[[Sequence[Path]], Cube],
+    prepare: Callable[[Cube], Cube] | None = None,
+    budget: int = BUDGET,
+    update: bool = False,
+    plume: bool = False,
+    **kwargs,
+) -> Summary:
+    """Unpack the time step files into a time-series, in bounded memory.
+
+    The files are processed in chunks of consecutive time steps, sized so that
+    only `budget` MiB of data is in flight, regardless of the length of the
+    time-series. Each chunk is realised, prepared, reduced for its data range,
+    stripped of its empty time steps, and appended to the `target`.
+
+    The `target` is written alongside as a temporary file, and only moved into
+    place when complete. Its data range is stored as the ``actual_range`` of
+    the data variable.
+
+    When updating an existing `target`, only the populated time steps after
+    its latest time are appended to it in place, and its stored data range is
+    widened to include them.
+
+    The statistics of each populated time step are written to a sidecar
+    alongside the `target`, see :mod:`geojav.stats`. Optionally, the populated
+    time steps are also written to a sparse plume store alongside the `target`,
+    see :mod:`geojav.sparse`.
+
+    Parameters
+    ----------
+    fnames : sequence of Path
+        The time step files, in time order, with one time step per file.
+    target : str or Path
+        The NetCDF file name, or Zarr store, of the time-series, see
+        :func:`backend`.
+    load : callable
+        Load a sequence of time step files as a single cube.
+    prepare : callable, optional
+        Prepare each realised chunk e.g., convert its units.
+    budget : int, default=BUDGET
+        The memory budget (MiB) of the time steps in flight.
+    update : bool, default=False
+        Append to any existing `target`, rather than replacing it.
+    plume : bool, default=False
+        Also write the positive cells of each time step to a sparse plume
+        store. Any existing plume store of the `target` is always updated
+        along with it, otherwise it is removed when the `target` is replaced,
+        as it is then stale. Likewise, the time-series of the `target` in the
+        other format is removed, see :func:`discard_counterpart`.
+    **kwargs : dict, optional
+        Passed through to the ``save`` of the :func:`backend` when creating
+        the `target` e.g., the ``codec``.
+
+    Returns
+    -------
+    Summary
+        The summary of the time steps streamed. The data range is that of the
+        `target`, once updated.
+
+    """
+    target = Path(target)
+    tmp = _tmp(target)
+    _remove(tmp)
+    _remove(sparse.path(tmp))
+    _remove(stats.path(tmp))
+    summary = Summary(fname=target)
+
+    if not fnames:
+        return summary
+
+    nbytes = load(fnames[:1]).lazy_data().nbytes
+    step = chunk_steps(nbytes, budget=budget)
+    name = None
+    io = backend(target)
+
+    if existing := update and target.exists():
+        output, latest = target, io.last_time(target)
+    else:
+        output, latest = tmp, None
+
+    # the statistics of an existing target are only ever appended to
+    sidecar = not existing or stats.path(target).exists()
+
+    if existing:
+        if sparse.path(target).exists():
+            # keep any existing plume store in step with its time-series
+            plume = True
+        elif plume:
+            emsg = f"No sparse plume store of {str(target)!r} to update, rebuild it instead."
+            raise ValueError(emsg)
+
+    print(f"\tStreaming {len(fnames)} time steps, {step} per chunk ({budget=}MiB) ...")
+
+    for i in range(0, len(fnames), step):
+        cube = _time_series(load(fnames[i : i + step]))
+        # realise the chunk once, for the preparation, reduction and save,
+        # before any preparation adds to the transient copies of a lazy chunk
+        _realise(cube)
+        if prepare is not None:
+            cube = prepare(cube)
+
+        ranges = data_ranges(cube)
+        summary.nsteps += cube.shape[0]
+        summary.nchunks += 1
+        summary.dmin = ranges.dmin if summary.dmin is None else min(summary.dmin, ranges.dmin)
+        summary.dmax = ranges.dmax if summary.dmax is None else max(summary.dmax, ranges.dmax)
+
+        steps = ranges.steps
+        if latest is not None:
+            # only ever append time steps after those already stored
+            times = cube.coord("time").units.num2pydate(cube.coord("time").points)
+            steps = [index for index in steps if times[index] > latest]
+
+        if not steps:
+            continue
+
+        if len(steps) < cube.shape[0]:
+            cube = cube[steps]
+
+        create = name is None and not existing
+        if create:
+            io.save(cube, output, **kwargs)
+        else:
+            io.append(cube, output)
+
+        if plume:
+            cells = sparse.sparsify(cube.data)
+            (sparse.save if create else sparse.append)(cells, sparse.path(output))
+            del cells
+
+        if sidecar:
+            # summarised one time step at a time, within the memory budget
+            (stats.save if create else stats.append)(
+                stats.summarise_data(cube.data), stats.path(output)
+            )
+
+        name = cube.name()
+        summary.nkept += len(steps)
+        del cube, ranges
+
+    if name is not None:
+        summary.dmin, summary.dmax = io.update_range(
+            output, name, summary.dmin, summary.dmax, merge=existing
+        )
+        if not existing:
+            _replace(tmp, target)
+            discard_counterpart(target)
+            _replace(stats.path(tmp), stats.path(target))
+            if plume:
+                _replace(sparse.path(tmp), sparse.path(target))
+            else:
+                _remove(sparse.path(target))
+
+    return summary
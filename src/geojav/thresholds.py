@@ -0,0 +1,248 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Threshold the frames of a time-series without a filter pass over every cell.
+
+The cells of each frame are sorted by ascending value when the frame is
+prepared, see :func:`sort`, with any NaN cells last. The cells at or above any
+threshold are then the contiguous tail of the frame, which is found with a
+binary search, so the number of cells of a threshold is known before any cells
+are extracted, and the cells are extracted as a contiguous slice of the arrays
+of the frame, see :class:`ThresholdIndex`.
+
+Frames that are not sorted e.g., the shared geometry frames, see
+:mod:`geojav.scalars`, are indexed by their cell ids sorted by value, which are
+extracted with :meth:`pyvista.DataSet.extract_cells`.
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from geojav import frames
+
+if TYPE_CHECKING:
+    import pyvista as pv
+
+__all__ = ["SORTED", "ThresholdIndex", "bound", "sort"]
+
+# the name of the field data array of the name of the cell data array that the
+# cells of a frame are sorted by
+SORTED: str = "sorted"
+
+
+def _key(attribute: str, name: str) -> str:
+    return f"{attribute}{frames.SEPARATOR}{name}"
+
+
+def _select(arrays: dict[str, np.ndarray], attribute: str, index: Any) -> None:
+    # index each of the arrays of the attribute of the packed frame, in place
+    prefix = _key(attribute, "")
+    for key in arrays:
+        if key.startswith(prefix):
+            arrays[key] = arrays[key][index]
+
+
+def _order_cells(arrays: dict[str, np.ndarray], order: np.ndarray) -> dict[str, np.ndarray]:
+    offsets, connectivity = arrays[frames.OFFSETS], arrays[frames.CONNECTIVITY]
+    sizes = np.diff(offsets)[order]
+    result = dict(arrays)
+    result[frames.OFFSETS] = np.zeros_like(offsets)
+    np.cumsum(sizes, out=result[frames.OFFSETS][1:])
+    starts = offsets[:-1][order] - result[frames.OFFSETS][:-1]
+    result[frames.CONNECTIVITY] = connectivity[
+        np.repeat(starts, sizes) + np.arange(result[frames.OFFSETS][-1])
+    ]
+    result[frames.CELLTYPES] = arrays[frames.CELLTYPES][order]
+    _select(result, "cell_data", order)
+
+    return result
+
+
+def _order_points(arrays: dict[str, np.ndarray], order: np.ndarray) -> dict[str, np.ndarray]:
+    connectivity = arrays[frames.CONNECTIVITY]
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(order.size)
+    result = dict(arrays)
+    result[frames.POINTS] = arrays[frames.POINTS][order]
+    result[frames.CONNECTIVITY] = inverse[connectivity].astype(connectivity.dtype, copy=False)
+    _select(result, "point_data", order)
+
+    return result
+
+
+def bound(dtype: np.dtype, threshold: float) -> np.generic:
+    """Return the smallest value of the dtype at or above the threshold.
+
+    The values of the dtype at or above the bound are those at or above the
+    threshold, so the values are compared without casting them.
+
+    """
+    dtype = np.dtype(dtype)
+    result = dtype.type(threshold)
+    if float(result) < threshold:
+        result = np.nextafter(result, dtype.type(np.inf))
+
+    return result
+
+
+def sort(frame: pv.UnstructuredGrid, name: str | None = None) -> pv.UnstructuredGrid:
+    """Return the frame with its cells sorted by ascending value, and NaN last.
+
+    The points of the frame are also sorted, by the last cell with a value
+    that uses them, so that the points used by the cells at or above any
+    threshold are also a contiguous tail of the points.
+
+    Parameters
+    ----------
+    frame : UnstructuredGrid
+        The frame, which is not modified.
+    name : str, optional
+        The name of the cell data array to sort by. Defaults to the active
+        scalars of the frame.
+
+    """
+    if not frame.n_cells:
+        return frame
+
+    name = frame.active_scalars_name if name is None else name
+    packed = frames.pack(frame)
+    order = np.argsort(packed.arrays[_key("cell_data", name)], kind="stable")
+    arrays = _order_cells(packed.arrays, order)
+
+    # the points only used by NaN cells are never extracted, so are first
+    size = int(np.searchsorted(arrays[_key("cell_data", name)], np.nan))
+    offsets = arrays[frames.OFFSETS]
+    last = np.full(arrays[frames.POINTS].shape[0], -1, dtype=np.int64)
+    np.maximum.at(
+        last,
+        arrays[frames.CONNECTIVITY][: offsets[size]],
+        np.repeat(np.arange(size), np.diff(offsets[: size + 1])),
+    )
+    arrays = _order_points(arrays, np.argsort(last))
+    arrays[_key("field_data", SORTED)] = np.array([name])
+
+    return frames.Packed(arrays=arrays, active=packed.active).unpack()
+
+
+class ThresholdIndex:
+    """The cells of a frame, indexed by ascending value.
+
+    The cells at or above a threshold are those of :meth:`pyvista.DataSet.threshold`,
+    and the most recently extracted cells are reused for the same cells.
+
+    Parameters
+    ----------
+    frame : DataSet
+        The frame, which is not modified.
+    name : str, optional
+        The name of the cell data array to index. Defaults to the active
+        scalars of the frame.
+
+    """
+
+    def __init__(self, frame: pv.DataSet, name: str | None = None) -> None:
+        self.frame = frame
+        self.name = frame.active_scalars_name if name is None else name
+        values = np.asarray(frame.cell_data[self.name]) if frame.n_cells else np.empty(0)
+
+        if self.sorted:
+            # the cells are their own index
+            self.order = None
+            self.values = values
+        else:
+            self.order = np.argsort(values, kind="stable")
+            self.values = values[self.order]
+
+        # NaN are sorted last, so the valid cells are those before the first NaN
+        self.size = int(np.searchsorted(self.values, np.nan))
+        self._packed: frames.Packed | None = None
+        self._last: tuple[int, pv.DataSet] | None = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def sorted(self) -> bool:
+        """Whether the cells of the frame are sorted by the indexed values."""
+        field_data = self.frame.field_data
+        return SORTED in field_data.keys() and list(field_data[SORTED]) == [self.name]
+
+    def start(self, threshold: float) -> int:
+        """Return the position of the first cell at or above the threshold."""
+        value = bound(self.values.dtype, threshold)
+        return int(np.searchsorted(self.values[: self.size], value, side="left"))
+
+    def count(self, threshold: float) -> int:
+        """Return the number of cells at or above the threshold."""
+        return self.size - self.start(threshold)
+
+    def ids(self, threshold: float) -> np.ndarray:
+        """Return the ascending ids of the cells at or above the threshold."""
+        start = self.start(threshold)
+        if self.order is None:
+            return np.arange(start, self.size)
+        return np.sort(self.order[start : self.size])
+
+    def _tail(self, start: int) -> dict[str, np.ndarray]:
+        # the contiguous tail of the cells of the sorted frame, from the start,
+        # and the contiguous tail of the points that they use
+        arrays = self._packed.arrays
+        offsets = arrays[frames.OFFSETS]
+        connectivity = arrays[frames.CONNECTIVITY][offsets[start] : offsets[self.size]]
+        first = connectivity.min()
+        result = {
+            frames.POINTS: arrays[frames.POINTS][first:],
+            frames.CONNECTIVITY: connectivity - first,
+            frames.OFFSETS: offsets[start : self.size + 1] - offsets[start],
+            frames.CELLTYPES: arrays[frames.CELLTYPES][start : self.size],
+        }
+        for key, array in arrays.items():
+            attribute, _, _ = key.partition(frames.SEPARATOR)
+            if attribute == "point_data":
+                result[key] = array[first:]
+            elif attribute == "cell_data":
+                result[key] = array[start : self.size]
+            elif attribute == "field_data":
+                result[key] = array
+
+        return result
+
+    def extract(self, threshold: float) -> pv.DataSet:
+        """Return the cells at or above the threshold.
+
+        Equivalent to ``frame.threshold(threshold)``, but only the extracted
+        cells are visited.
+
+        """
+        import pyvista as pv
+
+        start = self.start(threshold)
+        if self._last is not None and self._last[0] == start:
+            return self._last[1]
+
+        if start == self.size:
+            result = pv.UnstructuredGrid()
+        elif start == 0 and self.size == self.frame.n_cells:
+            # every cell is at or above the threshold
+            result = self.frame
+        elif self.order is None:
+            if self._packed is None:
+                self._packed = frames.pack(self.frame)
+            result = frames.Packed(arrays=self._tail(start), active=self.name).unpack()
+        else:
+            result = self.frame.extract_cells(
+                np.sort(self.order[start : self.size]),
+                pass_cell_ids=False,
+                pass_point_ids=False,
+            )
+            result.set_active_scalars(self.name, preference="cell")
+
+        self._last = start, result
+
+        return result
@@ -0,0 +1,204 @@
+# Copyright (c) 2021, GeoVista Contributors.
+#
+# This file is part of GeoVista and is distributed under the 3-Clause BSD license.
+# See the LICENSE file in the package root directory for licensing details.
+
+"""Persistent verification stamps for the cached registry assets."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+
+from geojav.lock import lock
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import pooch
+
+__all__ = ["STAMPS_NAME", "Stamps", "file_hash", "split_hash"]
+
+CHUNK_SIZE: int = 1024 * 1024
+STAMPS_NAME: str = "verified.json"
+
+
+def file_hash(fname: str | Path, alg: str = "sha256") -> str:
+    """Return the hex digest of the file with the given hash algorithm."""
+    hasher = hashlib.new(alg)
+
+    with Path(fname).open("rb") as fin:
+        while chunk := fin.read(CHUNK_SIZE):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def split_hash(known_hash: str) -> tuple[str, str]:
+    """Split a pooch ``[alg:]digest`` hash, defaulting to ``sha256``."""
+    alg, _, digest = known_hash.rpartition(":")
+    return alg.lower() or "sha256", digest.lower()
+
+
+class Stamps:
+    """Index of the cached assets that have been verified against the registry.
+
+    Each stamp records the size, modification time and registry hash of an
+    asset at the time its content was verified. An asset whose size and
+    modification time are unchanged, and whose registry hash has not been
+    updated, is trusted without being re-read.
+
+    The index is persisted as JSON alongside the cached assets.
+
+    """
+
+    def __init__(self, fname: Path, stamps: dict[str, dict] | None = None) -> None:
+        self.fname = fname
+        self.stamps = {} if stamps is None else stamps
+        self._lock = threading.Lock()
+        # the assets stamped or cleared since loading, which are merged with
+        # any stamps concurrently persisted by other processes on save
+        self._stamped: set[str] = set()
+        self._cleared: set[str] = set()
+
+    @staticmethod
+    def _read(fname: Path) -> dict[str, dict] | None:
+        stamps = None
+
+        if fname.exists():
+            try:
+                stamps = json.loads(fname.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                # a corrupt index simply means everything is re-verified
+                stamps = None
+
+        return stamps
+
+    @classmethod
+    def load(cls, cache: pooch.Pooch) -> Stamps:
+        """Load the verification stamps of the `cache`, if any."""
+        fname = Path(cache.abspath) / STAMPS_NAME
+        return cls(fname, stamps=cls._read(fname))
+
+    def save(self) -> None:
+        """Atomically persist the verification stamps.
+
+        The stamps are merged with those persisted by any other process sharing
+        the cache since they were loaded.
+
+        """
+        self.fname.parent.mkdir(parents=True, exist_ok=True)
+
+        with lock(self.fname):
+            stamps = self._read(self.fname) or {}
+
+            with self._lock:
+                for asset in self._cleared - self._stamped:
+                    stamps.pop(asset, None)
+                stamps.update({asset: self.stamps[asset] for asset in self._stamped})
+                self.stamps = stamps
+                self._stamped.clear()
+                self._cleared.clear()
+                content = json.dumps(stamps, indent=1, sort_keys=True)
+
+            fd, tmp = tempfile.mkstemp(dir=self.fname.parent, prefix=f".{self.fname.name}")
+            with os.fdopen(fd, "w", encoding="utf-8") as fout:
+                fout.write(content)
+            os.replace(tmp, self.fname)
+
+    def clear(self) -> None:
+        """Discard all the verification stamps."""
+        with self._lock:
+            self._cleared.update(self.stamps)
+            self._stamped.clear()
+            self.stamps.clear()
+
+    def check(self, asset: str, fname: Path, known_hash: str | None) -> bool:
+        """Determine whether the cached asset is stamped as verified, in O(1)."""
+        with self._lock:
+            stamp = self.stamps.get(asset)
+
+        if stamp is None or stamp["hash"] != known_hash:
+            return False
+
+        try:
+            stat = fname.stat()
+        except FileNotFoundError:
+            return False
+
+        return stamp["size"] == stat.st_size and stamp["mtime_ns"] == stat.st_mtime_ns
+
+    def stamp(self, asset: str, fname: Path, known_hash: str | None) -> None:
+        """Record the cached asset as verified against the `known_hash`."""
+        stat = fname.stat()
+
+        with self._lock:
+            self.stamps[asset] = {
+                "hash": known_hash,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+            self._stamped.add(asset)
+
+    def verify(
+        self,
+        assets: Iterable[str],
+        cache: pooch.Pooch,
+        workers: int | None = None,
+    ) -> set[str]:
+        """Verify the cached `assets`, hashing any unstamped files in parallel.
+
+        Parameters
+        ----------
+        assets : iterable of str
+            The registry names of the assets to verify.
+        cache : Pooch
+            The pooch instance managing the assets.
+        workers : int, optional
+            The maximum number of hashing processes. Defaults to the number
+            of CPUs.
+
+        Returns
+        -------
+        set of str
+            The assets that are cached and verified. Missing assets, and those
+            that failed verification, are excluded.
+
+        """
+        verified, pending = set(), []
+
+        for asset in assets:
+            fname = Path(cache.abspath) / asset
+            known_hash = cache.registry[asset]
+            if not fname.exists():
+                continue
+            if known_hash is None:
+                self.stamp(asset, fname, known_hash)
+                verified.add(asset)
+            elif self.check(asset, fname, known_hash):
+                verified.add(asset)
+            else:
+                pending.append((asset, fname, known_hash))
+
+        if pending:
+            print(f"\tVerifying {len(pending)} cached assets ...")
+
+            algs, digests = zip(*(split_hash(known_hash) for *_, known_hash in pending))
+            fnames = [fname for _, fname, _ in pending]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                hashes = executor.map(file_hash, fnames, algs, chunksize=4)
+                for (asset, fname, known_hash), digest, actual in zip(
+                    pending, digests, hashes
+                ):
+                    if actual == digest:
+                        self.stamp(asset, fname, known_hash)
+                        verified.add(asset)
+
+        return verified